@@ -1,13 +1,30 @@
 import streamlit as st
 import json
 import base64
-import requests
-import urllib.parse
-import re
+import hashlib
+import os
+import statistics
 import time
+import uuid
+from collections import deque
 from datetime import datetime
-from openai import OpenAI
 import streamlit.components.v1 as components
+from sis_attachments import DIGEST_CHUNK_TOKENS, build_chunk_index, select_relevant_chunks
+from sis_core import (
+    GRAPH_JSON_MARKER, KNOWLEDGE_BASE, MAX_IDEA_CANDIDATES, PROMPT_PREFIXES, SCIENCE_FIELDS_SORTED, SynthesisConfig,
+    build_query_context, estimate_tokens, field_options, get_biblio_caches, get_client, get_graph_store, get_history, get_response_cache,
+    SPANS_FILE, UPLOAD_DIR, SynthesisResult, attachment_digest, get_scheduler, get_single_flights, invalidate_author_cache, make_biblio_prefetcher, prompt_token_report, resolve_logic_mode, run_synthesis,
+)
+from sis_graph import build_cytoscape_elements
+from sis_ingest import MAX_ATTACHMENT_BYTES, MAX_ATTACHMENTS_TOTAL, attachments_key, read_attachments, spool_upload
+from sis_layout import compute_layout, graph_hash
+from sis_lod import LOD_NODE_THRESHOLD, LOD_PAGE, cluster_graph, lod_view
+from sis_ontology import describe_report
+from sis_selector import ONTOLOGY_TOKEN_BUDGET
+from sis_trace import NULL_TRACE, Trace, percentile
+
+_rerun_started = time.perf_counter()
+HISTORY_BROWSE_N = 25
 
 # =========================================================
 # 0. KONFIGURACIJA IN NAPREDNI STILI (CSS)
@@ -82,11 +99,23 @@ st.markdown("""
         margin-bottom: 20px;
         font-weight: bold;
     }
+    .cache-hit-badge {
+        display: inline-block;
+        padding: 4px 10px;
+        border-radius: 12px;
+        background-color: #e9f5ee;
+        color: #2e7d32;
+        border: 1px solid #a5d6a7;
+        font-size: 0.85em;
+        font-weight: bold;
+        margin-bottom: 10px;
+    }
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(show_spinner=False)
 def get_svg_base64(svg_str):
-    """Pretvori SVG v base64 format za prikaz slike v Streamlit sidebarju."""
+    """Pretvori SVG v base64 format za prikaz slike v Streamlit sidebarju (enkrat na proces)."""
     return base64.b64encode(svg_str.encode('utf-8')).decode('utf-8')
 
 # --- LOGOTIP: 3D RELIEF (Embedded SVG) ---
@@ -123,7 +152,13 @@ def render_cytoscape_network(elements, container_id="cy"):
     """
     Izriše interaktivno omrežje Cytoscape.js s podporo za oblike iz metamodela,
     shranjevanje slike in funkcijo lupe za fokusiranje vozlišč.
+    Če imajo vozlišča strežniško izračunane položaje, se uporabi postavitev `preset`.
+    Vrne velikost ustvarjenega HTML v bajtih.
     """
+    if any("position" in el for el in elements):
+        layout = "{ name: 'preset', padding: 50, fit: true }"
+    else:
+        layout = "{ name: 'cose', padding: 50, animate: true, nodeRepulsion: 25000, idealEdgeLength: 120 }"
     cyto_html = f"""
     <div style="position: relative;">
         <button id="save_btn" style="position: absolute; top: 10px; right: 10px; z-index: 100; padding: 8px 12px; background: #2a9d8f; color: white; border: none; border-radius: 5px; cursor: pointer; font-family: sans-serif; font-size: 12px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">💾 Export Graph as PNG</button>
@@ -171,7 +206,7 @@ def render_cytoscape_network(elements, container_id="cy"):
                         style: {{ 'opacity': 0.15, 'text-opacity': 0 }}
                     }}
                 ],
-                layout: {{ name: 'cose', padding: 50, animate: true, nodeRepulsion: 25000, idealEdgeLength: 120 }}
+                layout: {layout}
             }});
 
             /* LOGIKA LUPE (Fokusiranje na sosesko ob prehodu z miško) */
@@ -208,191 +243,23 @@ def render_cytoscape_network(elements, container_id="cy"):
     </script>
     """
     components.html(cyto_html, height=650)
+    return len(cyto_html.encode("utf-8"))  # velikost poslanega HTML (za diagnostiko)
 
-# --- PRIDOBIVANJE BIBLIOGRAFIJ Z LETNICAMI ---
-def fetch_author_bibliographies(author_input):
-    """Zajame bibliografske podatke z letnicami preko ORCID in Scholar API baz."""
-    if not author_input: return ""
-    author_list = [a.strip() for a in author_input.split(",")]
-    comprehensive_biblio = ""
-    headers = {"Accept": "application/json"}
-    
-    for auth in author_list:
-        orcid_id = None
-        try:
-            search_url = f"https://pub.orcid.org/v3.0/search/?q={auth}"
-            s_res = requests.get(search_url, headers=headers, timeout=5).json()
-            if s_res.get('result'):
-                orcid_id = s_res['result'][0]['orcid-identifier']['path']
-        except: pass
-
-        if orcid_id:
-            try:
-                record_url = f"https://pub.orcid.org/v3.0/{orcid_id}/record"
-                r_res = requests.get(record_url, headers=headers, timeout=5).json()
-                works = r_res.get('activities-summary', {}).get('works', {}).get('group', [])
-                comprehensive_biblio += f"\n--- ORCID BIBLIOGRAPHY: {auth.upper()} ({orcid_id}) ---\n"
-                if works:
-                    for work in works[:5]:
-                        summary = work.get('work-summary', [{}])[0]
-                        title = summary.get('title', {}).get('title', {}).get('value', 'N/A')
-                        pub_date = summary.get('publication-date')
-                        year = pub_date.get('year').get('value', 'n.d.') if pub_date and pub_date.get('year') else "n.d."
-                        comprehensive_biblio += f"- [{year}] {title}\n"
-                else: comprehensive_biblio += "No public works found.\n"
-            except: pass
-        else:
-            try:
-                ss_url = f"https://api.semanticscholar.org/graph/v1/paper/search?query=author:\"{auth}\"&limit=3&fields=title,year"
-                ss_res = requests.get(ss_url, timeout=5).json()
-                papers = ss_res.get("data", [])
-                if papers:
-                    comprehensive_biblio += f"\n--- SCHOLAR BIBLIOGRAPHY: {auth.upper()} ---\n"
-                    for p in papers:
-                        comprehensive_biblio += f"- [{p.get('year','n.d.')}] {p['title']}\n"
-            except: pass
-    return comprehensive_biblio
-
-# =========================================================================
-# 1. ARCHITECTURE DEFINITIONS (IMA vs MA)
-# =========================================================================
-
-# A. INTEGRATED METAMODEL ARCHITECTURE (IMA) + SPECIAL ADD-ON
-HUMAN_THINKING_METAMODEL = {
-    "nodes": {
-        "Human mental concentration": {"color": "#A6A6A6", "shape": "rectangle"},
-        "Identity": {"color": "#C6EFCE", "shape": "rectangle"},
-        "Autobiographical memory": {"color": "#C6EFCE", "shape": "rectangle"},
-        "Mission": {"color": "#92D050", "shape": "rectangle"},
-        "Vision": {"color": "#FFFF00", "shape": "rectangle"},
-        "Goal": {"color": "#00B0F0", "shape": "rectangle"},
-        "Problem": {"color": "#F2DCDB", "shape": "rectangle"},
-        "Ethics/moral": {"color": "#FFC000", "shape": "rectangle"},
-        "Hierarchy of interests": {"color": "#F8CBAD", "shape": "rectangle"},
-        "Rule": {"color": "#F2F2F2", "shape": "rectangle"},
-        "Decision-making": {"color": "#FFFF99", "shape": "rectangle"},
-        "Problem solving": {"color": "#D9D9D9", "shape": "rectangle"},
-        "Conflict situation": {"color": "#00FF00", "shape": "rectangle"},
-        "Knowledge": {"color": "#DDEBF7", "shape": "rectangle"},
-        "Tool": {"color": "#00B050", "shape": "rectangle"},
-        "Experience": {"color": "#00B050", "shape": "rectangle"},
-        "Classification": {"color": "#CCC0DA", "shape": "rectangle"},
-        # --- THE SPECIAL ADD-ON: Sociopsychological Outcome Mapping ---
-        "Psychological aspect": {"color": "#F8CBAD", "shape": "rectangle"},
-        "Sociological aspect": {"color": "#00FFFF", "shape": "rectangle"}
-    },
-    "relations": [
-        ("Human mental concentration", "Identity", "has"),
-        ("Human mental concentration", "Mission", "can have"),
-        ("Identity", "Autobiographical memory", "has"),
-        ("Mission", "Vision", "can have"),
-        ("Vision", "Goal", "can have"),
-        ("Problem", "Identity", "threatens"),
-        ("Problem", "Mission", "impedes"),
-        ("Problem", "Vision", "impedes"),
-        ("Problem", "Goal", "threatens"),
-        ("Problem", "Ethics/moral", "has"),
-        ("Ethics/moral", "Problem", "can solve"),
-        ("Problem", "Rule", "can be connected"),
-        ("Hierarchy of interests", "Goal", "realizes"),
-        ("Hierarchy of interests", "Knowledge", "realizes or hinders"),
-        ("Rule", "Goal", "realizes or hinders"),
-        ("Rule", "Decision-making", "realizes or hinders"),
-        ("Knowledge", "Goal", "acquisition"),
-        ("Decision-making", "Problem solving", "realizes or hinders"),
-        ("Ethics/moral", "Problem solving", "helps or hinders"),
-        ("Problem", "Problem solving", "should"),
-        ("Problem solving", "Conflict situation", "yes or no"),
-        ("Knowledge", "Classification", "with the help of"),
-        ("Knowledge", "Tool", "with the help of"),
-        ("Knowledge", "Experience", "with the help of"),
-        ("Experience", "Psychological aspect", "can be the outcome"),
-        ("Experience", "Sociological aspect", "can be the outcome"),
-        ("Conflict situation", "Psychological aspect", "can be the outcome"),
-        ("Conflict situation", "Sociological aspect", "can be the outcome"),
-        ("Psychological aspect", "Sociological aspect", "interconnected")
-    ]
-}
-
-# B. MENTAL APPROACHES (MA) ONTOLOGY
-MENTAL_APPROACHES_ONTOLOGY = {
-    "nodes": {
-        "Perspective shifting": {"color": "#00FF00", "shape": "rectangle"},
-        "Similarity and difference": {"color": "#FFFF00", "shape": "rectangle"},
-        "Core": {"color": "#FFC000", "shape": "rectangle"},
-        "Attraction": {"color": "#F2A6A2", "shape": "rectangle"},
-        "Repulsion": {"color": "#D9D9D9", "shape": "rectangle"},
-        "Condensation": {"color": "#CCC0DA", "shape": "rectangle"},
-        "Framework and foundation": {"color": "#F8CBAD", "shape": "rectangle"},
-        "Bipolarity and dialectics": {"color": "#DDEBF7", "shape": "rectangle"},
-        "Constant": {"color": "#E1C1D1", "shape": "rectangle"},
-        "Associativity": {"color": "#E1C1D1", "shape": "rectangle"},
-        "Induction": {"color": "#B4C6E7", "shape": "rectangle"},
-        "Whole and part": {"color": "#00FF00", "shape": "rectangle"},
-        "Mini-max": {"color": "#00FF00", "shape": "rectangle"},
-        "Addition and composition": {"color": "#FF00FF", "shape": "rectangle"},
-        "Hierarchy": {"color": "#C6EFCE", "shape": "rectangle"},
-        "Balance": {"color": "#00B0F0", "shape": "rectangle"},
-        "Deduction": {"color": "#92D050", "shape": "rectangle"},
-        "Abstraction and elimination": {"color": "#00B0F0", "shape": "rectangle"},
-        "Pleasure and displeasure": {"color": "#00FF00", "shape": "rectangle"},
-        "Openness and closedness": {"color": "#FFC000", "shape": "rectangle"}
-    },
-    "relations": [
-        ("Perspective shifting", "Similarity and difference", "leads to"),
-        ("Core", "Similarity and difference", "influences"),
-        ("Core", "Attraction", "has dynamic"),
-        ("Core", "Repulsion", "has dynamic"),
-        ("Repulsion", "Bipolarity and dialectics", "leads to"),
-        ("Framework and foundation", "Bipolarity and dialectics", "mutually interacts"),
-        ("Bipolarity and dialectics", "Constant", "stabilizes"),
-        ("Constant", "Associativity", "allows"),
-        ("Induction", "Whole and part", "bidirectional link"),
-        ("Induction", "Hierarchy", "structures"),
-        ("Whole and part", "Mini-max", "optimizes"),
-        ("Mini-max", "Addition and composition", "results in"),
-        ("Deduction", "Hierarchy", "defines taxonomy"),
-        ("Deduction", "Abstraction and elimination", "processes through"),
-        ("Deduction", "Pleasure and displeasure", "evaluates through"),
-        ("Hierarchy", "Balance", "maintains"),
-        ("Balance", "Addition and composition", "stabilizes"),
-        ("Balance", "Abstraction and elimination", "reconciles"),
-        ("Openness and closedness", "Pleasure and displeasure", "modulates response")
-    ]
-}
-
-KNOWLEDGE_BASE = {
-    "mental approaches": list(MENTAL_APPROACHES_ONTOLOGY["nodes"].keys()),
-    "User profiles": {"Adventurers": {"description": "Explorers of hidden patterns."}, "Applicators": {"description": "Efficiency focused."}, "Know-it-alls": {"description": "Systemic clarity."}, "Observers": {"description": "System monitors."}},
-    "Scientific paradigms": {"Empiricism": "Sensory experience.", "Rationalism": "Deductive logic.", "Constructivism": "Social build.", "Positivism": "Strict facts.", "Pragmatism": "Practical utility."},
-    "Structural models": {"Causal Connections": "Causality.", "Principles & Relations": "Fundamental laws.", "Episodes & Sequences": "Time-flow.", "Facts & Characteristics": "Raw data.", "Generalizations": "Frameworks.", "Glossary": "Definitions.", "Concepts": "Abstract constructs."},
-    "Science fields": {
-        "Mathematics": {"cat": "Formal", "methods": ["Axiomatization", "Statistical Inference", "Mathematical Modeling", "Formal Proof"], "tools": ["MATLAB", "Mathematica", "LaTeX", "Calculus"], "facets": ["Topology", "Algebra", "Analysis", "Number Theory"]},
-        "Physics": {"cat": "Natural", "methods": ["Modeling", "Simulation"], "tools": ["Accelerator", "Spectrometer"], "facets": ["Quantum", "Relativity"]},
-        "Chemistry": {"cat": "Natural", "methods": ["Synthesis", "Spectroscopy"], "tools": ["NMR", "Chromatography"], "facets": ["Organic", "Molecular"]},
-        "Biology": {"cat": "Natural", "methods": ["Sequencing", "CRISPR"], "tools": ["Microscope", "Bio-Incubator"], "facets": ["Genetics", "Population Dynamics"]},
-        "Ecology": {"cat": "Natural", "methods": ["Ecosystem Modeling", "Field Sampling", "Remote Sensing"], "tools": ["GIS Software", "Biosensors", "Satellite Imagery"], "facets": ["Biodiversity", "Sustainability", "Conservation Biology"]},
-        "Neuroscience": {"cat": "Natural", "methods": ["Neuroimaging", "Electrophys"], "tools": ["fMRI", "EEG"], "facets": ["Plasticity", "Synaptic"]},
-        "Psychology": {"cat": "Social", "methods": ["Double-Blind Trials", "Psychometrics"], "tools": ["fMRI", "Testing Kits"], "facets": ["Behavioral", "Cognitive"]},
-        "Sociology": {"cat": "Social", "methods": ["Ethnography", "Surveys"], "tools": ["Data Analytics", "Archives"], "facets": ["Stratification", "Dynamics"]},
-        "Computer Science": {"cat": "Formal", "methods": ["Algorithm Design", "Verification"], "tools": ["LLMGraphTransformer", "GPU Clusters"], "facets": ["AI", "Cybersecurity"]},
-        "Psychiatry": {"cat": "Applied/Medical", "methods": ["Diagnosis", "Clinical Trials"], "tools": ["DSM-5", "EEG"], "facets": ["Clinical Psychiatry", "Neuropsychiatry"]},
-        "Medicine": {"cat": "Applied", "methods": ["Clinical Trials", "Epidemiology"], "tools": ["MRI/CT", "Bio-Markers"], "facets": ["Immunology", "Pharmacology"]},
-        "Engineering": {"cat": "Applied", "methods": ["Prototyping", "FEA Analysis"], "tools": ["3D Printers", "CAD Software"], "facets": ["Robotics", "Nanotech"]},
-        "Library Science": {"cat": "Applied", "methods": ["Taxonomy", "Appraisal"], "tools": ["OPAC", "Metadata"], "facets": ["Retrieval", "Knowledge Org"]},
-        "Philosophy": {"cat": "Humanities", "methods": ["Socratic Method", "Phenomenology"], "tools": ["Logic Mapping", "Critical Analysis"], "facets": ["Epistemology", "Metaphysics"]},
-        "Linguistics": {"cat": "Humanities", "methods": ["Corpus Analysis", "Syntactic Parsing"], "tools": ["Praat", "NLTK Toolkit"], "facets": ["Socioling", "CompLing"]},
-        "Geography": {"cat": "Natural/Social", "methods": ["Spatial Analysis", "GIS"], "tools": ["ArcGIS"], "facets": ["Human Geo", "Physical Geo"]},
-        "Geology": {"cat": "Natural", "methods": ["Stratigraphy", "Mineralogy"], "tools": ["Seismograph"], "facets": ["Tectonics", "Petrology"]},
-        "Climatology": {"cat": "Natural", "methods": ["Climate Modeling"], "tools": ["Weather Stations"], "facets": ["Change Analysis"]},
-        "History": {"cat": "Humanities", "methods": ["Archives"], "tools": ["Archives"], "facets": ["Social History"]},
-        "Legal science": {"cat": "Social", "methods": ["Legal Hermeneutics", "Comparative Law", "Dogmatic Method", "Empirical Legal Research"], "tools": ["Legislative Databases", "Case Law Archives", "Constitutional Records"], "facets": ["Jurisprudence", "Constitutional Law", "Criminal Law", "Civil Law"]},
-        "Economics": {"cat": "Social", "methods": ["Econometrics", "Game Theory", "Market Modeling"], "tools": ["Stata", "R", "Bloomberg"], "facets": ["Macroeconomics", "Behavioral Economics"]},
-        "Politics": {"cat": "Social", "methods": ["Policy Analysis", "Comparative Politics"], "tools": ["Polls", "Legislative Databases"], "facets": ["International Relations", "Governance"]},
-        "Criminology": {"cat": "Social", "methods": ["Case Studies", "Statistical Analysis", "Profiling"], "tools": ["NCVS", "Crime Mapping Software"], "facets": ["Victimology", "Penology", "Criminal Behavior"]},
-        "Forensic sciences": {"cat": "Applied/Natural", "methods": ["DNA Profiling", "Ballistics", "Trace Analysis"], "tools": ["Mass Spectrometer", "Luminol", "Comparison Microscope"], "facets": ["Toxicology", "Pathology", "Digital Forensics"]}
-    }
-}
+@st.cache_data(ttl=300, show_spinner=False)
+def graph_store_stats():
+    """Števci skupne shrambe; COUNT(*) nad velikimi tabelami se ne izvaja ob vsakem ponovnem zagonu.
+
+    Po združitvi novega grafa se predpomnilnik izprazni (`graph_store_stats.clear()`).
+    """
+    return get_graph_store().stats()
+
+@st.cache_resource(max_entries=4, ttl=3600)
+def get_attachment_index(file_hash, _text):
+    """BM25 indeks odsekov priponk, predpomnjen po SHA-256 vsebine (ponovni zagoni ga ne gradijo znova).
+
+    Indeks vsebuje celotno besedilo, zato je vnosov malo in zastarijo po eni uri.
+    """
+    return build_chunk_index(_text)
 
 # =========================================================
 # 2. STREAMLIT INTERFACE KONSTRUKCIJA
@@ -400,6 +267,18 @@ KNOWLEDGE_BASE = {
 
 if 'expertise_val' not in st.session_state: st.session_state.expertise_val = "Expert"
 if 'show_user_guide' not in st.session_state: st.session_state.show_user_guide = False
+if 'biblio_prefetcher' not in st.session_state: st.session_state.biblio_prefetcher = make_biblio_prefetcher()
+if 'history_session' not in st.session_state: st.session_state.history_session = uuid.uuid4().hex
+
+def history_owner():
+    """Lastnik zapisov zgodovine: prijavljen uporabnik (st.login), sicer trenutna seja."""
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return "user:" + hashlib.sha256(st.user["email"].encode("utf-8")).hexdigest()[:16]
+    return "session:" + st.session_state.history_session
+
+def prefetch_authors():
+    """Ob spremembi avtorjev začne zajem bibliografij v ozadju, še preden uporabnik zažene sintezo."""
+    st.session_state.biblio_prefetcher.update(st.session_state.target_authors_key)
 
 # --- STRANSKA VRSTICA ---
 with st.sidebar:
@@ -411,6 +290,15 @@ with st.sidebar:
         type="password", 
         help="Security: Your key is held only in volatile RAM and is never stored on our servers."
     )
+    stream_output = st.checkbox("⚡ Stream output progressively", value=True, help="Render the synthesis token by token instead of waiting for the full response.")
+    use_response_cache = st.checkbox("💾 Reuse cached responses", value=False, help="Identical model, prompt, inquiry and sampling settings replay a stored synthesis instead of calling Groq.")
+    parallel_graph = st.checkbox("🧩 Generate graph in parallel", value=True, help="A smaller, faster model builds the semantic network in JSON mode while the main model writes the dissertation.")
+    idea_candidates = st.slider("💡 Idea candidates:", 1, MAX_IDEA_CANDIDATES, 1, help="In idea production mode, sample several candidates in parallel with different mental-approach emphases and temperatures, then merge them into one deduplicated idea set ranked by novelty.")
+    force_fresh = st.checkbox("🔄 Force fresh synthesis", value=False, disabled=not use_response_cache, help="Bypass the response cache for the next run and store the new result.")
+    ontology_budget = st.select_slider("🧭 Ontology context (tokens):", options=[150, 300, 450, 800, 0], value=ONTOLOGY_TOKEN_BUDGET,
+                                       format_func=lambda v: "full" if v == 0 else str(v),
+                                       help="Only the IMA/MA nodes relevant to your inquiry and selections (plus their neighbours) are sent, up to this many tokens.")
+    log_spans = st.checkbox("🧾 Log stage timings to file", value=bool(os.environ.get("SIS_SPANS_FILE")), help=f"Append per-stage spans of each run as JSON lines to {SPANS_FILE} (summarize with `python sis_trace.py`).")
     
     if st.button("📖 User Guide"):
         st.session_state.show_user_guide = not st.session_state.show_user_guide
@@ -436,10 +324,57 @@ with st.sidebar:
     with st.expander("🌍 Scientific paradigms"):
         for p, d in KNOWLEDGE_BASE["Scientific paradigms"].items(): st.write(f"**{p}**: {d}")
     with st.expander("🔬 Science fields"):
-        for s in sorted(KNOWLEDGE_BASE["Science fields"].keys()): st.write(f"• **{s}**")
+        for s in SCIENCE_FIELDS_SORTED: st.write(f"• **{s}**")
     with st.expander("🏗️ Structural models"):
         for m, d in KNOWLEDGE_BASE["Structural models"].items(): st.write(f"**{m}**: {d}")
     
+    with st.expander("🕘 Synthesis History"):
+        history_entries = get_history().recent(history_owner(), HISTORY_BROWSE_N)
+        st.caption("Only your own syntheses are listed; without sign-in, only those from this session.")
+        if not history_entries:
+            st.caption("No saved syntheses yet.")
+        else:
+            entry_labels = {e["id"]: f"{datetime.fromtimestamp(e['created']).strftime('%m-%d %H:%M')} · {e['title']}" for e in history_entries}
+            picked_id = st.selectbox("Recent syntheses:", list(entry_labels), format_func=entry_labels.get, key="history_pick")
+            if st.button("📂 Open", use_container_width=True):
+                # Zapis se prebere šele ob odprtju; klic modela ni potreben.
+                record = get_history().load(picked_id, history_owner())
+                if record is not None:
+                    st.session_state.live_result = SynthesisResult.from_record(record["result"])
+                    st.session_state.live_result_source = "history"
+                    st.session_state.live_result_created = record["created"]
+                    st.session_state.live_result_id = picked_id
+                    st.rerun()
+    with st.expander("🗄️ Caches"):
+        for cache_name, cache in get_biblio_caches().items():
+            cs = cache.stats()
+            st.caption(f"**{cache_name}**: {cs['entries']} entries · {cs['hits']} hits / {cs['misses']} misses ({cs['hit_rate']:.0%}) · ~{cs['saved_seconds_est']:.1f}s network time saved")
+        if st.button("🧹 Clear Bibliography Cache", use_container_width=True):
+            invalidate_author_cache()
+            st.session_state.biblio_prefetcher.clear()
+            st.rerun()
+        rs = get_response_cache().stats()
+        st.caption(f"**llm_responses**: {rs['bytes'] / 1024:.0f} KiB · {rs['hits']} hits / {rs['misses']} misses")
+        if st.button("🧹 Clear Response Cache", use_container_width=True):
+            get_response_cache().clear()
+            st.rerun()
+    with st.expander("⏱️ Rerun Latency"):
+        rerun_samples = list(st.session_state.get("rerun_ms", ()))
+        if rerun_samples:
+            st.caption(f"Last {len(rerun_samples)} interactive reruns: median {statistics.median(rerun_samples):.1f} ms · "
+                       f"p95 {percentile(rerun_samples, 0.95):.1f} ms · max {max(rerun_samples):.1f} ms")
+        else:
+            st.caption("No reruns measured yet.")
+    with st.expander("🚦 Groq Request Scheduler"):
+        lanes = get_scheduler().metrics()
+        if not lanes:
+            st.caption("No Groq requests yet in this process.")
+        for (key_id, model), m in lanes.items():
+            st.caption(f"**key {key_id[:6]}… · {model or 'default'}**: queue {m['queue_depth']} · in flight {m['in_flight']} · done {m['completed']} · wait avg {m['wait_avg_s']:.1f}s / p95 {m['wait_p95_s']:.1f}s · retries {m['retries']} · 429s {m['rate_limited']}")
+        flights = {name: sf.metrics() for name, sf in get_single_flights().items()}
+        st.caption(f"**coalesced**: {flights['llm']['saved_calls']} LLM calls saved (≈ {flights['llm']['saved_cost']} tokens) · "
+                   f"{flights['biblio']['saved_calls']} bibliography lookups saved · {flights['llm']['in_flight']} LLM calls in flight")
+
     st.divider()
     if st.button("♻️ Reset Session", use_container_width=True):
         for key in list(st.session_state.keys()):
@@ -478,7 +413,8 @@ st.markdown("### 🛠️ Configure Your Multi-Dimensional Cognitive Build")
 # ROW 1: AUTHORS
 r1_c1, r1_c2, r1_c3 = st.columns([1, 2, 1])
 with r1_c2:
-    target_authors = st.text_input("👤 Research Authors:", placeholder="Karl Petrič, Samo Kralj, Teodor Petrič", key="target_authors_key")
+    target_authors = st.text_input("👤 Research Authors:", placeholder="Karl Petrič, Samo Kralj, Teodor Petrič", key="target_authors_key",
+                                   on_change=prefetch_authors)
     st.caption("Active bibliographic analysis via ORCID (includes publication years).")
 
 # ROW 2: CORE CONFIG (Minimal settings, specific fields)
@@ -486,8 +422,7 @@ r2_c1, r2_c2, r2_c3 = st.columns(3)
 with r2_c1:
     sel_profiles = st.multiselect("1. User Profiles:", list(KNOWLEDGE_BASE["User profiles"].keys()), default=["Adventurers"])
 with r2_c2:
-    all_sciences = sorted(list(KNOWLEDGE_BASE["Science fields"].keys()))
-    sel_sciences = st.multiselect("2. Science Fields:", all_sciences, default=["Physics", "Psychology", "Sociology"])
+    sel_sciences = st.multiselect("2. Science Fields:", SCIENCE_FIELDS_SORTED, default=["Physics", "Psychology", "Sociology"])
 with r2_c3:
     expertise = st.select_slider("3. Expertise Level:", options=["Novice", "Intermediate", "Expert"], value=st.session_state.expertise_val)
 
@@ -505,16 +440,13 @@ r4_c1, r4_c2, r4_c3 = st.columns(3)
 with r4_c1:
     sel_approaches = st.multiselect("7. mental approaches:", KNOWLEDGE_BASE["mental approaches"], default=["Perspective shifting"])
 
-agg_meth, agg_tool = [], []
-for s in sel_sciences:
-    if s in KNOWLEDGE_BASE["Science fields"]:
-        agg_meth.extend(KNOWLEDGE_BASE["Science fields"][s]["methods"])
-        agg_tool.extend(KNOWLEDGE_BASE["Science fields"][s]["tools"])
+# Metode in orodja izbranih polj iz vnaprej zgrajenega indeksa (predpomnjeno po naboru polj).
+agg_meth, agg_tool = field_options(tuple(sel_sciences))
 
 with r4_c2:
-    sel_methods = st.multiselect("8. Methodologies:", sorted(list(set(agg_meth))), default=[])
+    sel_methods = st.multiselect("8. Methodologies:", agg_meth, default=[])
 with r4_c3:
-    sel_tools = st.multiselect("9. Specific Tools:", sorted(list(set(agg_tool))), default=[])
+    sel_tools = st.multiselect("9. Specific Tools:", agg_tool, default=[])
 
 st.divider()
 
@@ -532,197 +464,275 @@ with col_inq_idea:
                              height=150, key="idea_query_key")
 
 with col_inq_attach:
-    uploaded_file = st.file_uploader("📂 Attach .txt (max 2MB):", type=['txt'], help="Append a text file as supplementary context for your inquiry.")
-    file_attachment_content = ""
-    if uploaded_file is not None:
-        if uploaded_file.size > 2 * 1024 * 1024:
-            st.error("File exceeds 2MB limit.")
-        else:
-            file_attachment_content = uploaded_file.read().decode("utf-8")
-            st.success(f"File attached: {uploaded_file.name}")
+    uploaded_files = st.file_uploader(f"📂 Attach .txt files (max {MAX_ATTACHMENT_BYTES // (1024 * 1024)} MB each):", type=['txt', 'md'],
+                                      accept_multiple_files=True, help="Append text files as supplementary context for your inquiry.")
+    attach_token_budget = st.select_slider("Attachment token budget:", options=[500, 1000, 2000, 4000, 8000], value=2000, help="Only the excerpts most relevant to your inquiries are sent, up to this many tokens.")
+    attach_mode = st.radio("Attachment handling:", ["Relevant excerpts", "Whole-document digest"], horizontal=True,
+                           help="The digest summarizes every part of the files in parallel on Execute and is cached per file set.")
+    # Seja hrani le metapodatke prepisanih datotek (po file_id); besedilo nastane šele ob zagonu sinteze.
+    spooled_uploads = st.session_state.setdefault("spooled_uploads", {})
+    attachments, total_bytes = [], 0
+    for upload in uploaded_files or []:
+        if upload.size > MAX_ATTACHMENT_BYTES or total_bytes + upload.size > MAX_ATTACHMENTS_TOTAL:
+            st.error(f"{upload.name} exceeds the attachment size limit and was skipped.")
+            continue
+        spooled = spooled_uploads.get(upload.file_id)
+        if spooled is None or not os.path.exists(spooled.path):
+            spooled = spooled_uploads[upload.file_id] = spool_upload(upload, UPLOAD_DIR, upload.name)
+        attachments.append(spooled)
+        total_bytes += spooled.size
+    for stale in set(spooled_uploads) - {u.file_id for u in uploaded_files or []}:
+        del spooled_uploads[stale]
+    if attachments:
+        encodings = ", ".join(sorted({a.encoding for a in attachments}))
+        st.success(f"{len(attachments)} file(s) attached · {total_bytes / 1024:.0f} KB · {encodings}")
 
 # Combined Logic for Context processing
-processed_query_context = f"""
-[PRIMARY SYNTHESIS INQUIRY]: {user_query}
-[IDEA PRODUCTION INQUIRY]: {idea_query}
-"""
-if file_attachment_content:
-    processed_query_context += f"\n\n[SUPPLEMENTAL DATA FROM ATTACHMENT]:\n{file_attachment_content}"
+attachment_digest_mode = bool(attachments) and attach_mode == "Whole-document digest"
+if attachment_digest_mode:
+    # Povzetek potrebuje LLM klice, zato nastane šele ob zagonu sinteze.
+    with col_inq_attach:
+        st.caption(f"≈ {-(-total_bytes // (DIGEST_CHUNK_TOKENS * 4))} section(s) will be summarized into ≈ {attach_token_budget} tokens on Execute.")
+elif attachments:
+    with col_inq_attach:
+        st.caption(f"The excerpts most relevant to your inquiries (≈ {attach_token_budget} tokens) are selected on Execute.")
+processed_query_context = build_query_context(user_query, idea_query)
 
 # =========================================================
 # 3. JEDRO SINTEZE: GROQ AI + INTERCONNECTED 18D GRAPH
 # =========================================================
-if st.button("🚀 Execute Multi-Dimensional Synthesis", use_container_width=True):
+execute_clicked = st.button("🚀 Execute Multi-Dimensional Synthesis", use_container_width=True)
+synthesis_trace = None
+
+
+def span_table(records):
+    """Razponi kot vrstice tabele; podrejene stopnje so zamaknjene pod starša."""
+    depth = {}
+    rows = []
+    for r in records:
+        depth[r["name"]] = depth.get(r["parent"], -1) + 1 if r["parent"] else 0
+        tokens = "/".join(str(r[k]) for k in ("prompt_tokens", "completion_tokens") if r.get(k) is not None)
+        details = {k: v for k, v in r.items() if k not in (
+            "name", "parent", "start_ms", "duration_ms", "bytes", "prompt_tokens", "completion_tokens", "trace_id", "created")}
+        rows.append({
+            "stage": "\u2003" * depth[r["name"]] + r["name"], "start_ms": r["start_ms"], "duration_ms": r["duration_ms"],
+            "bytes": r.get("bytes"), "tokens (in/out)": tokens, "details": ", ".join(f"{k}={v}" for k, v in details.items()),
+        })
+    return rows
+
+
+def expand_selected_cluster():
+    """Odpre naslednjo stran članov izbrane gruče."""
+    expanded, pick = st.session_state.lod_expanded, st.session_state.lod_pick
+    expanded[pick] = expanded.get(pick, 0) + LOD_PAGE
+
+
+def lod_controls(graph):
+    """Gruče velikega grafa in izbira, katere so odprte; vrne (vidni graf, velikosti meta-vozlišč).
+
+    Stanje odprtih gruč je v seji in se ponastavi, ko se spremeni graf ali način združevanja.
+    """
+    col_mode, col_pick, col_more, col_reset = st.columns([1, 2, 1, 1])
+    with col_mode:
+        method = st.radio("Cluster by:", ["community", "type"], horizontal=True, key="lod_method")
+    clusters = cluster_graph(graph, method)
+    state_key = (graph_hash(graph), method)
+    if st.session_state.get("lod_key") != state_key:
+        st.session_state.lod_key, st.session_state.lod_expanded = state_key, {}
+    expanded = st.session_state.lod_expanded
+    with col_pick:
+        by_id = {c.id: c for c in clusters}
+        st.selectbox("Cluster:", list(by_id), key="lod_pick",
+                     format_func=lambda cid: f"{by_id[cid].label} ({len(by_id[cid].members)} nodes, {min(expanded.get(cid, 0), len(by_id[cid].members))} shown)")
+    # Povratna klica se izvedeta pred ponovnim izrisom, zato so števci v izbirniku sveži.
+    with col_more:
+        st.write("")
+        st.button("➕ Expand / load more", use_container_width=True, on_click=expand_selected_cluster)
+    with col_reset:
+        st.write("")
+        st.button("➖ Collapse all", use_container_width=True, on_click=lambda: st.session_state.lod_expanded.clear())
+    view, sizes, stats = lod_view(graph, clusters, expanded)
+    st.caption(f"🔭 {len(graph.nodes)} nodes in {stats['clusters']} clusters · showing {stats['visible_nodes']} "
+               f"({stats['collapsed']} collapsed, {stats['hidden_nodes']} nodes inside them) · "
+               f"{stats['edges']} of {stats['edges_total']} edges. Hexagons are clusters sized by membership.")
+    return view, sizes
+
+
+def render_synthesis_result(result, trace=NULL_TRACE):
+    """Izriše rezultat sinteze (besedilo, graf, metapodatke); deluje tudi brez klica modela.
+
+    Ob izvedbi sinteze se v `trace` zapišeta še postavitev in izris grafa.
+    """
+    st.subheader("📊 Synthesis Output")
+    source = st.session_state.get("live_result_source")
+    if source == "history":
+        st.caption(f"🕘 Loaded from history · {datetime.fromtimestamp(st.session_state.live_result_created).strftime('%Y-%m-%d %H:%M')}")
+    elif result.cached:
+        cached_at = datetime.fromtimestamp(result.cached_at).strftime("%Y-%m-%d %H:%M")
+        st.markdown(f'<div class="cache-hit-badge">⚡ Cached response · {cached_at}</div>', unsafe_allow_html=True)
+    elif "ttft_s" in result.timings:
+        graph_note = f" · graph in {result.timings['graph_llm_s']:.1f}s (parallel)" if "graph_llm_s" in result.timings else ""
+        st.caption(f"⏱️ First token after {result.timings['ttft_s']:.2f}s · completed in {result.timings['llm_s']:.1f}s{graph_note}")
+
+    # Koncepti -> Google Search + ID značka, avtorji -> Google Search (označeno v jedru).
+    st.markdown(result.markdown, unsafe_allow_html=True)
+
+    # --- VIZUALIZACIJA (Interconnected Graph) ---
+    graph = result.graph
+    if GRAPH_JSON_MARKER in result.text:
+        if graph is not None and graph.nodes:
+            st.subheader("🕸️ Integrated Architectural Semantic Network")
+            st.caption(f"{result.logic_type} utilizing IMA and MA Logic")
+            if graph.repaired:
+                st.caption("⚠️ Graph JSON was truncated or malformed and has been repaired.")
+            fixes = describe_report(result.graph_report) if result.graph_report else ""
+            if fixes:
+                st.caption(f"🧹 Graph normalized: {fixes}.")
+            sizes = None
+            if len(graph.nodes) > LOD_NODE_THRESHOLD:
+                with trace.span("ui.lod", parent="ui", nodes=len(graph.nodes)) as sp:
+                    graph, sizes = lod_controls(graph)
+                    sp["visible_nodes"] = len(graph.nodes)
+            with trace.span("ui.layout", parent="ui", nodes=len(graph.nodes)):
+                positions, layout_info = compute_layout(graph, logic_type=result.logic_type)
+            st.caption(f"📐 {layout_info['mode'].capitalize()} layout · {len(graph.nodes)} nodes · "
+                       f"{layout_info['seconds'] * 1000:.0f} ms{' (cached)' if layout_info['cached'] else ''}")
+            with trace.span("ui.cytoscape", parent="ui") as sp:
+                elements = build_cytoscape_elements(graph, positions, sizes)
+                sp["bytes"] = render_cytoscape_network(elements, "semantic_viz_full")
+        else:
+            details = f" ({'; '.join(graph.warnings)})" if graph is not None and graph.warnings else ""
+            st.warning(f"Graph data could not be parsed{details}.")
+
+    if result.biblio:
+        with st.expander("📚 View Metadata Fetched from Research Databases"):
+            st.text(result.biblio)
+
+    if result.trace is not None:
+        with st.expander("🩺 Diagnostics"):
+            st.dataframe(span_table(result.trace.records()), use_container_width=True, hide_index=True)
+            st.caption(f"Trace {result.trace.trace_id} · stages nested under their parent are indented")
+
+    with st.expander("🧮 Prompt Size Report"):
+        prompt_variant = "prose" if result.graph_mode == "parallel" else "inline"
+        report = prompt_token_report(result.prompt_sections, result.query_context, prompt_variant)
+        st.dataframe(report, use_container_width=True, hide_index=True)
+        st.caption(f"≈ {sum(r['tokens_est'] for r in report)} input tokens · static prefix {len(PROMPT_PREFIXES[prompt_variant])} chars (identical across requests)"
+                   + (" · graph built by a separate request" if result.graph_mode == "parallel" else ""))
+
+
+if execute_clicked:
     if not api_key: st.error("Missing Groq API Key. Please provide your own key in the sidebar.")
     elif not user_query and not idea_query: st.warning("Please provide at least one inquiry.")
     else:
         try:
-            # --- DEFINE LOGIC FLAGS ---
-            full_text_input = (user_query + " " + idea_query).lower()
-            
-            # Identify if the demand involves production
-            is_idea_mode = (idea_query.strip() != "") or ("create useful ideas" in full_text_input) or ("innovative ideas" in full_text_input)
-            
-            # Determine logic type based on specific demands
-            trigger_strict_hier = "use strict hierarchical logic"
-            trigger_relational = "use relational logic"
-            
-            if trigger_strict_hier in full_text_input:
-                logic_type = "Strict hierarchical logic"
-                logic_desc = "Uporabi IZKLJUČNO hierarhične relacije: TT (Top Term), BT (Broader Term), NT (Narrower Term). Fokus na vertikalni taksonomiji."
-            elif trigger_relational in full_text_input:
-                logic_type = "Relational logic"
-                logic_desc = "Uporabi IZKLJUČNO lateralne relacije: AS (Associative), EQ (Equivalent), IN (Inheritance/Class). Fokus na mrežni povezanosti."
-            else:
-                logic_type = "Hierarchical associative logic"
-                logic_desc = "Uporabi CELOTEN nabor relacij: TT (Top Term), BT (Broader Term), NT (Narrower Term), RT (Related Term), AS (Associative), EQ (Equivalent) in IN (Inheritance/Instance)."
-
-            # --- STEP 2: SUPERIOR DUAL-ARCHITECTURE CONNECTION ---
-            # Explicit separation of instructions for the Language Model
-            metamodel_instruction = f"MANDATORY IMA ARCHITECTURE INTEGRATION (IMA + SPECIAL ADD-ON): {json.dumps(HUMAN_THINKING_METAMODEL)}"
-            mental_approaches_instruction = f"MANDATORY MENTAL APPROACHES DIAGRAM LOGIC (MA): {json.dumps(MENTAL_APPROACHES_ONTOLOGY)}"
-            
-            idea_production_prompt = ""
+            synthesis_config = SynthesisConfig(
+                sciences=sel_sciences, profiles=sel_profiles, expertise=expertise, models=sel_models,
+                paradigms=sel_paradigms, goal_context=goal_context, approaches=sel_approaches,
+                methods=sel_methods, tools=sel_tools, authors=target_authors,
+                user_query=user_query, idea_query=idea_query, attachment_token_budget=attach_token_budget,
+                attachment_mode="digest" if attachment_digest_mode else "excerpts", ontology_token_budget=ontology_budget,
+                graph_mode="parallel" if parallel_graph else "inline", idea_candidates=idea_candidates,
+            )
+            is_idea_mode, _, _ = resolve_logic_mode(user_query, idea_query)
             if is_idea_mode:
-                idea_production_prompt = """
-                *** SUPERIOR IDEA PRODUCTION MODE ACTIVE ***
-                You are now expected to PERFORM KNOWLEDGE SYNTHESIS AND PRODUCE NEW USEFUL INNOVATIVE IDEAS.
-                Shift from descriptive analysis to RADICAL INNOVATION. 
-                Use nodes like 'Conflict situation', 'Problem', and 'Mental approaches' (e.g., Perspective shifting, Bipolarity) to:
-                1. Forge entirely new cross-disciplinary theories.
-                2. Design novel solutions that don't exist in current literature.
-                3. Propose 'Useful Innovative Ideas' that solve the stated problem using the rules provided.
-                Your response must emphasize original conceptual synthesis AND generative creativity.
-                """
                 st.markdown("""<div class="idea-mode-box">✨ Production & Synthesis Mode engaged: Generating novel innovative concepts using separated Metamodel and Mental Logic.</div>""", unsafe_allow_html=True)
-            else:
-                idea_production_prompt = """
-                *** KNOWLEDGE SYNTHESIS MODE ***
-                Focus strictly on existing knowledge structures, taxonomy, and scientific interconnectedness.
-                """
-
-            biblio = fetch_author_bibliographies(target_authors) if target_authors else ""
-            client = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
-            
-            # SISTEMSKO NAVODILO (Full dissertation requirement)
-            sys_prompt = f"""
-            You are the SIS Synthesizer. Perform an exhaustive dissertation (1500+ words).
-            
-            CONNECTION TO SEPARATED ARCHITECTURES:
-            - INTEGRATED METAMODEL (IMA): Apply the structural reasoning logic of Identity, Rules, and Goals.
-            - MENTAL APPROACHES (MA): Apply the cognitive transformation logic of Dialectics and Perspective Shifting.
-            
-            DATA STRUCTURES TO INTEGRATE:
-            - {metamodel_instruction}
-            - {mental_approaches_instruction}
 
-            MANDATORY ARCHITECTURAL LOGIC: {logic_type}
-            {logic_desc}
-
-            {idea_production_prompt}
-            
-            FIELDS: {", ".join(sel_sciences)}. CONTEXT AUTHORS: {biblio}.
-            
-            THESAURUS ALGORITHM & UML LOGIC. Ensure dense interconnection.
-            
-            GEOMETRICAL VISUALIZATION TASK:
-            - Analyze user inquiry for shape preferences. Default shape is 'ellipse'. 
-            - Use colors and shapes from the IMA and MA contexts provided.
-            
-            STRICT FORMATTING & SPACE ALLOCATION:
-            - Focus 100% of the textual content on deep research and interdisciplinary synergy.
-            - DO NOT explain the visualization in the text.
-            - End with '### SEMANTIC_GRAPH_JSON' followed by valid JSON only.
-            
-            GRAPH DENSITY REQUIREMENT:
-            - GENERATE A DENSE SEMANTIC NETWORK WITH APPROXIMATELY 30-40 INTERCONNECTED NODES.
-            - Every node must strictly follow the Color/Shape logic from the contexts.
-            
-            JSON schema: {{"nodes": [{{"id": "n1", "label": "Text", "type": "Root|Branch|Leaf|Class", "color": "#hex", "shape": "triangle|rectangle|ellipse|diamond"}}], "edges": [{{"source": "n1", "target": "n2", "rel_type": "BT|NT|AS|TT|outcome_of"}}]}}
-            """
-            
+            client = get_client(api_key)
+            run_trace = Trace()
+            if attachments:
+                attachment_hash = attachments_key(attachments)
+                with run_trace.span("attachment.read", bytes=total_bytes, files=len(attachments)):
+                    attachment_text = read_attachments(attachments)
+            if attachment_digest_mode:
+                digest_progress = st.progress(0.0, text="Summarizing attachment sections...")
+                attachment_excerpt, digest_stats = attachment_digest(
+                    attachment_text, client, attach_token_budget, file_hash=attachment_hash,
+                    on_progress=lambda done, total: digest_progress.progress(done / total, text=f"Summarized {done}/{total} sections"),
+                    trace=run_trace,
+                )
+                digest_progress.empty()
+                digest_note = f"Attachment digest: {digest_stats['chunks']} section(s) → ≈ {estimate_tokens(attachment_excerpt)} tokens"
+                if digest_stats["cached"]:
+                    digest_note += " · cached"
+                elif digest_stats["failed"]:
+                    digest_note += f" · {digest_stats['failed']} section(s) kept as raw text"
+                st.caption(digest_note)
+            elif attachments:
+                # Namesto celotnih datotek pošljemo le najbolj relevantne odseke (BM25) znotraj proračuna.
+                with run_trace.span("attachment.select", bytes=total_bytes):
+                    attachment_index = get_attachment_index(attachment_hash, attachment_text)
+                    attachment_excerpt, n_selected, n_chunks = select_relevant_chunks(attachment_index, f"{user_query} {idea_query}", attach_token_budget)
+                st.caption(f"📎 {n_selected} of {n_chunks} attachment excerpts selected (≈ {estimate_tokens(attachment_excerpt)} tokens).")
+            if attachments:
+                processed_query_context = build_query_context(user_query, idea_query, attachment_excerpt)
+                del attachment_text
+
+            # Pretočni izpis je začasen; končni rezultat izriše render_synthesis_result.
+            stream_area = st.empty()
             with st.spinner('Synthesizing exhaustive interdisciplinary synergy (8–40s)...'):
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": processed_query_context}],
-                    temperature=0.75 if is_idea_mode else 0.45, 
-                    max_tokens=4000
+                result = run_synthesis(
+                    synthesis_config, client,
+                    on_prose=stream_area.markdown if stream_output else None,
+                    query_context=processed_query_context,
+                    use_response_cache=use_response_cache, force_fresh=force_fresh, trace=run_trace,
+                    biblio_prefetch=st.session_state.biblio_prefetcher,
                 )
-                
-                text_out = response.choices[0].message.content
-                parts = text_out.split("### SEMANTIC_GRAPH_JSON")
-                main_markdown = parts[0]
-                
-                # --- PROCESIRANJE BESEDILA (Google Search + Authors + Anchors) ---
-                if len(parts) > 1:
-                    try:
-                        g_json = json.loads(re.search(r'\{.*\}', parts[1], re.DOTALL).group())
-                        # 1. Koncepti -> Google Search + ID značka (Anchor linking logic)
-                        for n in g_json.get("nodes", []):
-                            lbl, nid = n["label"], n["id"]
-                            g_url = urllib.parse.quote(lbl)
-                            pattern = re.compile(re.escape(lbl), re.IGNORECASE)
-                            replacement = f'<span id="{nid}"><a href="https://www.google.com/search?q={g_url}" target="_blank" class="semantic-node-highlight">{lbl}<i class="google-icon">↗</i></a></span>'
-                            main_markdown = pattern.sub(replacement, main_markdown, count=1)
-                        
-                        # 2. Avtorji -> Google Search Link
-                        if target_authors:
-                            for auth_name in target_authors.split(","):
-                                auth_stripped = auth_name.strip()
-                                if auth_stripped:
-                                    a_url = urllib.parse.quote(auth_stripped)
-                                    a_pattern = re.compile(re.escape(auth_stripped), re.IGNORECASE)
-                                    a_rep = f'<a href="https://www.google.com/search?q={a_url}" target="_blank" class="author-search-link">{auth_stripped}<i class="google-icon">↗</i></a>'
-                                    main_markdown = a_pattern.sub(a_rep, main_markdown)
-                    except: pass
-
-                st.subheader("📊 Synthesis Output")
-                st.markdown(main_markdown, unsafe_allow_html=True)
-
-                # --- VIZUALIZACIJA (Interconnected Graph) ---
-                if len(parts) > 1:
-                    try:
-                        g_json = json.loads(re.search(r'\{.*\}', parts[1], re.DOTALL).group())
-                        st.subheader("🕸️ Integrated Architectural Semantic Network")
-                        st.caption(f"{logic_type} utilizing IMA and MA Logic")
-                        
-                        elements = []
-                        for n in g_json.get("nodes", []):
-                            level = n.get("type", "Branch")
-                            size = 100 if level == "Class" else (90 if level == "Root" else (70 if level == "Branch" else 50))
-                            color = n.get("color", "#2a9d8f")
-                            shape = n.get("shape", "ellipse")
-                            elements.append({"data": {
-                                "id": n["id"], "label": n["label"], "color": color,
-                                "size": size, "shape": shape, "z_index": 10 if level in ["Root", "Class"] else 1
-                            }})
-                        for e in g_json.get("edges", []):
-                            elements.append({"data": {
-                                "source": e["source"], "target": e["target"], "rel_type": e.get("rel_type", "AS")
-                            }})
-                        render_cytoscape_network(elements, "semantic_viz_full")
-                    except: st.warning("Graph data could not be parsed.")
-
-                if biblio:
-                    with st.expander("📚 View Metadata Fetched from Research Databases"):
-                        st.text(biblio)
-                
+            stream_area.empty()
+            # Rezultat ostane v seji (preživi ponovne zagone) in se doda v trajno zgodovino.
+            st.session_state.live_result = result
+            st.session_state.live_result_source = "live"
+            st.session_state.live_result_id = get_history().append(result.to_record(), synthesis_config.to_record(), history_owner())
+            synthesis_trace = result.trace
         except Exception as e:
             st.error(f"Synthesis failed: {e}")
+        else:
+            if result.graph is not None and result.graph.nodes:
+                # Sinteza je že shranjena; napaka skupne shrambe je le opozorilo (kot v sis_batch).
+                try:
+                    with run_trace.span("graph.store", nodes=len(result.graph.nodes), edges=len(result.graph.edges)):
+                        get_graph_store().merge_graph(st.session_state.live_result_id, result.graph,
+                                                      (user_query or idea_query)[:80], result.logic_type, owner=history_owner())
+                    graph_store_stats.clear()
+                except Exception as e:
+                    st.warning(f"The graph could not be added to the merged knowledge graph: {e}")
+
+if st.session_state.get("live_result") is not None:
+    render_synthesis_result(st.session_state.live_result, trace=synthesis_trace or NULL_TRACE)
+    if synthesis_trace is not None and log_spans:
+        synthesis_trace.append_jsonl(SPANS_FILE)
+
+# --- ZDRUŽENO OMREŽJE VSEH SINTEZ (SQLite shramba) ---
+with st.expander("🗄️ Merged Knowledge Graph"):
+    store = get_graph_store()
+    store_stats = graph_store_stats()
+    st.caption(f"{store_stats['concepts']} concepts · {store_stats['edges']} relations · {store_stats['runs']} syntheses merged")
+    store_query = st.text_input("Find a concept:", key="store_query", placeholder="e.g. cognition")
+    matches = store.search(store_query, owner=history_owner()) if store_query.strip() else []
+    if store_query.strip() and not matches:
+        st.caption("No matching concepts.")
+    if matches:
+        picked_concept = st.selectbox("Concept:", [r["label"] for r in matches], key="store_pick",
+                                      format_func=lambda label: f"{label} ({next(r['mentions'] for r in matches if r['label'] == label)} syntheses)")
+        col_nb, col_runs = st.columns([3, 2])
+        with col_nb:
+            neighbors = store.neighbors(picked_concept, owner=history_owner())
+            st.dataframe([{"direction": d, "relation": rel, "concept": label, "weight": w} for d, rel, label, w in neighbors],
+                         use_container_width=True, hide_index=True)
+        with col_runs:
+            for run in store.runs_mentioning(picked_concept, limit=10, owner=history_owner()):
+                st.write(f"• {datetime.fromtimestamp(run['created']).strftime('%Y-%m-%d %H:%M')} · {run['title'] or run['id']}")
+        store_hops = st.slider("Neighbourhood depth (hops):", 1, 3, 1, key="store_hops")
+        if st.checkbox("Show neighbourhood graph", key="store_show_graph"):
+            sub = store.k_hop(picked_concept, store_hops, max_nodes=LOD_NODE_THRESHOLD, owner=history_owner())
+            sub_positions, _ = compute_layout(sub)
+            render_cytoscape_network(build_cytoscape_elements(sub, sub_positions), "store_viz")
+            st.caption(f"{len(sub.nodes)} concepts, {len(sub.edges)} relations (strongest first, capped at {LOD_NODE_THRESHOLD}).")
 
 # PODNOŽJE (ZAHVALA IN VERZIJA)
 st.divider()
 st.caption("SIS Universal Knowledge Synthesizer | v22.1 Separation Architecture Engine | 2026")
 
-
-
-
-
-
-
-
-
-
-
-
-
+# --- MERITEV TRAJANJA PONOVNEGA ZAGONA (brez zagonov s sintezo) ---
+if not execute_clicked:
+    st.session_state.setdefault("rerun_ms", deque(maxlen=100)).append((time.perf_counter() - _rerun_started) * 1000)
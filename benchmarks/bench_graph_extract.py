@@ -0,0 +1,57 @@
+"""Mikro-meritev razčlenjevanja SEMANTIC_GRAPH_JSON na velikih grafih.
+
+Primerja prejšnji pristop (dvakratni požrešni regex + json.loads) z enkratnim
+`extract_semantic_graph`. Zagon: python benchmarks/bench_graph_extract.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sis_graph import extract_semantic_graph  # noqa: E402
+
+TYPES = ["Root", "Branch", "Leaf", "Class"]
+RELS = ["TT", "BT", "NT", "RT", "AS", "EQ", "IN"]
+
+
+def make_graph(n_nodes, avg_degree=2, seed=7):
+    rnd = random.Random(seed)
+    nodes = [{"id": f"n{i}", "label": f"Concept {i}", "type": rnd.choice(TYPES), "color": "#00B0F0", "shape": "ellipse"} for i in range(n_nodes)]
+    edges = [{"source": f"n{rnd.randrange(n_nodes)}", "target": f"n{rnd.randrange(n_nodes)}", "rel_type": rnd.choice(RELS)} for _ in range(n_nodes * avg_degree)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def legacy_parse(tail):
+    # Prejšnja koda je graf razčlenila dvakrat (označevanje + vizualizacija).
+    for _ in range(2):
+        g_json = json.loads(re.search(r'\{.*\}', tail, re.DOTALL).group())
+    return g_json
+
+
+def run(sizes=(1000, 5000, 10000), repeat=5):
+    print(f"{'nodes':>7} {'variant':<16} {'legacy ms':>10} {'extract ms':>11}")
+    for n in sizes:
+        payload = json.dumps(make_graph(n))
+        variants = {
+            "clean": "\n" + payload + "\n",
+            "trailing text": "\n```json\n" + payload + "\n```\nNote: {see above}.",
+            "truncated": "\n" + payload[: int(len(payload) * 0.9)],
+        }
+        for name, tail in variants.items():
+            try:
+                legacy_parse(tail)
+                legacy_ms = min(timeit.repeat(lambda: legacy_parse(tail), number=1, repeat=repeat)) * 1000
+                legacy_col = f"{legacy_ms:10.2f}"
+            except (ValueError, AttributeError):
+                legacy_col = f"{'fails':>10}"
+            extract_ms = min(timeit.repeat(lambda: extract_semantic_graph(tail), number=1, repeat=repeat)) * 1000
+            graph = extract_semantic_graph(tail)
+            print(f"{n:>7} {name:<16} {legacy_col} {extract_ms:11.2f}   ({len(graph.nodes)} nodes, {len(graph.edges)} edges)")
+
+
+if __name__ == "__main__":
+    run()
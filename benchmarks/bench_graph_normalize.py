@@ -0,0 +1,45 @@
+"""Mikro-meritev normalizacije grafa (`sis_ontology.normalize_graph`) na velikih grafih.
+
+Graf ima podvojene oznake, viseče povezave, nedovoljene relacije in barve izven palete,
+kot jih vračajo paketna opravila. Čas mora rasti linearno s številom povezav.
+Zagon: python benchmarks/bench_graph_normalize.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sis_core import HUMAN_THINKING_METAMODEL, MENTAL_APPROACHES_ONTOLOGY  # noqa: E402
+from sis_graph import SemanticGraph  # noqa: E402
+from sis_ontology import OntologyIndex, normalize_graph  # noqa: E402
+
+RELATIONS = ["BT", "NT", "TT", "AS", "RT", "EQ", "IN", "outcome_of", "related term"]
+
+
+def make_graph(n_edges, seed=5):
+    rnd = random.Random(seed)
+    n_nodes = max(10, n_edges // 4)
+    concepts = list(HUMAN_THINKING_METAMODEL["nodes"]) + list(MENTAL_APPROACHES_ONTOLOGY["nodes"])
+    nodes = []
+    for i in range(n_nodes):
+        label = rnd.choice(concepts) if rnd.random() < 0.05 else f"Concept {rnd.randrange(int(n_nodes * 0.9))}"
+        nodes.append({"id": f"n{i}", "label": label, "color": "#%06x" % rnd.randrange(1 << 24)})
+    edges = [{"source": f"n{rnd.randrange(int(n_nodes * 1.02))}", "target": f"n{rnd.randrange(n_nodes)}",
+              "rel_type": rnd.choice(RELATIONS)} for _ in range(n_edges)]
+    return SemanticGraph.from_dict({"nodes": nodes, "edges": edges})
+
+
+def run(sizes=(100, 1000, 10000, 50000), repeat=3):
+    index = OntologyIndex(HUMAN_THINKING_METAMODEL, MENTAL_APPROACHES_ONTOLOGY)
+    print(f"{'edges':>6} {'nodes out':>9} {'edges out':>9} {'ms':>8} {'µs/edge':>8}")
+    for n in sizes:
+        graph = make_graph(n)
+        ms = min(timeit.repeat(lambda: normalize_graph(graph, "Relational logic", index), number=1, repeat=repeat)) * 1000
+        out, _ = normalize_graph(graph, "Relational logic", index)
+        print(f"{n:>6} {len(out.nodes):>9} {len(out.edges):>9} {ms:8.2f} {ms * 1000 / n:8.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,36 @@
+"""Meritev trajanja interaktivnih ponovnih zagonov Streamlit skripte (brez klica modela).
+
+Uporabi `streamlit.testing.v1.AppTest`, ki skripto izvede enako kot strežnik,
+in spreminja gradnike kot uporabnik. Zagon: python benchmarks/bench_rerun.py
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from sis_trace import percentile  # noqa: E402
+
+FIELD_SETS = [["Physics"], ["Physics", "Ecology"], ["Psychology", "Sociology", "Economics"], ["Mathematics"]]
+
+
+def run(reruns=40):
+    at = AppTest.from_file(os.path.join(ROOT, "SIS_ApplicationUKSNew.py"), default_timeout=60)
+    at.run()  # prvi zagon: uvozi, predpomnilniki, indeksi
+    samples = []
+    for i in range(reruns):
+        at.multiselect[1].set_value(FIELD_SETS[i % len(FIELD_SETS)])
+        t0 = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - t0) * 1000)
+    in_script = list(at.session_state["rerun_ms"])
+    print(f"AppTest round trip: median {statistics.median(samples):.1f} ms, p95 {percentile(samples, 0.95):.1f} ms")
+    print(f"script body:        median {statistics.median(in_script):.1f} ms, p95 {percentile(in_script, 0.95):.1f} ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,280 @@
+"""Celovit merilni nabor brez omrežja (Groq, ORCID in Semantic Scholar so lokalni nadomestki).
+
+Scenariji: zajem bibliografij (1–50 avtorjev, hladen in topel predpomnilnik, vnaprejšnji zajem), gradnja
+navodila, izbira podgrafa ontologij, razčlenitev, normalizacija, označevanje, elementi,
+postavitev in gruče (LOD) grafa (30–10k vozlišč), celoten `run_synthesis` s pretokom in
+hkratni enaki zagoni več sej (združevanje klicev v teku) ter več kandidatov idej.
+Rezultati se zapišejo v JSON, ki ga je mogoče primerjati z drugo različico.
+
+Zagon:
+    python benchmarks/run_suite.py --output results.json
+    python benchmarks/run_suite.py --quick --compare baseline.json --threshold 1.25
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import StubConfig, start_stub_server, stub_environment, synthetic_completion  # noqa: E402
+
+GRAPH_SIZES = (30, 300, 3000, 10000)
+AUTHOR_COUNTS = (1, 10, 50)
+QUICK_GRAPH_SIZES = (30, 300)
+QUICK_AUTHOR_COUNTS = (1, 10)
+IDEA_CANDIDATES = 4
+BURST_SESSIONS = 12           # hkratnih sej z enako konfiguracijo
+PREFETCH_THINK_S = 1.0        # čas med vpisom avtorjev in klikom Execute
+
+
+def measure(fn, repeat, setup=None):
+    """Izvede `fn` `repeat`-krat (po neobveznem `setup`) in vrne čase v ms."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def summarize(scenario, params, samples, **extra):
+    samples = sorted(samples)
+    row = {"scenario": scenario, "params": params, "runs": len(samples),
+           "median_ms": round(statistics.median(samples), 3), "min_ms": round(samples[0], 3),
+           "max_ms": round(samples[-1], 3)}
+    row.update(extra)
+    return row
+
+
+def author_list(n):
+    # Vsak peti avtor nima ORCID zapisa, zato gre po Scholar poti.
+    return ", ".join(f"Scholar Author {i}" if i % 5 == 4 else f"Author {i}" for i in range(n))
+
+
+def run_suite(quick=False, latency=0.0, token_delay=0.0, repeat=5):
+    stub = StubConfig(latency=latency, token_delay=token_delay)
+    server, base_url = start_stub_server(stub)
+    os.environ.update(stub_environment(base_url))
+    os.environ["SIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="sis_bench_")
+    os.environ.setdefault("SIS_GROQ_RPM", "100000")
+    os.environ.setdefault("SIS_GROQ_TPM", "0")
+
+    import sis_core  # uvoz šele po nastavitvi okolja
+    from sis_graph import annotate_markdown, build_cytoscape_elements, extract_semantic_graph
+    from sis_layout import compute_layout
+    from sis_lod import LOD_NODE_THRESHOLD, cluster_graph, lod_view
+    from sis_ontology import normalize_graph
+
+    sizes = QUICK_GRAPH_SIZES if quick else GRAPH_SIZES
+    authors = QUICK_AUTHOR_COUNTS if quick else AUTHOR_COUNTS
+    results = []
+
+    # --- BIBLIOGRAFIJE ---
+    for n in authors:
+        names = author_list(n)
+        cold = measure(lambda: sis_core.fetch_author_bibliographies(names), repeat,
+                       setup=sis_core.invalidate_author_cache)
+        warm = measure(lambda: sis_core.fetch_author_bibliographies(names), repeat)
+        results.append(summarize("biblio_fetch_cold", {"authors": n}, cold))
+        results.append(summarize("biblio_fetch_warm", {"authors": n}, warm))
+        # Vnaprejšnji zajem: avtorji so vpisani PREFETCH_THINK_S pred izvedbo; meri se le čakanje ob izvedbi.
+        prefetchers = []
+
+        def typed_ahead():
+            sis_core.invalidate_author_cache()
+            prefetchers[:] = [sis_core.make_biblio_prefetcher()]
+            prefetchers[0].update(names)
+            time.sleep(PREFETCH_THINK_S)
+        prefetched = measure(lambda: prefetchers[0].collect(names, sis_core.BIBLIO_DEADLINE), repeat, setup=typed_ahead)
+        results.append(summarize("biblio_prefetch_execute", {"authors": n}, prefetched))
+
+    # --- NAVODILO ---
+    for n in authors:
+        biblio = sis_core.fetch_author_bibliographies(author_list(n))
+        samples = measure(lambda: sis_core.build_system_prompt(
+            "Hierarchical associative logic", sis_core.LOGIC_MODES["Hierarchical associative logic"],
+            False, ["Physics", "Psychology", "Sociology"], biblio), repeat * 20)
+        prompt, _ = sis_core.build_system_prompt("Relational logic", "", False, ["Physics"], biblio)
+        results.append(summarize("prompt_build", {"authors": n}, samples, prompt_chars=len(prompt)))
+
+    config = sis_core.SynthesisConfig(user_query="How do ethical rules shape decision-making in conflict situations?")
+    subgraphs, select_stats = config.ontology_subgraphs()
+    prompt, _ = sis_core.build_system_prompt("Relational logic", "", False, config.sciences, "", subgraphs, config.selections())
+    results.append(summarize("ontology_select", {"budget": config.ontology_token_budget},
+                             measure(config.ontology_subgraphs, repeat * 20), nodes=select_stats["nodes"], prompt_chars=len(prompt)))
+
+    # --- GRAF: razčlenitev, normalizacija, označevanje, elementi, postavitev ---
+    index = sis_core.get_ontology_index()
+    for n in sizes:
+        text = synthetic_completion(n)
+        prose, tail = text.split(sis_core.GRAPH_JSON_MARKER, 1)
+        graph = extract_semantic_graph(tail)
+        reps = repeat if n <= 3000 else max(1, repeat // 2)
+        results.append(summarize("graph_parse", {"nodes": n}, measure(lambda: extract_semantic_graph(tail), reps),
+                                 edges=len(graph.edges)))
+        results.append(summarize("graph_normalize", {"nodes": n},
+                                 measure(lambda: normalize_graph(graph, "Hierarchical associative logic", index), reps)))
+        results.append(summarize("annotate", {"nodes": n},
+                                 measure(lambda: annotate_markdown(prose, graph, author_list(10)), reps)))
+        positions, _ = compute_layout(graph, mode="force")
+        results.append(summarize("cytoscape_elements", {"nodes": n},
+                                 measure(lambda: json.dumps(build_cytoscape_elements(graph, positions)), reps)))
+        if n > LOD_NODE_THRESHOLD:
+            def fresh_lod():
+                from sis_lod import _cluster_cache
+                _cluster_cache.clear()
+            view, meta_sizes, _ = lod_view(graph, cluster_graph(graph))
+            results.append(summarize("lod_cluster_view", {"nodes": n},
+                                     measure(lambda: lod_view(graph, cluster_graph(graph)), reps, setup=fresh_lod),
+                                     payload_bytes=len(json.dumps(build_cytoscape_elements(view, None, meta_sizes)))))
+        for mode in ("force", "hierarchical"):
+            def fresh_layout():
+                from sis_layout import _layout_cache
+                _layout_cache.clear()
+            results.append(summarize(f"layout_{mode}", {"nodes": n},
+                                     measure(lambda: compute_layout(graph, mode=mode), max(1, reps // 2), setup=fresh_layout)))
+
+    # --- CELOTEN CEVOVOD (pretok prek lokalnega OpenAI strežnika) ---
+    client = sis_core.get_client("bench-key")
+    for n in sizes[:2]:
+        stub.n_nodes = n
+        for n_auth in authors[:2]:
+            config = sis_core.SynthesisConfig(user_query="How do networks shape cognition?", authors=author_list(n_auth))
+            timings = []
+
+            def run():
+                result = sis_core.run_synthesis(config, client, on_prose=lambda _text: None)
+                timings.append(result.timings)
+            samples = measure(run, repeat)
+            ttft = statistics.median(t["ttft_s"] for t in timings) * 1000
+            results.append(summarize("end_to_end_stream", {"nodes": n, "authors": n_auth}, samples,
+                                     ttft_median_ms=round(ttft, 3)))
+        # Primerjava: graf na koncu istega odgovora (en klic, proza in JSON zaporedno).
+        inline_config = sis_core.SynthesisConfig(user_query="How do networks shape cognition?", graph_mode="inline")
+        results.append(summarize("end_to_end_stream_inline_graph", {"nodes": n},
+                                 measure(lambda: sis_core.run_synthesis(inline_config, client, on_prose=lambda _text: None), repeat)))
+
+    # --- VEČ KANDIDATOV IDEJ: hkratni vzorci, nato lokalno združevanje (MinHash) ---
+    from sis_ideas import merge_candidates
+    stub.n_nodes = sizes[0]
+    for n_candidates in (1, IDEA_CANDIDATES):
+        config = sis_core.SynthesisConfig(idea_query="Create useful ideas linking networks and cognition",
+                                          idea_candidates=n_candidates)
+        results.append(summarize("idea_candidates_stream", {"candidates": n_candidates},
+                                 measure(lambda: sis_core.run_synthesis(config, client, on_prose=lambda _text: None), repeat)))
+    texts = [synthetic_completion(sizes[0], seed=i // 2).split(sis_core.GRAPH_JSON_MARKER)[0] for i in range(IDEA_CANDIDATES)]
+    fields = sis_core.field_terms(["Physics", "Psychology", "Sociology"])
+    _, merge_stats = merge_candidates(texts, fields)
+    results.append(summarize("ideas_merge", {"candidates": IDEA_CANDIDATES}, measure(lambda: merge_candidates(texts, fields), repeat),
+                             ideas=merge_stats["ideas"]))
+
+    # --- PRIPONKE: prepis, dekodiranje in indeks BM25 pri zgornji meji velikosti ---
+    import tracemalloc
+    from sis_attachments import build_chunk_index, select_relevant_chunks
+    from sis_ingest import MAX_ATTACHMENTS_TOTAL, read_attachments, spool_upload
+    sentence = b"Networks shape cognition through repeated social exchange and shared attention. "
+    payload = (sentence * (MAX_ATTACHMENTS_TOTAL // len(sentence) + 1))[:MAX_ATTACHMENTS_TOTAL]
+    with tempfile.TemporaryDirectory() as spool_dir:
+        attachment = spool_upload(io.BytesIO(payload), spool_dir, "bench.txt")
+
+        def ingest():
+            index = build_chunk_index(read_attachments([attachment]))
+            select_relevant_chunks(index, "How do networks shape cognition?", 2000)
+        tracemalloc.start()
+        ingest()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(summarize("attachment_index", {"bytes": MAX_ATTACHMENTS_TOTAL}, measure(ingest, repeat),
+                                 peak_mb=round(peak / (1024 * 1024), 1)))
+
+    # --- HKRATNI ENAKI KLIKI (delavnica): združevanje klicev v teku ---
+    from concurrent.futures import ThreadPoolExecutor
+    config = sis_core.SynthesisConfig(user_query="How do networks shape cognition?", authors=author_list(3))
+    for n_sessions in (1, BURST_SESSIONS):
+        before = dict(stub.requests)
+
+        def burst():
+            sis_core.invalidate_author_cache()
+            with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+                list(pool.map(lambda _: sis_core.run_synthesis(config, client, on_prose=lambda _text: None), range(n_sessions)))
+        samples = measure(burst, repeat)
+        results.append(summarize("concurrent_identical_stream", {"sessions": n_sessions}, samples,
+                                 llm_requests=(stub.requests["llm"] - before["llm"]) / repeat,
+                                 biblio_requests=(stub.requests["orcid"] + stub.requests["scholar"]
+                                                  - before["orcid"] - before["scholar"]) / repeat))
+
+    server.shutdown()
+    return {"meta": run_metadata(quick, latency, token_delay, repeat), "results": results,
+            "stub_requests": dict(stub.requests)}
+
+
+def run_metadata(quick, latency, token_delay, repeat):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick,
+            "stub_latency_s": latency, "stub_token_delay_s": token_delay, "repeat": repeat}
+
+
+def result_key(row):
+    return row["scenario"], json.dumps(row["params"], sort_keys=True)
+
+
+def compare(current, baseline, threshold):
+    """Vrne seznam vrstic, kjer je mediana počasnejša od osnove za več kot `threshold`-krat."""
+    base = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = base.get(result_key(row))
+        if old is None or old["median_ms"] <= 0:
+            continue
+        ratio = row["median_ms"] / old["median_ms"]
+        print(f"{row['scenario']:<22} {json.dumps(row['params']):<32} {old['median_ms']:>10.2f} -> {row['median_ms']:>10.2f} ms  x{ratio:.2f}")
+        if ratio > threshold and row["median_ms"] - old["median_ms"] > 1.0:  # ms šum ne šteje
+            regressions.append((row, old, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline SIS benchmark suite with local API stand-ins.")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write JSON results (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="small sizes only (30/300 nodes, 1/10 authors)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per HTTP request (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub delay between streamed chunks (s)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_suite(quick=args.quick, latency=args.latency, token_delay=args.token_delay, repeat=args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for row in report["results"]:
+        print(f"{row['scenario']:<22} {json.dumps(row['params']):<32} median {row['median_ms']:>10.2f} ms")
+    print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for row, old, ratio in regressions:
+            print(f"REGRESSION {row['scenario']} {row['params']}: x{ratio:.2f}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Lokalni nadomestki zunanjih storitev za merjenje brez omrežja.
+
+En HTTP strežnik ponuja:
+- `POST /v1/chat/completions` – OpenAI-združljiv odgovor (tudi pretočni SSE) s sintetičnim
+  ali posnetim besedilom in nastavljivo zakasnitvijo; v JSON načinu vrne samo graf, pri
+  navodilu brez oznake grafa pa samo disertacijo,
+- `GET /orcid/v3.0/search/`, `GET /orcid/v3.0/<id>/record` – ORCID v3.0,
+- `GET /scholar/graph/v1/paper/search` – Semantic Scholar.
+
+Samostojni zagon (aplikacija nato teče brez omrežja):
+    python benchmarks/stubs.py --port 8765 --latency 0.3 --token-delay 0.002
+    SIS_GROQ_BASE_URL=http://127.0.0.1:8765/v1 SIS_ORCID_API_URL=http://127.0.0.1:8765/orcid/v3.0 \\
+    SIS_SCHOLAR_API_URL=http://127.0.0.1:8765/scholar/graph/v1 streamlit run SIS_ApplicationUKSNew.py
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRAPH_JSON_MARKER = "### SEMANTIC_GRAPH_JSON"
+RELATIONS = ["BT", "NT", "TT", "AS", "RT", "EQ", "IN"]
+PALETTE = ["#A6A6A6", "#C6EFCE", "#92D050", "#FFFF00", "#00B0F0", "#F8CBAD", "#CCC0DA", "#2a9d8f"]
+WORDS = ("synthesis knowledge structure paradigm interdisciplinary cognition framework emergence "
+         "dialectic perspective hierarchy relation method evidence model system").split()
+
+
+def synthetic_graph(n_nodes, seed=0):
+    """Povezan graf z `n_nodes` vozlišči in ≈ 1,5 povezave na vozlišče."""
+    rnd = random.Random(seed)
+    nodes = [{"id": f"n{i}", "label": f"Concept {i}", "type": "Root" if i == 0 else rnd.choice(["Branch", "Leaf"]),
+              "color": rnd.choice(PALETTE), "shape": rnd.choice(["ellipse", "rectangle", "diamond"])} for i in range(n_nodes)]
+    edges = [{"source": f"n{rnd.randrange(i)}", "target": f"n{i}", "rel_type": rnd.choice(RELATIONS)} for i in range(1, n_nodes)]
+    edges += [{"source": f"n{rnd.randrange(n_nodes)}", "target": f"n{rnd.randrange(n_nodes)}", "rel_type": rnd.choice(RELATIONS)}
+              for _ in range(n_nodes // 2)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def synthetic_completion(n_nodes, words=1500, seed=0):
+    """Disertacija, ki omenja oznake vozlišč, in na koncu JSON graf (kot odgovor modela)."""
+    rnd = random.Random(seed)
+    vocab = WORDS + [f"Concept {i}" for i in range(min(n_nodes, 400))]
+    paragraphs = []
+    for _ in range(max(1, words // 120)):
+        paragraphs.append(" ".join(rnd.choice(vocab) for _ in range(120)) + ".")
+    prose = "## Synthesis\n\n" + "\n\n".join(paragraphs)
+    return f"{prose}\n\n{GRAPH_JSON_MARKER}\n{json.dumps(synthetic_graph(n_nodes, seed))}"
+
+
+def fake_orcid_id(name):
+    digits = str(int(hashlib.sha256(name.encode("utf-8")).hexdigest()[:12], 16)).rjust(16, "0")[:16]
+    return "-".join(digits[i:i + 4] for i in range(0, 16, 4))
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.0          # zakasnitev pred odgovorom (s), za vse poti
+    token_delay: float = 0.0      # zakasnitev med pretočnimi kosi (s)
+    chunk_chars: int = 24         # znakov na pretočni kos
+    n_nodes: int = 30             # velikost sintetičnega grafa
+    words: int = 1500
+    replay: list = field(default_factory=list)  # posneti odgovori (imajo prednost pred sintetičnimi)
+    requests: dict = field(default_factory=lambda: {"llm": 0, "orcid": 0, "scholar": 0})
+
+    def __post_init__(self):
+        self._replay_cycle = itertools.cycle(self.replay) if self.replay else None
+        self._lock = threading.Lock()
+
+    def completion_text(self, seed=0):
+        with self._lock:
+            if self._replay_cycle is not None:
+                return next(self._replay_cycle)
+        return _cached_completion(self.n_nodes, self.words, seed)
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+
+_completion_cache = {}
+
+
+def _cached_completion(n_nodes, words, seed=0):
+    key = (n_nodes, words, seed)
+    if key not in _completion_cache:
+        _completion_cache[key] = synthetic_completion(n_nodes, words, seed)
+    return _completion_cache[key]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # sicer zakasnjeni ACK doda ~40 ms na odgovor
+    config = StubConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.config.latency)
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path.startswith("/orcid/v3.0/search"):
+            self.config.count("orcid")
+            name = query.get("q", [""])[0]
+            # Imena z "scholar" nimajo ORCID zapisa, da se preizkusi tudi Scholar pot.
+            result = [] if "scholar" in name.lower() else [{"orcid-identifier": {"path": fake_orcid_id(name)}}]
+            return self._json({"num-found": len(result), "result": result})
+        if url.path.startswith("/orcid/v3.0/") and url.path.endswith("/record"):
+            self.config.count("orcid")
+            orcid_id = url.path.split("/")[3]
+            groups = [{"work-summary": [{"title": {"title": {"value": f"Work {k} of {orcid_id}"}},
+                                         "publication-date": {"year": {"value": str(2010 + k)}}}]} for k in range(8)]
+            return self._json({"activities-summary": {"works": {"group": groups}}})
+        if url.path.startswith("/scholar/graph/v1/paper/search"):
+            self.config.count("scholar")
+            author = query.get("query", [""])[0]
+            return self._json({"data": [{"title": f"Paper {k} ({author})", "year": 2015 + k} for k in range(3)]})
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json({"error": "not found"}, 404)
+        self.config.count("llm")
+        time.sleep(self.config.latency)
+        text = self.config.completion_text(request.get("seed") or 0)   # različno seme: drugačen vzorec
+        prose, _, graph_json = text.partition(GRAPH_JSON_MARKER)
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            text = graph_json.strip()            # ločena zahteva za graf (JSON način)
+        elif GRAPH_JSON_MARKER not in json.dumps(request.get("messages", [])):
+            text = prose.rstrip()                # navodilo brez grafa: samo disertacija
+        created = int(time.time())
+        usage = {"prompt_tokens": sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4,
+                 "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not request.get("stream"):
+            return self._json({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": request.get("model")}
+        step = self.config.chunk_chars
+        for i in range(0, len(text), step):
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": text[i:i + step]}, "finish_reason": None}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if self.config.token_delay:
+                self.wfile.flush()
+                time.sleep(self.config.token_delay)
+        final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], x_groq={"usage": usage})
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Zažene strežnik v ozadni niti; vrne (strežnik, osnovni URL)."""
+    handler = type("BoundStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def stub_environment(base_url):
+    """Spremenljivke okolja, ki `sis_core` preusmerijo na nadomestke."""
+    return {
+        "SIS_GROQ_BASE_URL": f"{base_url}/v1",
+        "SIS_ORCID_API_URL": f"{base_url}/orcid/v3.0",
+        "SIS_SCHOLAR_API_URL": f"{base_url}/scholar/graph/v1",
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Groq/ORCID/Semantic Scholar stand-ins for offline runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--nodes", type=int, default=30, help="size of the synthetic graph")
+    parser.add_argument("--replay", help="JSONL with recorded completions: {\"text\": ...} lines or history/batch records")
+    args = parser.parse_args(argv)
+    replay = []
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            # Vrstice {"text": ...} ali zapisi zgodovine/paketnega izhoda ({"result": {"text": ...}}).
+            records = [json.loads(line) for line in f if line.strip()]
+            replay = [r.get("text") or r["result"]["text"] for r in records if r.get("text") or (r.get("result") or {}).get("text")]
+    config = StubConfig(latency=args.latency, token_delay=args.token_delay, n_nodes=args.nodes, replay=replay)
+    server, base_url = start_stub_server(config, port=args.port)
+    for name, value in stub_environment(base_url).items():
+        print(f"{name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
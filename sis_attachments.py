@@ -0,0 +1,207 @@
+"""Obdelava priponk: razrez na odseke, BM25 iskanje najbolj relevantnih odsekov in map-reduce povzetek.
+
+Modul ne uvaža Streamlita, zato ga lahko uporabljajo tudi skripte in meritve.
+"""
+import math
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+CHUNK_TERMS = 120     # iskalnih izrazov na odsek (≈ 180 besed besedila)
+CHUNK_OVERLAP = 20
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset("""
+a an and are as at be by can could did do does for from has have how if in into is it its
+may more most not of on or our should so such than that the their them then there these
+they this those to was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize_terms(text):
+    """Iskalni izrazi: male črke, brez zelo kratkih in pogostih besed."""
+    return [t for t in _TERM_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+@dataclass
+class ChunkIndex:
+    """Invertiran BM25 indeks nad odseki ene priponke."""
+    text: str
+    spans: list = field(default_factory=list)        # (začetek, konec) odseka v `text`
+    postings: dict = field(default_factory=dict)     # izraz -> [(id odseka, tf)]
+    lengths: list = field(default_factory=list)      # število izrazov na odsek
+    avg_length: float = 0.0
+
+
+def build_chunk_index(text, chunk_terms=CHUNK_TERMS, overlap=CHUNK_OVERLAP):
+    """Razreže besedilo na prekrivajoča se okna iskalnih izrazov in zgradi BM25 indeks.
+
+    Besedilo se tokenizira samo enkrat; odsek obsega izvirno besedilo od prvega
+    do zadnjega izraza v oknu (vključno z ločili in pogostimi besedami).
+    """
+    starts, ends, terms = [], [], []
+    for m in _TERM_RE.finditer(text):
+        term = m.group().lower()
+        if len(term) > 1 and term not in _STOPWORDS:
+            starts.append(m.start())
+            ends.append(m.end())
+            terms.append(term)
+    index = ChunkIndex(text=text)
+    postings = index.postings
+    step = max(1, chunk_terms - overlap)
+    for first in range(0, len(terms), step):
+        last = min(first + chunk_terms, len(terms))
+        cid = len(index.spans)
+        index.spans.append((starts[first], ends[last - 1]))
+        index.lengths.append(last - first)
+        for term, tf in Counter(terms[first:last]).items():
+            if term in postings:
+                postings[term].append((cid, tf))
+            else:
+                postings[term] = [(cid, tf)]
+        if last >= len(terms):
+            break
+    index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+    return index
+
+
+def score_chunks(index, query):
+    """BM25 ocene odsekov za poizvedbo; vrne slovar id odseka -> ocena."""
+    n_chunks = len(index.spans)
+    scores = {}
+    for term in set(tokenize_terms(query)):
+        postings = index.postings.get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+        for cid, tf in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[cid] / (index.avg_length or 1))
+            scores[cid] = scores.get(cid, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+def select_relevant_chunks(index, query, token_budget, top_k=12):
+    """Vrne izbrane odseke v izvirnem vrstnem redu, ki skupaj ne presežejo proračuna žetonov.
+
+    Če celotno besedilo ustreza proračunu, se vrne nespremenjeno. Brez zadetkov
+    (ali brez poizvedbe) se uporabijo začetni odseki.
+    """
+    max_chars = token_budget * 4
+    if len(index.text) <= max_chars:
+        return index.text, len(index.spans), len(index.spans)
+    scores = score_chunks(index, query)
+    ranked = sorted(scores, key=lambda cid: (-scores[cid], cid))[:top_k] or list(range(len(index.spans)))
+    chosen, used = [], 0
+    for cid in ranked:
+        start, end = index.spans[cid]
+        if used + (end - start) > max_chars:
+            continue
+        chosen.append(cid)
+        used += end - start
+    chosen.sort()
+    # Prekrivajoče se sosednje odseke združimo, da se besedilo ne ponavlja.
+    merged = []
+    for cid in chosen:
+        start, end = index.spans[cid]
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    excerpt = "\n[...]\n".join(index.text[start:end] for start, end in merged)
+    return excerpt, len(chosen), len(index.spans)
+
+
+# --- POVZETEK CELOTNE PRIPONKE (map-reduce) ---
+DIGEST_CHUNK_TOKENS = 6000      # žetonov na odsek v fazi "map"
+DIGEST_REDUCE_TOKENS = 8000     # največ žetonov delnih povzetkov na en klic "reduce"
+DIGEST_MIN_PARTIAL = 120
+DIGEST_MAX_PARTIAL = 600
+DIGEST_WORKERS = 8
+
+MAP_INSTRUCTION = ("Summarize this section of a longer document faithfully and densely. Keep key claims, "
+                   "definitions, figures, named concepts and relations. No preamble.")
+REDUCE_INSTRUCTION = ("Merge these consecutive partial summaries of one document into a single coherent digest. "
+                      "Preserve the document order, key claims and named concepts; drop repetition. No preamble.")
+
+
+def split_token_chunks(text, max_tokens=DIGEST_CHUNK_TOKENS):
+    """Razdeli besedilo na zaporedne odseke z največ `max_tokens` (≈ 4 znaki/žeton).
+
+    Meja se poišče v drugi polovici okna (odstavek, vrstica, presledek), sicer se odseka trdo.
+    """
+    max_chars = max_tokens * 4
+    chunks, start, n = [], 0, len(text)
+    while start < n:
+        end = min(n, start + max_chars)
+        if end < n:
+            floor = start + max_chars // 2
+            for sep in ("\n\n", "\n", " "):
+                cut = text.rfind(sep, floor, end)
+                if cut > start:
+                    end = cut
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def map_reduce_digest(text, summarize, token_budget, workers=DIGEST_WORKERS, on_progress=None):
+    """Povzame celotno besedilo: odseki se povzamejo vzporedno, delni povzetki se združijo v enega.
+
+    `summarize(instruction, text, max_tokens)` izvede en LLM klic. Čas faze "map" je določen
+    z najpočasnejšim odsekom (ne s številom odsekov), dokler delavcev ni manj kot odsekov.
+    Neuspel odsek se nadomesti z začetkom izvirnika, da digest ne izgubi celotnega dela.
+    Vrne (digest, statistika).
+    """
+    chunks = split_token_chunks(text)
+    stats = {"chunks": len(chunks), "failed": 0, "reduce_calls": 0, "slowest_chunk_s": 0.0}
+    if len(text) <= token_budget * 4:
+        return text, stats
+    partial_tokens = max(DIGEST_MIN_PARTIAL, min(DIGEST_MAX_PARTIAL, DIGEST_REDUCE_TOKENS // len(chunks)))
+
+    def run(instruction, part, max_tokens):
+        t0 = time.perf_counter()
+        try:
+            summary = summarize(instruction, part, max_tokens)
+            failed = not summary
+        except Exception:
+            summary, failed = "", True
+        return (summary or part[:max_tokens * 4]), failed, time.perf_counter() - t0
+
+    def parallel(instruction, parts, max_tokens):
+        out = [None] * len(parts)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts)))) as pool:
+            futures = {pool.submit(run, instruction, part, max_tokens): i for i, part in enumerate(parts)}
+            for done, future in enumerate(as_completed(futures), 1):
+                summary, failed, seconds = future.result()
+                out[futures[future]] = summary
+                stats["failed"] += failed
+                stats["slowest_chunk_s"] = max(stats["slowest_chunk_s"], seconds)
+                if on_progress is not None:
+                    on_progress(done, len(parts))
+        return out
+
+    summaries = parallel(MAP_INSTRUCTION, chunks, partial_tokens)
+    # Preveč delnih povzetkov za en klic: združujemo jih po skupinah (spet vzporedno).
+    while len(summaries) > 1 and sum(len(s) for s in summaries) > DIGEST_REDUCE_TOKENS * 4:
+        groups, current = [], []
+        for s in summaries:
+            if current and sum(len(c) for c in current) + len(s) > DIGEST_REDUCE_TOKENS * 4:
+                groups.append("\n\n".join(current))
+                current = []
+            current.append(s)
+        groups.append("\n\n".join(current))
+        if len(groups) == len(summaries):  # posamezni povzetki so že preveliki
+            break
+        stats["reduce_calls"] += len(groups)
+        summaries = parallel(REDUCE_INSTRUCTION, groups, partial_tokens * 2)
+    stats["reduce_calls"] += 1
+    digest, failed, _ = run(REDUCE_INSTRUCTION, "\n\n".join(summaries), token_budget)
+    stats["failed"] += failed
+    return digest, stats
@@ -0,0 +1,161 @@
+"""Paketna (headless) SIS sinteza: JSONL konfiguracije -> JSONL rezultati.
+
+Vsaka vrstica vhoda je JSON objekt s polji `SynthesisConfig` (sciences, profiles,
+approaches, logic_type, user_query, idea_query, authors, ...) in neobveznim `id`.
+Rezultati se sproti dopisujejo v izhodno datoteko; ob ponovnem zagonu se že
+uspešno obdelane vrstice preskočijo.
+
+Zagon:
+    GROQ_API_KEY=... python sis_batch.py inquiries.jsonl results.jsonl --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sis_core import GRAPH_STORE_PATH, GROQ_BASE_URL, SynthesisConfig, make_client, run_synthesis
+from sis_graphstore import GraphStore
+
+DEFAULT_WORKERS = 4
+
+
+def config_id(raw):
+    """Stabilen ID vrstice: podani `id` ali kratek SHA-256 kanonične konfiguracije."""
+    if raw.get("id"):
+        return str(raw["id"])
+    canonical = json.dumps(raw, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def load_completed_ids(output_path):
+    """ID-ji vrstic, ki so v izhodu že uspešno zaključene (osnova za nadaljevanje)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # odrezana zadnja vrstica po prekinitvi
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+def iter_configs(input_path):
+    with open(input_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{input_path}:{line_no}: invalid JSON ({e})") from None
+            yield config_id(raw), raw
+
+
+def _load_attachment(raw):
+    path = raw.get("attachment_path")
+    if path and not raw.get("attachment_text"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            raw = dict(raw, attachment_text=f.read())
+    return raw
+
+
+def run_one(cid, raw, client, use_response_cache, graph_store=None):
+    t0 = time.perf_counter()
+    try:
+        config = SynthesisConfig.from_dict(_load_attachment(raw))
+        result = run_synthesis(config, client, use_response_cache=use_response_cache)
+        record = {"id": cid, "status": "ok", "config": raw, "result": result.to_record()}
+    except Exception as e:
+        record = {"id": cid, "status": "error", "config": raw, "error": f"{type(e).__name__}: {e}"}
+    record["elapsed_s"] = time.perf_counter() - t0
+    record["finished_at"] = time.time()
+    if graph_store is not None and record["status"] == "ok" and result.graph is not None and result.graph.nodes:
+        # Sinteza je uspela (in je plačana); napaka shrambe se zabeleži pri zapisu in ne ustavi paketa.
+        try:
+            graph_store.merge_graph(cid, result.graph, (config.user_query or config.idea_query)[:80],
+                                    result.logic_type, record["finished_at"])
+        except Exception as e:
+            record["graph_store_error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def run_batch(input_path, output_path, client, workers=DEFAULT_WORKERS, use_response_cache=True, log=print, spans_path=None,
+              graph_store=None):
+    """Obdela vse neobdelane konfiguracije z omejenim bazenom niti; vrne povzetek.
+
+    Z `spans_path` se razponi stopenj vsake sinteze dopisujejo še v ločen JSONL,
+    z `graph_store` (GraphStore) pa se grafi uspešnih sintez združijo v skupno shrambo.
+    Neuspelo združevanje se zabeleži v zapisu (`graph_store_error`) in ne ustavi paketa.
+    """
+    done = load_completed_ids(output_path)
+    pending = [(cid, raw) for cid, raw in iter_configs(input_path) if cid not in done]
+    summary = {"skipped": len(done), "ok": 0, "error": 0, "graph_store_error": 0}
+    log(f"{len(pending)} pending, {len(done)} already completed")
+    write_lock = threading.Lock()
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        queue = iter(pending)
+        in_flight = set()
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                in_flight.add(executor.submit(run_one, item[0], item[1], client, use_response_cache, graph_store))
+
+        # Največ 2 × workers nalog v vrsti, da velik vhod ne napolni pomnilnika.
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                in_flight.discard(fut)
+                record = fut.result()
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    if spans_path and record["status"] == "ok":
+                        with open(spans_path, "a", encoding="utf-8") as spans_out:
+                            spans_out.writelines(json.dumps(dict(span, config_id=record["id"]), ensure_ascii=False) + "\n"
+                                                 for span in record["result"]["trace"])
+                summary[record["status"]] += 1
+                log(f"[{record['status']}] {record['id']} ({record['elapsed_s']:.1f}s)")
+                if "graph_store_error" in record:
+                    summary["graph_store_error"] += 1
+                    log(f"[graph-store] {record['id']}: {record['graph_store_error']}")
+                submit_next()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless SIS batch synthesis (JSONL in, JSONL out, resumable).")
+    parser.add_argument("input", help="JSONL file with one synthesis configuration per line")
+    parser.add_argument("output", help="JSONL file to append results to (existing 'ok' rows are skipped)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent syntheses (default: %(default)s)")
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY"), help="Groq API key (default: $GROQ_API_KEY)")
+    parser.add_argument("--base-url", default=GROQ_BASE_URL, help="OpenAI-compatible endpoint (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the LLM response cache")
+    parser.add_argument("--spans", help="also append per-stage timing spans to this JSONL file")
+    parser.add_argument("--graph-store", nargs="?", const=GRAPH_STORE_PATH,
+                        help="merge result graphs into this SQLite store (default when given without a path: %(const)s)")
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("missing API key: pass --api-key or set GROQ_API_KEY")
+
+    client = make_client(args.api_key, base_url=args.base_url)
+    summary = run_batch(args.input, args.output, client, workers=args.workers, use_response_cache=not args.no_cache,
+                        spans_path=args.spans, graph_store=GraphStore(args.graph_store) if args.graph_store else None)
+    print(json.dumps(summary))
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1292 @@
+"""Jedro SIS sinteze brez uporabniškega vmesnika.
+
+Vsebuje arhitekturi IMA in MA, bazo znanja, gradnik navodila, zajem bibliografij,
+klic jezikovnega modela in obdelavo grafa. Uporabljata ga Streamlit aplikacija
+(SIS_ApplicationUKSNew.py) in paketni zaganjalnik (sis_batch.py).
+"""
+import hashlib
+import json
+import os
+import textwrap
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache, wraps
+
+import requests
+from openai import OpenAI
+
+from sis_attachments import build_chunk_index, map_reduce_digest, select_relevant_chunks
+from sis_graph import SemanticGraph, annotate_markdown, extract_semantic_graph
+from sis_graphstore import GraphStore
+from sis_history import SynthesisHistory
+from sis_ideas import merge_candidates, render_idea_portfolio
+from sis_ontology import OntologyIndex, normalize_graph
+from sis_prefetch import BiblioPrefetcher, split_authors
+from sis_trace import NULL_TRACE, Trace
+from sis_scheduler import GroqScheduler, ScheduledClient, usage_counts
+from sis_selector import ONTOLOGY_TOKEN_BUDGET, OntologySelector
+from sis_singleflight import SingleFlight
+
+_RESOURCE_LOCK = threading.RLock()
+
+def process_resource(factory):
+    """Dekorator: vir se ustvari enkrat na proces (nitno varno), podobno kot st.cache_resource."""
+    instance = []
+
+    @wraps(factory)
+    def get():
+        if not instance:
+            with _RESOURCE_LOCK:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    return get
+
+# =========================================================================
+# 1. ARCHITECTURE DEFINITIONS (IMA vs MA)
+# =========================================================================
+
+# A. INTEGRATED METAMODEL ARCHITECTURE (IMA) + SPECIAL ADD-ON
+HUMAN_THINKING_METAMODEL = {
+    "nodes": {
+        "Human mental concentration": {"color": "#A6A6A6", "shape": "rectangle"},
+        "Identity": {"color": "#C6EFCE", "shape": "rectangle"},
+        "Autobiographical memory": {"color": "#C6EFCE", "shape": "rectangle"},
+        "Mission": {"color": "#92D050", "shape": "rectangle"},
+        "Vision": {"color": "#FFFF00", "shape": "rectangle"},
+        "Goal": {"color": "#00B0F0", "shape": "rectangle"},
+        "Problem": {"color": "#F2DCDB", "shape": "rectangle"},
+        "Ethics/moral": {"color": "#FFC000", "shape": "rectangle"},
+        "Hierarchy of interests": {"color": "#F8CBAD", "shape": "rectangle"},
+        "Rule": {"color": "#F2F2F2", "shape": "rectangle"},
+        "Decision-making": {"color": "#FFFF99", "shape": "rectangle"},
+        "Problem solving": {"color": "#D9D9D9", "shape": "rectangle"},
+        "Conflict situation": {"color": "#00FF00", "shape": "rectangle"},
+        "Knowledge": {"color": "#DDEBF7", "shape": "rectangle"},
+        "Tool": {"color": "#00B050", "shape": "rectangle"},
+        "Experience": {"color": "#00B050", "shape": "rectangle"},
+        "Classification": {"color": "#CCC0DA", "shape": "rectangle"},
+        # --- THE SPECIAL ADD-ON: Sociopsychological Outcome Mapping ---
+        "Psychological aspect": {"color": "#F8CBAD", "shape": "rectangle"},
+        "Sociological aspect": {"color": "#00FFFF", "shape": "rectangle"}
+    },
+    "relations": [
+        ("Human mental concentration", "Identity", "has"),
+        ("Human mental concentration", "Mission", "can have"),
+        ("Identity", "Autobiographical memory", "has"),
+        ("Mission", "Vision", "can have"),
+        ("Vision", "Goal", "can have"),
+        ("Problem", "Identity", "threatens"),
+        ("Problem", "Mission", "impedes"),
+        ("Problem", "Vision", "impedes"),
+        ("Problem", "Goal", "threatens"),
+        ("Problem", "Ethics/moral", "has"),
+        ("Ethics/moral", "Problem", "can solve"),
+        ("Problem", "Rule", "can be connected"),
+        ("Hierarchy of interests", "Goal", "realizes"),
+        ("Hierarchy of interests", "Knowledge", "realizes or hinders"),
+        ("Rule", "Goal", "realizes or hinders"),
+        ("Rule", "Decision-making", "realizes or hinders"),
+        ("Knowledge", "Goal", "acquisition"),
+        ("Decision-making", "Problem solving", "realizes or hinders"),
+        ("Ethics/moral", "Problem solving", "helps or hinders"),
+        ("Problem", "Problem solving", "should"),
+        ("Problem solving", "Conflict situation", "yes or no"),
+        ("Knowledge", "Classification", "with the help of"),
+        ("Knowledge", "Tool", "with the help of"),
+        ("Knowledge", "Experience", "with the help of"),
+        ("Experience", "Psychological aspect", "can be the outcome"),
+        ("Experience", "Sociological aspect", "can be the outcome"),
+        ("Conflict situation", "Psychological aspect", "can be the outcome"),
+        ("Conflict situation", "Sociological aspect", "can be the outcome"),
+        ("Psychological aspect", "Sociological aspect", "interconnected")
+    ]
+}
+
+# B. MENTAL APPROACHES (MA) ONTOLOGY
+MENTAL_APPROACHES_ONTOLOGY = {
+    "nodes": {
+        "Perspective shifting": {"color": "#00FF00", "shape": "rectangle"},
+        "Similarity and difference": {"color": "#FFFF00", "shape": "rectangle"},
+        "Core": {"color": "#FFC000", "shape": "rectangle"},
+        "Attraction": {"color": "#F2A6A2", "shape": "rectangle"},
+        "Repulsion": {"color": "#D9D9D9", "shape": "rectangle"},
+        "Condensation": {"color": "#CCC0DA", "shape": "rectangle"},
+        "Framework and foundation": {"color": "#F8CBAD", "shape": "rectangle"},
+        "Bipolarity and dialectics": {"color": "#DDEBF7", "shape": "rectangle"},
+        "Constant": {"color": "#E1C1D1", "shape": "rectangle"},
+        "Associativity": {"color": "#E1C1D1", "shape": "rectangle"},
+        "Induction": {"color": "#B4C6E7", "shape": "rectangle"},
+        "Whole and part": {"color": "#00FF00", "shape": "rectangle"},
+        "Mini-max": {"color": "#00FF00", "shape": "rectangle"},
+        "Addition and composition": {"color": "#FF00FF", "shape": "rectangle"},
+        "Hierarchy": {"color": "#C6EFCE", "shape": "rectangle"},
+        "Balance": {"color": "#00B0F0", "shape": "rectangle"},
+        "Deduction": {"color": "#92D050", "shape": "rectangle"},
+        "Abstraction and elimination": {"color": "#00B0F0", "shape": "rectangle"},
+        "Pleasure and displeasure": {"color": "#00FF00", "shape": "rectangle"},
+        "Openness and closedness": {"color": "#FFC000", "shape": "rectangle"}
+    },
+    "relations": [
+        ("Perspective shifting", "Similarity and difference", "leads to"),
+        ("Core", "Similarity and difference", "influences"),
+        ("Core", "Attraction", "has dynamic"),
+        ("Core", "Repulsion", "has dynamic"),
+        ("Repulsion", "Bipolarity and dialectics", "leads to"),
+        ("Framework and foundation", "Bipolarity and dialectics", "mutually interacts"),
+        ("Bipolarity and dialectics", "Constant", "stabilizes"),
+        ("Constant", "Associativity", "allows"),
+        ("Induction", "Whole and part", "bidirectional link"),
+        ("Induction", "Hierarchy", "structures"),
+        ("Whole and part", "Mini-max", "optimizes"),
+        ("Mini-max", "Addition and composition", "results in"),
+        ("Deduction", "Hierarchy", "defines taxonomy"),
+        ("Deduction", "Abstraction and elimination", "processes through"),
+        ("Deduction", "Pleasure and displeasure", "evaluates through"),
+        ("Hierarchy", "Balance", "maintains"),
+        ("Balance", "Addition and composition", "stabilizes"),
+        ("Balance", "Abstraction and elimination", "reconciles"),
+        ("Openness and closedness", "Pleasure and displeasure", "modulates response")
+    ]
+}
+
+KNOWLEDGE_BASE = {
+    "mental approaches": list(MENTAL_APPROACHES_ONTOLOGY["nodes"].keys()),
+    "User profiles": {"Adventurers": {"description": "Explorers of hidden patterns."}, "Applicators": {"description": "Efficiency focused."}, "Know-it-alls": {"description": "Systemic clarity."}, "Observers": {"description": "System monitors."}},
+    "Scientific paradigms": {"Empiricism": "Sensory experience.", "Rationalism": "Deductive logic.", "Constructivism": "Social build.", "Positivism": "Strict facts.", "Pragmatism": "Practical utility."},
+    "Structural models": {"Causal Connections": "Causality.", "Principles & Relations": "Fundamental laws.", "Episodes & Sequences": "Time-flow.", "Facts & Characteristics": "Raw data.", "Generalizations": "Frameworks.", "Glossary": "Definitions.", "Concepts": "Abstract constructs."},
+    "Science fields": {
+        "Mathematics": {"cat": "Formal", "methods": ["Axiomatization", "Statistical Inference", "Mathematical Modeling", "Formal Proof"], "tools": ["MATLAB", "Mathematica", "LaTeX", "Calculus"], "facets": ["Topology", "Algebra", "Analysis", "Number Theory"]},
+        "Physics": {"cat": "Natural", "methods": ["Modeling", "Simulation"], "tools": ["Accelerator", "Spectrometer"], "facets": ["Quantum", "Relativity"]},
+        "Chemistry": {"cat": "Natural", "methods": ["Synthesis", "Spectroscopy"], "tools": ["NMR", "Chromatography"], "facets": ["Organic", "Molecular"]},
+        "Biology": {"cat": "Natural", "methods": ["Sequencing", "CRISPR"], "tools": ["Microscope", "Bio-Incubator"], "facets": ["Genetics", "Population Dynamics"]},
+        "Ecology": {"cat": "Natural", "methods": ["Ecosystem Modeling", "Field Sampling", "Remote Sensing"], "tools": ["GIS Software", "Biosensors", "Satellite Imagery"], "facets": ["Biodiversity", "Sustainability", "Conservation Biology"]},
+        "Neuroscience": {"cat": "Natural", "methods": ["Neuroimaging", "Electrophys"], "tools": ["fMRI", "EEG"], "facets": ["Plasticity", "Synaptic"]},
+        "Psychology": {"cat": "Social", "methods": ["Double-Blind Trials", "Psychometrics"], "tools": ["fMRI", "Testing Kits"], "facets": ["Behavioral", "Cognitive"]},
+        "Sociology": {"cat": "Social", "methods": ["Ethnography", "Surveys"], "tools": ["Data Analytics", "Archives"], "facets": ["Stratification", "Dynamics"]},
+        "Computer Science": {"cat": "Formal", "methods": ["Algorithm Design", "Verification"], "tools": ["LLMGraphTransformer", "GPU Clusters"], "facets": ["AI", "Cybersecurity"]},
+        "Psychiatry": {"cat": "Applied/Medical", "methods": ["Diagnosis", "Clinical Trials"], "tools": ["DSM-5", "EEG"], "facets": ["Clinical Psychiatry", "Neuropsychiatry"]},
+        "Medicine": {"cat": "Applied", "methods": ["Clinical Trials", "Epidemiology"], "tools": ["MRI/CT", "Bio-Markers"], "facets": ["Immunology", "Pharmacology"]},
+        "Engineering": {"cat": "Applied", "methods": ["Prototyping", "FEA Analysis"], "tools": ["3D Printers", "CAD Software"], "facets": ["Robotics", "Nanotech"]},
+        "Library Science": {"cat": "Applied", "methods": ["Taxonomy", "Appraisal"], "tools": ["OPAC", "Metadata"], "facets": ["Retrieval", "Knowledge Org"]},
+        "Philosophy": {"cat": "Humanities", "methods": ["Socratic Method", "Phenomenology"], "tools": ["Logic Mapping", "Critical Analysis"], "facets": ["Epistemology", "Metaphysics"]},
+        "Linguistics": {"cat": "Humanities", "methods": ["Corpus Analysis", "Syntactic Parsing"], "tools": ["Praat", "NLTK Toolkit"], "facets": ["Socioling", "CompLing"]},
+        "Geography": {"cat": "Natural/Social", "methods": ["Spatial Analysis", "GIS"], "tools": ["ArcGIS"], "facets": ["Human Geo", "Physical Geo"]},
+        "Geology": {"cat": "Natural", "methods": ["Stratigraphy", "Mineralogy"], "tools": ["Seismograph"], "facets": ["Tectonics", "Petrology"]},
+        "Climatology": {"cat": "Natural", "methods": ["Climate Modeling"], "tools": ["Weather Stations"], "facets": ["Change Analysis"]},
+        "History": {"cat": "Humanities", "methods": ["Archives"], "tools": ["Archives"], "facets": ["Social History"]},
+        "Legal science": {"cat": "Social", "methods": ["Legal Hermeneutics", "Comparative Law", "Dogmatic Method", "Empirical Legal Research"], "tools": ["Legislative Databases", "Case Law Archives", "Constitutional Records"], "facets": ["Jurisprudence", "Constitutional Law", "Criminal Law", "Civil Law"]},
+        "Economics": {"cat": "Social", "methods": ["Econometrics", "Game Theory", "Market Modeling"], "tools": ["Stata", "R", "Bloomberg"], "facets": ["Macroeconomics", "Behavioral Economics"]},
+        "Politics": {"cat": "Social", "methods": ["Policy Analysis", "Comparative Politics"], "tools": ["Polls", "Legislative Databases"], "facets": ["International Relations", "Governance"]},
+        "Criminology": {"cat": "Social", "methods": ["Case Studies", "Statistical Analysis", "Profiling"], "tools": ["NCVS", "Crime Mapping Software"], "facets": ["Victimology", "Penology", "Criminal Behavior"]},
+        "Forensic sciences": {"cat": "Applied/Natural", "methods": ["DNA Profiling", "Ballistics", "Trace Analysis"], "tools": ["Mass Spectrometer", "Luminol", "Comparison Microscope"], "facets": ["Toxicology", "Pathology", "Digital Forensics"]}
+    }
+}
+
+# Izpeljani indeksi baze znanja (gradijo se enkrat ob uvozu, ne ob vsakem zagonu skripte).
+SCIENCE_FIELDS_SORTED = tuple(sorted(KNOWLEDGE_BASE["Science fields"]))
+FIELD_METHODS = {name: frozenset(f["methods"]) for name, f in KNOWLEDGE_BASE["Science fields"].items()}
+FIELD_TOOLS = {name: frozenset(f["tools"]) for name, f in KNOWLEDGE_BASE["Science fields"].items()}
+
+@lru_cache(maxsize=256)
+def field_options(fields):
+    """Sortirani metode in orodja za nabor polj (`fields` je tuple); vrne (metode, orodja)."""
+    methods = set().union(*(FIELD_METHODS.get(f, ()) for f in fields))
+    tools = set().union(*(FIELD_TOOLS.get(f, ()) for f in fields))
+    return tuple(sorted(methods)), tuple(sorted(tools))
+
+# --- PREVEDENI GRADNIK SISTEMSKEGA NAVODILA (statična predpona + zahtevkov rep) ---
+def encode_ontology_compact(ontology, default_shape="rectangle"):
+    """Kompaktni zapis ontologije: vrstica vozlišč `ime|barva` in seznam povezav `vir>relacija>cilj`."""
+    node_parts = []
+    for name, style in ontology["nodes"].items():
+        part = f"{name}|{style['color']}"
+        if style.get("shape", default_shape) != default_shape:
+            part += f"|{style['shape']}"
+        node_parts.append(part)
+    edge_lines = [f"{src}>{rel}>{dst}" for src, dst, rel in ontology["relations"]]
+    return f"NODES(name|color; shape={default_shape}): " + "; ".join(node_parts) + "\nEDGES(source>relation>target):\n" + "\n".join(edge_lines)
+
+def estimate_tokens(text):
+    """Groba ocena števila žetonov (≈ 4 znaki na žeton), zadošča za spremljanje velikosti."""
+    return (len(text) + 3) // 4
+
+# Statični deli so bajtno enaki pri vsakem klicu, zato jih ponudnik lahko predpomni kot predpono.
+ARCHITECTURES_SECTION = textwrap.dedent("""\
+    CONNECTION TO SEPARATED ARCHITECTURES:
+    - INTEGRATED METAMODEL (IMA): Apply the structural reasoning logic of Identity, Rules, and Goals.
+    - MENTAL APPROACHES (MA): Apply the cognitive transformation logic of Dialectics and Perspective Shifting.""")
+GEOMETRY_RULES = textwrap.dedent("""\
+    GEOMETRICAL VISUALIZATION TASK:
+    - Analyze user inquiry for shape preferences. Default shape is 'ellipse'.
+    - Use colors and shapes from the IMA and MA contexts provided.""")
+GRAPH_RULES = textwrap.dedent("""\
+    GRAPH DENSITY REQUIREMENT:
+    - GENERATE A DENSE SEMANTIC NETWORK WITH APPROXIMATELY 30-40 INTERCONNECTED NODES.
+    - Every node must strictly follow the Color/Shape logic from the contexts.
+
+    JSON schema: {"nodes": [{"id": "n1", "label": "Text", "type": "Root|Branch|Leaf|Class", "color": "#hex", "shape": "triangle|rectangle|ellipse|diamond"}], "edges": [{"source": "n1", "target": "n2", "rel_type": "BT|NT|AS|TT|outcome_of"}]}""")
+PROSE_RULES = textwrap.dedent("""\
+    STRICT FORMATTING & SPACE ALLOCATION:
+    - Focus 100% of the textual content on deep research and interdisciplinary synergy.
+    - DO NOT explain the visualization in the text.""")
+
+# "inline": disertacija in graf v enem odgovoru; "prose" in "graph": ločeni vzporedni zahtevi.
+PROMPT_VARIANTS = {
+    "inline": {
+        "role": "You are the SIS Synthesizer. Perform an exhaustive dissertation (1500+ words).",
+        "architectures": ARCHITECTURES_SECTION,
+        "instructions": "\n\n".join([
+            "THESAURUS ALGORITHM & UML LOGIC. Ensure dense interconnection.", GEOMETRY_RULES,
+            PROSE_RULES + "\n- End with '### SEMANTIC_GRAPH_JSON' followed by valid JSON only.", GRAPH_RULES]),
+    },
+    "prose": {
+        "role": "You are the SIS Synthesizer. Perform an exhaustive dissertation (1500+ words).",
+        "architectures": ARCHITECTURES_SECTION,
+        "instructions": "\n\n".join([
+            "THESAURUS ALGORITHM & UML LOGIC. Ensure dense interconnection.",
+            PROSE_RULES + "\n- The semantic network is generated separately: write prose only, no JSON."]),
+    },
+    "graph": {
+        "role": "You are the SIS Graph Architect. Build the semantic network of an interdisciplinary synthesis "
+                "and reply with one JSON object only.",
+        "architectures": ARCHITECTURES_SECTION,
+        "instructions": "\n\n".join(["THESAURUS ALGORITHM & UML LOGIC. Ensure dense interconnection.", GEOMETRY_RULES, GRAPH_RULES]),
+    },
+}
+PROMPT_STATIC_SECTIONS = PROMPT_VARIANTS["inline"]
+PROMPT_PREFIXES = {name: "\n\n".join(sections.values()) for name, sections in PROMPT_VARIANTS.items()}
+SYS_PROMPT_PREFIX = PROMPT_PREFIXES["inline"]
+
+# Ontologiji sta v zahtevkovem delu, ker se pošlje le podgraf, relevanten za poizvedbo.
+ONTOLOGIES = {"IMA": HUMAN_THINKING_METAMODEL, "MA": MENTAL_APPROACHES_ONTOLOGY}
+ONTOLOGY_HEADERS = {
+    "IMA": "DATA STRUCTURES TO INTEGRATE:\nMANDATORY IMA ARCHITECTURE INTEGRATION (IMA + SPECIAL ADD-ON)",
+    "MA": "MANDATORY MENTAL APPROACHES DIAGRAM LOGIC (MA)",
+}
+
+def ontology_section(name, subgraph=None):
+    """Razdelek navodila z ontologijo; pri podgrafu glava navede, koliko vozlišč je izbranih."""
+    full = ONTOLOGIES[name]
+    if subgraph is None or len(subgraph["nodes"]) == len(full["nodes"]):
+        return f"{ONTOLOGY_HEADERS[name]}:\n{encode_ontology_compact(full)}"
+    return (f"{ONTOLOGY_HEADERS[name]}, subgraph relevant to this inquiry ({len(subgraph['nodes'])} of {len(full['nodes'])} nodes):\n"
+            + encode_ontology_compact(subgraph))
+
+FULL_ONTOLOGY_SECTIONS = {name.lower(): ontology_section(name) for name in ONTOLOGIES}
+
+def knowledge_base_entries():
+    """Opisna besedila vnosov baze znanja (paradigme, modeli, profili, polja) za leksikalno izbiro."""
+    entries = {name: profile["description"] for name, profile in KNOWLEDGE_BASE["User profiles"].items()}
+    entries.update(KNOWLEDGE_BASE["Scientific paradigms"])
+    entries.update(KNOWLEDGE_BASE["Structural models"])
+    for name, f in KNOWLEDGE_BASE["Science fields"].items():
+        entries[name] = " ".join([f["cat"], *f["facets"]])
+    return entries
+
+IDEA_PRODUCTION_PROMPT = textwrap.dedent("""\
+    *** SUPERIOR IDEA PRODUCTION MODE ACTIVE ***
+    You are now expected to PERFORM KNOWLEDGE SYNTHESIS AND PRODUCE NEW USEFUL INNOVATIVE IDEAS.
+    Shift from descriptive analysis to RADICAL INNOVATION.
+    Use nodes like 'Conflict situation', 'Problem', and 'Mental approaches' (e.g., Perspective shifting, Bipolarity) to:
+    1. Forge entirely new cross-disciplinary theories.
+    2. Design novel solutions that don't exist in current literature.
+    3. Propose 'Useful Innovative Ideas' that solve the stated problem using the rules provided.
+    Your response must emphasize original conceptual synthesis AND generative creativity.""")
+SYNTHESIS_MODE_PROMPT = textwrap.dedent("""\
+    *** KNOWLEDGE SYNTHESIS MODE ***
+    Focus strictly on existing knowledge structures, taxonomy, and scientific interconnectedness.""")
+
+def build_system_prompt(logic_type, logic_desc, is_idea_mode, fields, biblio, subgraphs=None, selections=None, variant="inline"):
+    """Sestavi sistemsko navodilo: nespremenljiva predpona + na koncu polja posamezne zahteve.
+
+    `subgraphs` (ime ontologije -> podgraf) zamenja celotni ontologiji, `selections`
+    (oznaka -> seznam) doda uporabnikove izbire, `variant` izbere predpono iz PROMPT_VARIANTS.
+    Vrne (navodilo, slovar dinamičnih razdelkov).
+    """
+    if subgraphs is None:
+        dynamic_sections = dict(FULL_ONTOLOGY_SECTIONS)
+    else:
+        dynamic_sections = {name.lower(): ontology_section(name, subgraphs.get(name)) for name in ONTOLOGIES}
+    selection_lines = [f"- {label}: {', '.join(values)}" for label, values in (selections or {}).items() if values]
+    dynamic_sections.update({
+        "logic": f"MANDATORY ARCHITECTURAL LOGIC: {logic_type}\n{logic_desc}",
+        "mode": IDEA_PRODUCTION_PROMPT if is_idea_mode else SYNTHESIS_MODE_PROMPT,
+        "fields": f"FIELDS: {', '.join(fields)}.",
+        "selections": "USER SELECTIONS TO APPLY:\n" + "\n".join(selection_lines) if selection_lines else "",
+        # Bibliografije vplivajo le na prozo (označevanje avtorjev), ne na graf.
+        "authors": f"CONTEXT AUTHORS: {biblio}." if biblio and variant != "graph" else "",
+    })
+    return PROMPT_PREFIXES[variant] + "\n\n" + "\n\n".join(v for v in dynamic_sections.values() if v), dynamic_sections
+
+def prompt_token_report(dynamic_sections, user_context, variant="inline"):
+    """Ocena žetonov po razdelkih navodila (statični, dinamični, uporabniški kontekst)."""
+    rows = [{"section": f"static:{name}", "chars": len(text), "tokens_est": estimate_tokens(text)} for name, text in PROMPT_VARIANTS[variant].items()]
+    rows += [{"section": f"request:{name}", "chars": len(text), "tokens_est": estimate_tokens(text)} for name, text in dynamic_sections.items() if text]
+    rows.append({"section": "user:context", "chars": len(user_context), "tokens_est": estimate_tokens(user_context)})
+    return rows
+
+# --- PRIDOBIVANJE BIBLIOGRAFIJ Z LETNICAMI ---
+BIBLIO_REQUEST_TIMEOUT = 5      # časovna omejitev posameznega HTTP klica (s)
+BIBLIO_DEADLINE = 12            # skupni rok za celoten bibliografski korak (s)
+BIBLIO_MAX_WORKERS = 8
+
+@process_resource
+def get_http_session():
+    """Vrne deljeno HTTP sejo s povezavnim bazenom (keep-alive) za ORCID in Scholar klice."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=BIBLIO_MAX_WORKERS * 2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# --- TRAJNI TTL/LRU PREDPOMNILNIK (preživi ponovni zagon procesa) ---
+SIS_CACHE_DIR = os.environ.get("SIS_CACHE_DIR", ".sis_cache")
+# Naslova API-jev je mogoče preusmeriti (npr. na lokalne nadomestke v benchmarks/stubs.py).
+ORCID_API_URL = os.environ.get("SIS_ORCID_API_URL", "https://pub.orcid.org/v3.0").rstrip("/")
+SCHOLAR_API_URL = os.environ.get("SIS_SCHOLAR_API_URL", "https://api.semanticscholar.org/graph/v1").rstrip("/")
+ORCID_ID_CACHE_TTL = 30 * 24 * 3600     # ime -> ORCID iD se redko spremeni
+WORKS_CACHE_TTL = 7 * 24 * 3600         # seznami del se osvežijo tedensko
+BIBLIO_CACHE_MAX_ENTRIES = 2000
+
+_MISSING = object()
+
+class PersistentTTLCache:
+    """Nitno varen TTL + LRU predpomnilnik v pomnilniku, ki se atomarno zapisuje v JSON datoteko.
+
+    Vodi števce zadetkov/zgrešitev in oceno prihranjenega omrežnega časa
+    (povprečno trajanje zgrešitve × število zadetkov).
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.path, self.ttl, self.max_entries = path, ttl, max_entries
+        self._data = OrderedDict()  # key -> (stored_at, value), najstarejši uporabljen na začetku
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.hits = self.misses = 0
+        self.miss_seconds = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (stored_at, value) in raw.items():
+            if now - stored_at < self.ttl:
+                self._data[key] = (stored_at, value)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if time.time() - item[0] >= self.ttl:
+                del self._data[key]
+                self._dirty = True
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._dirty = True
+
+    def invalidate(self, key=None):
+        """Odstrani en vnos ali (brez ključa) izprazni celoten predpomnilnik."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self._dirty = True
+
+    def get_or_fetch(self, key, fetch):
+        """Vrne vrednost iz predpomnilnika ali jo pridobi s `fetch()`; izjeme se ne shranijo."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+        t0 = time.perf_counter()
+        value = fetch()
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += elapsed
+        self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds_est": self.hits * avg_miss,
+            }
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {k: list(v) for k, v in self._data.items()}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+@process_resource
+def get_biblio_caches():
+    """Dvonivojski bibliografski predpomnilnik: ime -> ORCID iD in ORCID iD / ime -> seznam del."""
+    return {
+        "orcid_ids": PersistentTTLCache(os.path.join(SIS_CACHE_DIR, "orcid_ids.json"), ORCID_ID_CACHE_TTL, BIBLIO_CACHE_MAX_ENTRIES),
+        "works": PersistentTTLCache(os.path.join(SIS_CACHE_DIR, "works.json"), WORKS_CACHE_TTL, BIBLIO_CACHE_MAX_ENTRIES),
+    }
+
+@process_resource
+def get_single_flights():
+    """Procesno deljeno združevanje enakih sočasnih klicev: bibliografije po avtorju, LLM po vsebini zahteve."""
+    return {
+        "biblio": SingleFlight(),
+        "llm": SingleFlight(cost=lambda outcome: (outcome["usage"] or {}).get("total_tokens") or 0),
+    }
+
+def normalize_author_name(name):
+    """Normalizira ime avtorja za ključ predpomnilnika (NFKC, brez velikih črk, enotni presledki)."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+def invalidate_author_cache(author_name=None):
+    """Razveljavi predpomnjene podatke za enega avtorja ali (brez imena) za vse."""
+    caches = get_biblio_caches()
+    if author_name is None:
+        for cache in caches.values():
+            cache.invalidate()
+    else:
+        norm = normalize_author_name(author_name)
+        orcid_id = caches["orcid_ids"].get(norm)
+        caches["orcid_ids"].invalidate(norm)
+        caches["works"].invalidate(f"scholar:{norm}")
+        if orcid_id:
+            caches["works"].invalidate(f"orcid:{orcid_id}")
+    for cache in caches.values():
+        cache.save()
+
+def _traced_get(trace, span_name, session, url, **kwargs):
+    """GET z razponom (velikost odgovora v bajtih, HTTP status); vrne razčlenjen JSON.
+
+    Odgovor z napako (npr. 429 ali 5xx) sproži `requests.HTTPError`, da ga `get_or_fetch`
+    ne shrani kot "ni zadetka"; predpomni se le uspešen odgovor.
+    """
+    with trace.span(span_name) as sp:
+        response = session.get(url, timeout=BIBLIO_REQUEST_TIMEOUT, **kwargs)
+        sp["bytes"] = len(response.content)
+        sp["status"] = response.status_code
+        response.raise_for_status()
+        return response.json()
+
+def _search_orcid_id(auth, session, trace=NULL_TRACE):
+    """Vrne ORCID iD prvega zadetka iskanja ali "" (brez zadetka)."""
+    search_url = f"{ORCID_API_URL}/search/?q={auth}"
+    s_res = _traced_get(trace, "orcid.search", session, search_url, headers={"Accept": "application/json"})
+    if s_res.get('result'):
+        return s_res['result'][0]['orcid-identifier']['path']
+    return ""
+
+def _fetch_orcid_works(orcid_id, session, trace=NULL_TRACE):
+    """Vrne do 5 del iz ORCID zapisa kot seznam parov [leto, naslov]."""
+    record_url = f"{ORCID_API_URL}/{orcid_id}/record"
+    r_res = _traced_get(trace, "orcid.record", session, record_url, headers={"Accept": "application/json"})
+    works = r_res.get('activities-summary', {}).get('works', {}).get('group', [])
+    items = []
+    for work in works[:5]:
+        summary = work.get('work-summary', [{}])[0]
+        title = summary.get('title', {}).get('title', {}).get('value', 'N/A')
+        pub_date = summary.get('publication-date')
+        year = pub_date.get('year').get('value', 'n.d.') if pub_date and pub_date.get('year') else "n.d."
+        items.append([year, title])
+    return items
+
+def _fetch_scholar_works(auth, session, trace=NULL_TRACE):
+    """Vrne do 3 dela iz Semantic Scholar iskanja kot seznam parov [leto, naslov]."""
+    ss_url = f"{SCHOLAR_API_URL}/paper/search?query=author:\"{auth}\"&limit=3&fields=title,year"
+    ss_res = _traced_get(trace, "scholar.search", session, ss_url)
+    return [[p.get('year', 'n.d.'), p['title']] for p in ss_res.get("data", [])]
+
+def fetch_single_author_biblio(auth, session=None, caches=None, trace=NULL_TRACE):
+    """Zajame bibliografijo enega avtorja (ORCID, sicer Semantic Scholar) in vrne besedilni blok.
+
+    Sočasna iskanja istega avtorja (iz različnih sej) se združijo v eno.
+    """
+    with trace.span("biblio.author", parent="biblio", author=auth) as sp:
+        biblio, sp["coalesced"] = get_single_flights()["biblio"].do(
+            normalize_author_name(auth), lambda _publish: _fetch_single_author_biblio(auth, session, caches, trace))
+        sp["bytes"] = len(biblio.encode("utf-8"))
+    return biblio
+
+def _fetch_single_author_biblio(auth, session, caches, trace):
+    session = session or get_http_session()
+    caches = caches or get_biblio_caches()
+    norm = normalize_author_name(auth)
+    biblio = ""
+    orcid_id = None
+    try:
+        orcid_id = caches["orcid_ids"].get_or_fetch(norm, lambda: _search_orcid_id(auth, session, trace))
+    except: pass
+
+    if orcid_id:
+        try:
+            works = caches["works"].get_or_fetch(f"orcid:{orcid_id}", lambda: _fetch_orcid_works(orcid_id, session, trace))
+            biblio += f"\n--- ORCID BIBLIOGRAPHY: {auth.upper()} ({orcid_id}) ---\n"
+            if works:
+                for year, title in works:
+                    biblio += f"- [{year}] {title}\n"
+            else: biblio += "No public works found.\n"
+        except: pass
+    else:
+        try:
+            papers = caches["works"].get_or_fetch(f"scholar:{norm}", lambda: _fetch_scholar_works(auth, session, trace))
+            if papers:
+                biblio += f"\n--- SCHOLAR BIBLIOGRAPHY: {auth.upper()} ---\n"
+                for year, title in papers:
+                    biblio += f"- [{year}] {title}\n"
+        except: pass
+    return biblio
+
+def fetch_author_bibliographies(author_input, deadline=BIBLIO_DEADLINE, trace=NULL_TRACE):
+    """Zajame bibliografske podatke z letnicami preko ORCID in Scholar API baz.
+
+    Avtorji se obdelajo vzporedno prek deljene HTTP seje. Po preteku skupnega roka
+    se vrnejo delni rezultati (avtorji, ki še niso končali, so izpuščeni), vrstni red
+    pa vedno sledi vnosu.
+    """
+    if not author_input: return ""
+    author_list = split_authors(author_input, normalize_author_name)
+    if not author_list: return ""
+    session = get_http_session()
+    caches = get_biblio_caches()
+    with trace.span("biblio", authors=len(author_list)) as sp:
+        executor = ThreadPoolExecutor(max_workers=min(BIBLIO_MAX_WORKERS, len(author_list)))
+        try:
+            futures = [executor.submit(fetch_single_author_biblio, auth, session, caches, trace) for auth in author_list]
+            wait(futures, timeout=deadline)
+        finally:
+            # Ne čakamo na zamudnike; njihove HTTP časovne omejitve jih bodo zaključile v ozadju.
+            executor.shutdown(wait=False, cancel_futures=True)
+            for cache in caches.values():
+                cache.save()
+
+        comprehensive_biblio = ""
+        completed = 0
+        for fut in futures:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                comprehensive_biblio += fut.result()
+                completed += 1
+        sp["completed"] = completed
+        sp["bytes"] = len(comprehensive_biblio.encode("utf-8"))
+    return comprehensive_biblio
+
+# --- ŠPEKULATIVNO ZAJEMANJE BIBLIOGRAFIJ (med pisanjem povpraševanja) ---
+PREFETCH_WORKERS = 8
+
+@process_resource
+def get_prefetch_executor():
+    """Deljen bazen niti za vnaprejšnja bibliografska iskanja vseh sej."""
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="biblio-prefetch")
+
+def _prefetch_author_biblio(auth):
+    caches = get_biblio_caches()
+    try:
+        return fetch_single_author_biblio(auth, get_http_session(), caches)
+    finally:
+        for cache in caches.values():
+            cache.save()
+
+def make_biblio_prefetcher():
+    """Nov zbiralnik bibliografij za eno sejo (rezultati so vezani na sejo, bazen niti je skupen)."""
+    return BiblioPrefetcher(_prefetch_author_biblio, get_prefetch_executor(), normalize_author_name)
+
+# --- PRETOČNI IZPIS SINTEZE (progresivni prikaz žetonov) ---
+GRAPH_JSON_MARKER = "### SEMANTIC_GRAPH_JSON"
+STREAM_RENDER_INTERVAL = 0.12  # najmanjši razmik med osvežitvami prikaza (s)
+
+def stream_synthesis(client, on_prose, render_interval=STREAM_RENDER_INTERVAL, **create_kwargs):
+    """Pretočno izvede chat klic in sproti posreduje prozo povratnemu klicu `on_prose(besedilo)`.
+
+    Ko se pojavi oznaka GRAPH_JSON_MARKER, se prikaz proze ustavi, JSON rep pa se le
+    zbira. Vrne celotno besedilo in metrike (čas do prvega žetona, skupni čas).
+    """
+    t_start = time.perf_counter()
+    ttft = None
+    text_out = ""
+    marker_pos = -1
+    last_render = 0.0
+    usage = None
+    for chunk in client.chat.completions.create(stream=True, **create_kwargs):
+        usage = usage_counts(chunk) or usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        if not delta:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - t_start
+        scan_from = max(0, len(text_out) - len(GRAPH_JSON_MARKER))
+        text_out += delta
+        if marker_pos >= 0:
+            continue
+        marker_pos = text_out.find(GRAPH_JSON_MARKER, scan_from)
+        now = time.perf_counter()
+        if marker_pos >= 0:
+            on_prose(text_out[:marker_pos])
+        elif now - last_render >= render_interval:
+            # Zadržimo rep, ki bi lahko bil začetek oznake, da se ta nikoli ne izriše.
+            on_prose(text_out[:max(0, len(text_out) - len(GRAPH_JSON_MARKER))] + " ▌")
+            last_render = now
+    if marker_pos < 0:
+        on_prose(text_out)
+    stats = {
+        "ttft_s": ttft if ttft is not None else time.perf_counter() - t_start,
+        "total_s": time.perf_counter() - t_start,
+        "graph_tail_chars": len(text_out) - marker_pos if marker_pos >= 0 else 0,
+        "usage": usage,
+    }
+    return text_out, stats
+
+def _request_graph(client, graph_kwargs, force_fresh, trace):
+    """Ločena zahteva za semantični graf (JSON način); vrne surovo besedilo JSON odgovora."""
+    with trace.span("llm.graph", parent="synthesis", model=graph_kwargs["model"]) as sp:
+        if force_fresh:
+            outcome, coalesced = _request_completion(client, None, graph_kwargs), False
+        else:
+            outcome, coalesced = get_single_flights()["llm"].do(
+                llm_request_key(**graph_kwargs), lambda _publish: _request_completion(client, None, graph_kwargs))
+        sp["coalesced"] = coalesced
+        sp["bytes"] = len(outcome["text"].encode("utf-8"))
+        if outcome["usage"] and not coalesced:
+            sp["prompt_tokens"], sp["completion_tokens"] = outcome["usage"]["prompt_tokens"], outcome["usage"]["completion_tokens"]
+    return outcome["text"]
+
+# --- VEČ VZPOREDNIH KANDIDATOV IDEJ ---
+IDEA_CANDIDATE_TEMPERATURES = (0.75, 0.9, 0.6, 1.0, 0.85, 0.7, 0.95, 0.65)
+IDEA_CANDIDATE_MAX_TOKENS = 1800
+MAX_IDEA_CANDIDATES = len(IDEA_CANDIDATE_TEMPERATURES)
+IDEA_CANDIDATE_PROMPT = textwrap.dedent("""\
+    CANDIDATE EMPHASIS: Drive this idea production primarily through the mental approach '{approach}'{related}.
+    Present each idea under its own '### ' heading with a short title, followed by one or two dense paragraphs.""")
+
+def idea_emphases(selected_approaches, n):
+    """Poudarki kandidatov: najprej izbrani miselni pristopi, nato drugi iz MA po številu relacij."""
+    nodes = MENTAL_APPROACHES_ONTOLOGY["nodes"]
+    degree = {name: 0 for name in nodes}
+    for src, dst, _ in MENTAL_APPROACHES_ONTOLOGY["relations"]:
+        degree[src] += 1
+        degree[dst] += 1
+    ordered = [a for a in selected_approaches if a in nodes]
+    ordered += sorted((a for a in nodes if a not in ordered), key=lambda a: (-degree[a], a))
+    return [ordered[i % len(ordered)] for i in range(min(n, MAX_IDEA_CANDIDATES))]
+
+def idea_candidate_kwargs(create_kwargs, index, emphasis):
+    """Zahteva enega kandidata: poudarek MA na koncu navodila, lastna temperatura in seme."""
+    related = sorted({dst if src == emphasis else src for src, dst, _ in MENTAL_APPROACHES_ONTOLOGY["relations"]
+                      if emphasis in (src, dst)})
+    section = IDEA_CANDIDATE_PROMPT.format(approach=emphasis, related=f" (with {', '.join(related)})" if related else "")
+    system, user = create_kwargs["messages"]
+    return dict(create_kwargs, messages=[{"role": "system", "content": f"{system['content']}\n\n{section}"}, user],
+                temperature=IDEA_CANDIDATE_TEMPERATURES[index % len(IDEA_CANDIDATE_TEMPERATURES)], seed=index + 1,
+                max_tokens=min(create_kwargs["max_tokens"], IDEA_CANDIDATE_MAX_TOKENS))
+
+def field_terms(fields):
+    """Opisno besedilo izbranih znanstvenih polj (za oceno, katera polja ideja povezuje)."""
+    known = KNOWLEDGE_BASE["Science fields"]
+    return {name: " ".join([name, known[name]["cat"], *known[name]["methods"], *known[name]["tools"], *known[name]["facets"]])
+            for name in fields if name in known}
+
+def _produce_idea_candidates(client, on_prose, candidate_kwargs, emphases, fields, force_fresh, trace, timings):
+    """Kandidati tečejo hkrati (prvi se pretočno izpisuje); vrne (združen nabor idej kot markdown, število neuspelih).
+
+    Združijo se vsi kandidati, ki so uspeli; napaka se sproži le, če ni uspel noben.
+    """
+    def candidate(index, show):
+        kwargs = candidate_kwargs[index]
+        with trace.span("llm.candidate", parent="ideas.candidates", emphasis=emphases[index],
+                        temperature=kwargs["temperature"]) as sp:
+            if force_fresh:
+                outcome, coalesced = _request_completion(client, show, kwargs), False
+            else:
+                outcome, coalesced = get_single_flights()["llm"].do(
+                    llm_request_key(**kwargs), lambda publish: _request_completion(client, show, kwargs, publish), on_update=show)
+            sp["coalesced"] = coalesced
+            sp["bytes"] = len(outcome["text"].encode("utf-8"))
+            if outcome["usage"] and not coalesced:
+                sp["prompt_tokens"], sp["completion_tokens"] = outcome["usage"]["prompt_tokens"], outcome["usage"]["completion_tokens"]
+        return outcome
+
+    with trace.span("ideas.candidates", candidates=len(candidate_kwargs), model=candidate_kwargs[0]["model"]) as sp:
+        futures = [get_llm_executor().submit(candidate, i, None) for i in range(1, len(candidate_kwargs))]
+        texts, errors = [], []
+        for i, get_outcome in enumerate([lambda: candidate(0, on_prose), *(fut.result for fut in futures)]):
+            try:
+                outcome = get_outcome()
+            except Exception as e:
+                texts.append("")      # napaka je v razponu llm.candidate; ostali kandidati ostanejo
+                errors.append(e)
+                continue
+            texts.append(outcome["text"])
+            if i == 0 and on_prose is not None:
+                timings["ttft_s"] = outcome["ttft_s"]
+        sp["failed"] = len(errors)
+        if len(errors) == len(texts):
+            raise errors[0]
+    with trace.span("ideas.merge") as sp:
+        ideas, stats = merge_candidates([t.split(GRAPH_JSON_MARKER, 1)[0] for t in texts], field_terms(fields))
+        sp.update(stats)
+        fallback = next((t for t in texts if t), "")
+        text_out = render_idea_portfolio(ideas, stats, emphases) if ideas else fallback.split(GRAPH_JSON_MARKER, 1)[0]
+    if on_prose is not None:
+        on_prose(text_out)
+    return text_out, len(errors)
+
+def _request_completion(client, on_prose, create_kwargs, publish=None):
+    """En LLM klic (pretočen, če je podan `on_prose`); vrne besedilo, porabo žetonov in čas do prvega žetona.
+
+    `publish` prejme enake delne izpise kot `on_prose` (za pripete čakajoče klicatelje).
+    """
+    if on_prose is not None:
+        def show(partial):
+            on_prose(partial)
+            if publish is not None:
+                publish(partial)
+        text_out, stream_stats = stream_synthesis(client, show, **create_kwargs)
+        return {"text": text_out, "usage": stream_stats["usage"], "ttft_s": stream_stats["ttft_s"]}
+    t_start = time.perf_counter()
+    response = client.chat.completions.create(**create_kwargs)
+    return {"text": response.choices[0].message.content or "", "usage": usage_counts(response),
+            "ttft_s": time.perf_counter() - t_start}
+
+# --- VSEBINSKO NASLOVLJIV PREDPOMNILNIK LLM ODGOVOROV ---
+LLM_CACHE_DIR = os.path.join(SIS_CACHE_DIR, "llm_responses")
+HISTORY_DIR = os.path.join(SIS_CACHE_DIR, "history")
+UPLOAD_DIR = os.path.join(SIS_CACHE_DIR, "uploads")
+GRAPH_STORE_PATH = os.environ.get("SIS_GRAPH_STORE") or os.path.join(SIS_CACHE_DIR, "graph.sqlite3")
+SPANS_FILE = os.environ.get("SIS_SPANS_FILE") or os.path.join(SIS_CACHE_DIR, "spans.jsonl")
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024
+DIGEST_CACHE_DIR = os.path.join(SIS_CACHE_DIR, "attachment_digests")
+DIGEST_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+def llm_request_key(**create_kwargs):
+    """SHA-256 ključ iz modela, sporočil (prompt + kontekst) in parametrov vzorčenja."""
+    canonical = json.dumps(create_kwargs, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseDiskCache:
+    """En JSON na ključ v mapi; ob preseganju velikosti se brišejo najdlje neuporabljeni vnosi (mtime)."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory, self.max_bytes = directory, max_bytes
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(e.stat().st_size for e in os.scandir(directory) if e.name.endswith(".json"))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+            os.utime(path)  # LRU: osvežimo čas zadnje uporabe
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key, payload):
+        path = self._path(key)
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for e in os.scandir(self.directory):
+            if e.name.endswith(".json"):
+                st_ = e.stat()
+                entries.append((st_.st_mtime, st_.st_size, e.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for e in os.scandir(self.directory):
+                if e.name.endswith(".json"):
+                    try: os.remove(e.path)
+                    except OSError: pass
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes}
+
+@process_resource
+def get_response_cache():
+    """Procesno deljen predpomnilnik LLM odgovorov na disku."""
+    return ResponseDiskCache(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES)
+
+@process_resource
+def get_digest_cache():
+    """Povzetki priponk po SHA-256 datoteke (neodvisni od poizvedbe, zato jih lahko delijo vse seje)."""
+    return ResponseDiskCache(DIGEST_CACHE_DIR, DIGEST_CACHE_MAX_BYTES)
+
+# =========================================================================
+# 2. SINTEZNI CEVOVOD (brez uporabniškega vmesnika)
+# =========================================================================
+GROQ_BASE_URL = os.environ.get("SIS_GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+SYNTHESIS_MODEL = "llama-3.3-70b-versatile"
+SYNTHESIS_MAX_TOKENS = 4000
+SUMMARY_MODEL = "llama-3.1-8b-instant"  # hiter model za povzemanje odsekov priponk
+GRAPH_MODEL = "llama-3.1-8b-instant"    # graf v JSON načinu, vzporedno z disertacijo
+GRAPH_MAX_TOKENS = 3000
+GRAPH_TEMPERATURE = 0.3
+LLM_PARALLEL_WORKERS = 16
+
+LOGIC_MODES = {
+    "Strict hierarchical logic": "Uporabi IZKLJUČNO hierarhične relacije: TT (Top Term), BT (Broader Term), NT (Narrower Term). Fokus na vertikalni taksonomiji.",
+    "Relational logic": "Uporabi IZKLJUČNO lateralne relacije: AS (Associative), EQ (Equivalent), IN (Inheritance/Class). Fokus na mrežni povezanosti.",
+    "Hierarchical associative logic": "Uporabi CELOTEN nabor relacij: TT (Top Term), BT (Broader Term), NT (Narrower Term), RT (Related Term), AS (Associative), EQ (Equivalent) in IN (Inheritance/Instance).",
+}
+
+# Omejitve na API ključ; privzete vrednosti ustrezajo brezplačnemu Groq nivoju za llama-3.3-70b.
+GROQ_RPM = int(os.environ.get("SIS_GROQ_RPM", "30"))
+GROQ_TPM = int(os.environ.get("SIS_GROQ_TPM", "12000"))
+GROQ_MAX_CONCURRENCY = int(os.environ.get("SIS_GROQ_MAX_CONCURRENCY", "4"))
+
+@process_resource
+def get_llm_executor():
+    """Deljen bazen niti za LLM zahteve, ki tečejo vzporedno z glavno (npr. graf ob disertaciji)."""
+    return ThreadPoolExecutor(max_workers=LLM_PARALLEL_WORKERS, thread_name_prefix="llm-parallel")
+
+@process_resource
+def get_history():
+    """Procesno deljena trajna zgodovina sintez."""
+    return SynthesisHistory(HISTORY_DIR)
+
+@process_resource
+def get_graph_store():
+    """Procesno deljena shramba združenih semantičnih omrežij vseh sintez."""
+    return GraphStore(GRAPH_STORE_PATH)
+
+@process_resource
+def get_ontology_index():
+    """Indeksi IMA in MA ontologij za preverjanje grafov (zgrajeni enkrat na proces)."""
+    return OntologyIndex(HUMAN_THINKING_METAMODEL, MENTAL_APPROACHES_ONTOLOGY)
+
+@process_resource
+def get_ontology_selector():
+    """TF-IDF indeks vozlišč IMA/MA in vnosov baze znanja za izbiro podgrafa navodila."""
+    return OntologySelector(ONTOLOGIES, knowledge_base_entries())
+
+@process_resource
+def get_scheduler():
+    """Procesno deljen razporejevalnik Groq klicev (vse seje in paketna opravila)."""
+    return GroqScheduler(rpm=GROQ_RPM, tpm=GROQ_TPM or None, max_concurrency=GROQ_MAX_CONCURRENCY)
+
+def make_client(api_key, base_url=GROQ_BASE_URL):
+    """OpenAI-združljiv odjemalec za Groq, ki gre skozi skupni razporejevalnik.
+
+    Vgrajeno ponavljanje odjemalca je izklopljeno; ponovitve in 429 obravnava razporejevalnik.
+    """
+    return ScheduledClient(OpenAI(api_key=api_key, base_url=base_url, max_retries=0), get_scheduler(), api_key)
+
+CLIENT_POOL_SIZE = 16
+_client_pool = OrderedDict()
+_client_pool_lock = threading.Lock()
+
+def get_client(api_key, base_url=GROQ_BASE_URL):
+    """Odjemalec iz procesnega bazena, ključ je SHA-256 API ključa in naslova.
+
+    Isti ključ dobi istega odjemalca (in njegov HTTP bazen povezav) v vseh zagonih skripte.
+    """
+    pool_key = hashlib.sha256(f"{base_url}\x1f{api_key}".encode("utf-8")).hexdigest()
+    with _client_pool_lock:
+        client = _client_pool.get(pool_key)
+        if client is None:
+            client = _client_pool[pool_key] = make_client(api_key, base_url)
+            while len(_client_pool) > CLIENT_POOL_SIZE:
+                _client_pool.popitem(last=False)
+        _client_pool.move_to_end(pool_key)
+        return client
+
+def resolve_logic_mode(user_query, idea_query, logic_type=""):
+    """Določi način (ideje/sinteza) in arhitekturno logiko; vrne (is_idea_mode, logic_type, logic_desc)."""
+    # --- DEFINE LOGIC FLAGS ---
+    full_text_input = (user_query + " " + idea_query).lower()
+
+    # Identify if the demand involves production
+    is_idea_mode = (idea_query.strip() != "") or ("create useful ideas" in full_text_input) or ("innovative ideas" in full_text_input)
+
+    # Determine logic type based on specific demands (ali eksplicitno podana logika)
+    if logic_type not in LOGIC_MODES:
+        if "use strict hierarchical logic" in full_text_input:
+            logic_type = "Strict hierarchical logic"
+        elif "use relational logic" in full_text_input:
+            logic_type = "Relational logic"
+        else:
+            logic_type = "Hierarchical associative logic"
+    return is_idea_mode, logic_type, LOGIC_MODES[logic_type]
+
+def build_query_context(user_query, idea_query, attachment_excerpt=""):
+    """Uporabniško sporočilo: obe poizvedbi in (po želji) izbrani odseki priponke."""
+    context = f"""
+[PRIMARY SYNTHESIS INQUIRY]: {user_query}
+[IDEA PRODUCTION INQUIRY]: {idea_query}
+"""
+    if attachment_excerpt:
+        context += f"\n\n[SUPPLEMENTAL DATA FROM ATTACHMENT]:\n{attachment_excerpt}"
+    return context
+
+def attachment_digest(text, client, token_budget, file_hash=None, model=SUMMARY_MODEL, on_progress=None, trace=NULL_TRACE):
+    """Map-reduce povzetek celotne priponke znotraj proračuna žetonov, predpomnjen po zgoščeni vrednosti datoteke.
+
+    Vrne (digest, statistika); `statistika["cached"]` pove, ali je bil povzetek že na disku.
+    """
+    file_hash = file_hash or hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{file_hash}|{token_budget}|{model}".encode("utf-8")).hexdigest()
+    with trace.span("attachment.digest", bytes=len(text.encode("utf-8")), token_budget=token_budget) as sp:
+        cached = get_digest_cache().get(key)
+        if cached is not None:
+            sp["cached"] = True
+            return cached["digest"], dict(cached["stats"], cached=True)
+
+        def summarize(instruction, part, max_tokens):
+            with trace.span("attachment.summarize", parent="attachment.digest", bytes=len(part.encode("utf-8"))):
+                response = client.chat.completions.create(
+                    model=model, temperature=0.2, max_tokens=max_tokens,
+                    messages=[{"role": "system", "content": instruction}, {"role": "user", "content": part}],
+                )
+                return (response.choices[0].message.content or "").strip()
+
+        digest, stats = map_reduce_digest(text, summarize, token_budget, on_progress=on_progress)
+        sp.update(cached=False, chunks=stats["chunks"], failed=stats["failed"])
+        # Delno neuspel povzetek ne gre v predpomnilnik, da se ob naslednjem zagonu popravi.
+        if not stats["failed"]:
+            get_digest_cache().put(key, {"digest": digest, "stats": stats, "model": model, "created": time.time()})
+    return digest, dict(stats, cached=False)
+
+@dataclass
+class SynthesisConfig:
+    """Konfiguracija ene sinteze; ustreza izbiram v nadzorni plošči aplikacije."""
+    sciences: list = field(default_factory=lambda: ["Physics", "Psychology", "Sociology"])
+    profiles: list = field(default_factory=lambda: ["Adventurers"])
+    expertise: str = "Expert"
+    models: list = field(default_factory=lambda: ["Concepts"])
+    paradigms: list = field(default_factory=lambda: ["Rationalism"])
+    goal_context: str = "Scientific Research"
+    approaches: list = field(default_factory=lambda: ["Perspective shifting"])
+    methods: list = field(default_factory=list)
+    tools: list = field(default_factory=list)
+    authors: str = ""
+    user_query: str = ""
+    idea_query: str = ""
+    logic_type: str = ""                 # prazno: določi se iz poizvedbe
+    attachment_text: str = ""
+    attachment_token_budget: int = 2000
+    attachment_mode: str = "excerpts"    # "excerpts" (BM25 odseki) ali "digest" (povzetek celotne datoteke)
+    ontology_token_budget: int = ONTOLOGY_TOKEN_BUDGET  # 0: celotni ontologiji
+    model: str = SYNTHESIS_MODEL
+    max_tokens: int = SYNTHESIS_MAX_TOKENS
+    graph_mode: str = "parallel"         # "parallel" (ločena JSON zahteva na graph_model) ali "inline" (graf na koncu disertacije)
+    idea_candidates: int = 1             # v načinu produkcije idej: število vzporednih kandidatov (1 = en klic)
+    graph_model: str = GRAPH_MODEL
+    graph_max_tokens: int = GRAPH_MAX_TOKENS
+
+    @classmethod
+    def from_dict(cls, data):
+        """Zgradi konfiguracijo iz slovarja (npr. vrstice JSONL); neznani ključi se prezrejo."""
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        if isinstance(known.get("authors"), list):
+            known["authors"] = ", ".join(known["authors"])
+        return cls(**known)
+
+    def to_record(self):
+        """Serializabilen zapis brez besedila priponke (to je lahko veliko)."""
+        record = asdict(self)
+        record["attachment_chars"] = len(record.pop("attachment_text"))
+        return record
+
+    def selections(self):
+        """Izbire uporabnika, ki se navedejo v navodilu (oznaka -> seznam)."""
+        return {"Structural models": self.models, "Scientific paradigms": self.paradigms,
+                "Methods": self.methods, "Tools": self.tools}
+
+    def ontology_subgraphs(self):
+        """Podgraf IMA/MA, relevanten za poizvedbo in izbire; None pomeni celotni ontologiji."""
+        if not self.ontology_token_budget:
+            return None, {}
+        return get_ontology_selector().select(
+            f"{self.user_query} {self.idea_query}",
+            selections=[*self.sciences, *self.models, *self.paradigms, *self.methods, *self.tools],
+            seeds=self.approaches, token_budget=self.ontology_token_budget,
+        )
+
+    def query_context(self, client=None, trace=NULL_TRACE):
+        """Uporabniško sporočilo; povzetek priponke potrebuje odjemalca, sicer se uporabijo odseki."""
+        excerpt = ""
+        if self.attachment_text and self.attachment_mode == "digest" and client is not None:
+            excerpt, _ = attachment_digest(self.attachment_text, client, self.attachment_token_budget, trace=trace)
+        elif self.attachment_text:
+            index = build_chunk_index(self.attachment_text)
+            excerpt, _, _ = select_relevant_chunks(index, f"{self.user_query} {self.idea_query}", self.attachment_token_budget)
+        return build_query_context(self.user_query, self.idea_query, excerpt)
+
+@dataclass
+class SynthesisResult:
+    text: str
+    markdown: str                        # disertacija z oznakami vozlišč in avtorjev
+    graph: object                        # SemanticGraph ali None
+    biblio: str
+    logic_type: str
+    is_idea_mode: bool
+    prompt_sections: dict
+    query_context: str
+    cached: bool = False
+    cached_at: float = 0.0
+    timings: dict = field(default_factory=dict)
+    graph_report: dict = field(default_factory=dict)  # števci popravkov normalizacije grafa
+    trace: object = None                 # Trace z razponi stopenj (diagnostika)
+    graph_mode: str = "inline"
+
+    def to_record(self):
+        """JSON-serializabilen zapis rezultata (za JSONL izvoz)."""
+        # asdict bi globoko kopiral tudi sled (ta vsebuje ključavnico), zato polja beremo neposredno.
+        record = {name: getattr(self, name) for name in self.__dataclass_fields__}
+        record["graph"] = self.graph.to_dict() if self.graph is not None else None
+        record["trace"] = self.trace.records() if self.trace is not None else []
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        """Obnovi rezultat iz zapisa `to_record` (npr. iz zgodovine)."""
+        data = {k: v for k, v in record.items() if k in cls.__dataclass_fields__}
+        data.setdefault("query_context", "")   # zgodovina ga ne shranjuje
+        graph = data.get("graph")
+        data["graph"] = SemanticGraph.from_dict(graph, repaired=graph.get("repaired", False)) if graph else None
+        data["trace"] = Trace.from_records(data["trace"]) if data.get("trace") else None
+        return cls(**data)
+
+def run_synthesis(config, client, on_prose=None, query_context=None, use_response_cache=False, force_fresh=False, trace=None,
+                  biblio_prefetch=None):
+    """Izvede celoten cevovod: bibliografije, navodilo, LLM klic, razčlenitev grafa in označevanje.
+
+    `on_prose` omogoči pretočni izpis (prejema sproti zbrano prozo); brez njega je klic
+    blokirajoč. `query_context` lahko poda klicatelj, ki ima priponko že indeksirano,
+    `biblio_prefetch` (BiblioPrefetcher) pa bibliografije, zajete že med pisanjem.
+    Vsaka stopnja se zapiše kot razpon v `trace` (privzeto nova sled v `result.trace`).
+    """
+    trace = trace if trace is not None else Trace()
+    timings = {}
+    with trace.span("synthesis") as root:
+        result = _run_synthesis_stages(config, client, on_prose, query_context, use_response_cache, force_fresh, trace, timings,
+                                       biblio_prefetch)
+        root["logic_type"] = result.logic_type
+        root["cached"] = result.cached
+    for name, key in (("biblio", "biblio_s"), ("llm.request", "llm_s"), ("ideas.candidates", "llm_s"), ("llm.graph", "graph_llm_s"), ("graph.parse", "parse_s"),
+                      ("graph.normalize", "validate_s"), ("annotate", "annotate_s"), ("synthesis", "total_s")):
+        durations = [r["duration_ms"] for r in trace.spans if r["name"] == name]
+        if durations:
+            timings[key] = durations[0] / 1000
+    result.timings = timings
+    result.trace = trace
+    return result
+
+def _run_synthesis_stages(config, client, on_prose, query_context, use_response_cache, force_fresh, trace, timings,
+                          biblio_prefetch=None):
+    is_idea_mode, logic_type, logic_desc = resolve_logic_mode(config.user_query, config.idea_query, config.logic_type)
+    if query_context is None:
+        with trace.span("attachment.select", bytes=len(config.attachment_text.encode("utf-8"))) if config.attachment_text else nullcontext():
+            query_context = config.query_context(client, trace)
+
+    if not config.authors:
+        biblio = ""
+    elif biblio_prefetch is not None:
+        biblio = biblio_prefetch.collect(config.authors, BIBLIO_DEADLINE, trace)
+    else:
+        biblio = fetch_author_bibliographies(config.authors, trace=trace)
+
+    with trace.span("ontology.select", token_budget=config.ontology_token_budget) as sp:
+        subgraphs, select_stats = config.ontology_subgraphs()
+        sp.update(select_stats)
+
+    # SISTEMSKO NAVODILO (Full dissertation requirement)
+    # Statična predpona je enaka pri vseh klicih; podgraf IMA/MA, logika, način, polja in avtorji so na koncu.
+    # Pri "parallel" disertacijo piše glavni model, graf pa hkrati manjši model v JSON načinu.
+    # Več kandidatov idej: vsak je samostojna zahteva s svojim poudarkom MA, graf pa vedno ločena zahteva.
+    use_candidates = is_idea_mode and config.idea_candidates > 1
+    parallel_graph = config.graph_mode == "parallel" or use_candidates
+    with trace.span("prompt.build") as sp:
+        sys_prompt, prompt_sections = build_system_prompt(logic_type, logic_desc, is_idea_mode, config.sciences, biblio,
+                                                          subgraphs, config.selections(), "prose" if parallel_graph else "inline")
+        create_kwargs = dict(
+            model=config.model,
+            messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": query_context}],
+            temperature=0.75 if is_idea_mode else 0.45,
+            max_tokens=config.max_tokens,
+        )
+        sp["bytes"] = len(sys_prompt.encode("utf-8")) + len(query_context.encode("utf-8"))
+        sp["tokens_est"] = estimate_tokens(sys_prompt) + estimate_tokens(query_context)
+        if parallel_graph:
+            graph_prompt, _ = build_system_prompt(logic_type, logic_desc, is_idea_mode, config.sciences, "",
+                                                  subgraphs, config.selections(), "graph")
+            graph_kwargs = dict(
+                model=config.graph_model,
+                messages=[{"role": "system", "content": graph_prompt}, {"role": "user", "content": query_context}],
+                temperature=GRAPH_TEMPERATURE,
+                max_tokens=config.graph_max_tokens,
+                response_format={"type": "json_object"},
+            )
+            sp["bytes"] += len(graph_prompt.encode("utf-8")) + len(query_context.encode("utf-8"))
+            sp["tokens_est"] += estimate_tokens(graph_prompt) + estimate_tokens(query_context)
+        emphases = idea_emphases(config.approaches, config.idea_candidates) if use_candidates else []
+        candidate_kwargs = [idea_candidate_kwargs(create_kwargs, i, emphasis) for i, emphasis in enumerate(emphases)]
+
+    with trace.span("cache.lookup", enabled=bool(use_response_cache and not force_fresh)) as sp:
+        prose_key = llm_request_key(**create_kwargs)
+        if candidate_kwargs:
+            cache_key = llm_request_key(candidates=candidate_kwargs, graph=graph_kwargs)
+        else:
+            cache_key = llm_request_key(prose=create_kwargs, graph=graph_kwargs) if parallel_graph else prose_key
+        cached = get_response_cache().get(cache_key) if use_response_cache and not force_fresh else None
+        sp["hit"] = cached is not None
+    if cached is not None:
+        text_out = cached["text"]
+        graph = SemanticGraph.from_dict(cached["graph"], repaired=cached["graph"].get("repaired", False)) if cached.get("graph") else None
+    else:
+        complete = True   # nepopoln odgovor (npr. neuspela zahteva za graf) se ne predpomni
+        graph_future = get_llm_executor().submit(_request_graph, client, graph_kwargs, force_fresh, trace) if parallel_graph else None
+        if candidate_kwargs:
+            text_out, failed_candidates = _produce_idea_candidates(client, on_prose, candidate_kwargs, emphases,
+                                                                   config.sciences, force_fresh, trace, timings)
+            complete = not failed_candidates   # delni nabor idej se ne predpomni
+        else:
+            with trace.span("llm.request", model=config.model, stream=on_prose is not None) as sp:
+                t_start = time.perf_counter()
+                first_update = []
+
+                def follow(partial):
+                    if not first_update:
+                        first_update.append(time.perf_counter() - t_start)
+                    on_prose(partial)
+                # Enake zahteve v teku (npr. več udeležencev delavnice s privzeto konfiguracijo) se združijo;
+                # "force fresh" pa vedno zahteva nov vzorec.
+                if force_fresh:
+                    outcome, coalesced = _request_completion(client, on_prose, create_kwargs), False
+                else:
+                    outcome, coalesced = get_single_flights()["llm"].do(
+                        prose_key, lambda publish: _request_completion(client, on_prose, create_kwargs, publish),
+                        on_update=follow if on_prose is not None else None)
+                text_out, usage = outcome["text"], outcome["usage"]
+                sp["coalesced"] = coalesced
+                if coalesced:
+                    ttft_s = first_update[0] if first_update else time.perf_counter() - t_start
+                    if on_prose is not None:
+                        on_prose(text_out.split(GRAPH_JSON_MARKER, 1)[0])
+                else:
+                    ttft_s = outcome["ttft_s"]
+                    # Čakanje v vrsti razporejevalnika (Groq omejitve) je del tega razpona.
+                    request_stats = client.last_request_stats() if hasattr(client, "last_request_stats") else {}
+                    if request_stats:
+                        sp["queue_wait_ms"] = round(request_stats["queue_wait_s"] * 1000, 3)
+                        sp["attempts"] = request_stats["attempts"]
+                    if usage:
+                        sp["prompt_tokens"], sp["completion_tokens"] = usage["prompt_tokens"], usage["completion_tokens"]
+                if on_prose is not None:
+                    timings["ttft_s"] = ttft_s
+                    sp["ttft_ms"] = round(ttft_s * 1000, 3)
+                sp["bytes"] = len(text_out.encode("utf-8"))
+        if graph_future is not None:
+            # Proza in graf se združita v enoten odgovor, kot bi ga vrnil en klic.
+            try:
+                graph_text = graph_future.result()
+            except Exception:
+                graph_text = ""   # napaka je zapisana v razponu llm.graph; disertacija ostane
+                complete = False
+            text_out = f"{text_out.split(GRAPH_JSON_MARKER, 1)[0].rstrip()}\n\n{GRAPH_JSON_MARKER}\n{graph_text}"
+        tail = text_out.split(GRAPH_JSON_MARKER, 1)
+        # Graf se razčleni enkrat in ga uporabita tako označevanje kot vizualizacija.
+        with trace.span("graph.parse", bytes=len(tail[1].encode("utf-8")) if len(tail) > 1 else 0) as sp:
+            graph = extract_semantic_graph(tail[1]) if len(tail) > 1 else None
+            sp["nodes"], sp["edges"] = (len(graph.nodes), len(graph.edges)) if graph is not None else (0, 0)
+            if graph is not None and graph.warnings:
+                sp["warnings"] = len(graph.warnings)
+        if use_response_cache and complete:
+            with trace.span("cache.store"):
+                get_response_cache().put(cache_key, {
+                    "text": text_out, "graph": graph.to_dict() if graph is not None else None,
+                    "model": create_kwargs["model"], "created": time.time(),
+                })
+
+    # Predpomnilnik hrani surov graf; normalizacija je poceni in sledi trenutnim pravilom.
+    graph_report = {}
+    if graph is not None:
+        with trace.span("graph.normalize", nodes=len(graph.nodes), edges=len(graph.edges)) as sp:
+            try:
+                graph, graph_report = normalize_graph(graph, logic_type, get_ontology_index())
+            except Exception as e:
+                # Normalizacija je izboljšava: ob napaki ostane surov graf, plačana sinteza pa se ne izgubi.
+                sp["error"] = type(e).__name__
+
+    # --- PROCESIRANJE BESEDILA (Google Search + Authors + Anchors) ---
+    with trace.span("annotate") as sp:
+        main_markdown = annotate_markdown(text_out.split(GRAPH_JSON_MARKER)[0], graph, config.authors)
+        sp["bytes"] = len(main_markdown.encode("utf-8"))
+
+    return SynthesisResult(
+        text=text_out, markdown=main_markdown, graph=graph, biblio=biblio,
+        logic_type=logic_type, is_idea_mode=is_idea_mode, prompt_sections=prompt_sections,
+        query_context=query_context, cached=cached is not None,
+        cached_at=cached.get("created", 0.0) if cached else 0.0, graph_report=graph_report, graph_mode=config.graph_mode,
+    )
@@ -0,0 +1,357 @@
+"""Razčlenjevanje semantičnega grafa (SEMANTIC_GRAPH_JSON) iz odgovora jezikovnega modela.
+
+Modul ne uvaža Streamlita, zato ga lahko uporabljajo tudi skripte in meritve.
+"""
+import json
+import re
+import urllib.parse
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import NamedTuple
+
+_DECODER = json.JSONDecoder()
+_CLOSERS = {"{": "}", "[": "]"}
+# Strukturni žetoni JSON-a; niz se ujame v celoti (tudi nezaključen na koncu vhoda).
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"?|[{}\[\],]')
+_GRAPH_START_RE = re.compile(r'\{\s*"(?:nodes|edges)"')
+
+
+class GraphNode(NamedTuple):
+    id: str
+    label: str
+    type: str = "Branch"
+    color: str = "#2a9d8f"
+    shape: str = "ellipse"
+
+
+class GraphEdge(NamedTuple):
+    source: str
+    target: str
+    rel_type: str = "AS"
+
+
+_SCALARS = (str, int, float)
+
+
+def _scalar_text(value, default=None):
+    """Skalarno polje kot niz; manjkajoče, prazno ali sestavljeno (seznam, slovar) -> `default`."""
+    if isinstance(value, str):
+        return value or default
+    if isinstance(value, _SCALARS):  # tudi bool
+        return str(value)
+    return default
+
+
+@dataclass
+class SemanticGraph:
+    nodes: list = field(default_factory=list)
+    edges: list = field(default_factory=list)
+    repaired: bool = False  # True, če je bil JSON pred razčlenitvijo popravljen
+    warnings: list = field(default_factory=list)  # opisi delov JSON-a, ki niso imeli pričakovane oblike
+
+    @classmethod
+    def from_dict(cls, data, repaired=False):
+        """Zgradi tipiziran graf iz surovega slovarja; nepopolna vozlišča/povezave izpusti.
+
+        Napačna oblika (npr. `"nodes": 5`) ne sproži izjeme: ustrezni del ostane prazen
+        in opis se doda v `warnings`.
+        """
+        if not isinstance(data, dict):
+            return cls(repaired=repaired, warnings=[f"graph JSON is {type(data).__name__}, not an object"])
+        warnings = [w for w in data.get("warnings") or [] if isinstance(w, str)]
+        raw = {}
+        for key in ("nodes", "edges"):
+            items = data.get(key)
+            if items is None:
+                items = []
+            elif not isinstance(items, list):
+                warnings.append(f"'{key}' is {type(items).__name__}, not a list")
+                items = []
+            skipped = sum(1 for item in items if not isinstance(item, dict))
+            if skipped:
+                warnings.append(f"{skipped} {key} entries are not objects")
+            raw[key] = [item for item in items if isinstance(item, dict)]
+        nodes, edges = [], []
+        for n in raw["nodes"]:
+            nid, label = _scalar_text(n.get("id")), _scalar_text(n.get("label"))
+            if nid is None or label is None:
+                continue
+            nodes.append(GraphNode(
+                id=nid, label=label,
+                type=_scalar_text(n.get("type"), "Branch"), color=_scalar_text(n.get("color"), "#2a9d8f"),
+                shape=_scalar_text(n.get("shape"), "ellipse"),
+            ))
+        for e in raw["edges"]:
+            source, target = _scalar_text(e.get("source")), _scalar_text(e.get("target"))
+            if source is None or target is None:
+                continue
+            edges.append(GraphEdge(source=source, target=target, rel_type=_scalar_text(e.get("rel_type"), "AS")))
+        return cls(nodes=nodes, edges=edges, repaired=repaired, warnings=warnings)
+
+    def to_dict(self):
+        """Serializira graf v slovar, ki ga `from_dict` prebere nazaj (npr. za predpomnilnik)."""
+        return {
+            "nodes": [n._asdict() for n in self.nodes],
+            "edges": [e._asdict() for e in self.edges],
+            "repaired": self.repaired,
+            "warnings": list(self.warnings),
+        }
+
+
+def repair_json_fragment(fragment):
+    """Popravi tipične napake LLM JSON-a v enem prehodu.
+
+    Odstrani viseče in podvojene vejice, odreže nedokončan zadnji element
+    in zapre vse odprte tabele in objekte. Pregled teče po strukturnih žetonih
+    (nizi se preskočijo v celoti), zato je linearen v dolžini vhoda.
+    """
+    stack = []
+    drops = []              # položaji vejic, ki jih izpustimo
+    prev_tok, prev_end = "", 0
+    safe_pos, safe_stack = 0, ()
+    end_pos = None
+
+    for m in _TOKEN_RE.finditer(fragment):
+        tok = m.group()
+        start = m.start()
+        c = tok[0]
+        if c == '"':
+            if len(tok) < 2 or tok[-1] != '"' or _odd_backslashes(tok):
+                break  # nezaključen niz na koncu
+        elif c in _CLOSERS:
+            stack.append(_CLOSERS[c])
+        elif c == ",":
+            if prev_tok in ",[{" and _only_space(fragment, prev_end, start):
+                drops.append(start)  # dvojna ali začetna vejica
+                continue
+            safe_pos, safe_stack = start, tuple(stack)
+        else:
+            if not stack:
+                break
+            if prev_tok == "," and _only_space(fragment, prev_end, start):
+                drops.append(prev_end - 1)
+            stack.pop()
+            safe_pos, safe_stack = m.end(), tuple(stack)
+            if not stack:
+                end_pos = safe_pos
+                break
+        prev_tok, prev_end = c, m.end()
+
+    if end_pos is not None:
+        return _without(fragment[:end_pos], drops)
+    # Vhod je bil odrezan: vrnemo se na zadnjo točko, kjer je bil element zaključen.
+    text = _without(fragment[:safe_pos], [d for d in drops if d < safe_pos]).rstrip().rstrip(",")
+    return text + "".join(reversed(safe_stack))
+
+
+def _only_space(text, start, end):
+    return start == end or text[start:end].isspace()
+
+
+def _odd_backslashes(tok):
+    body = tok[:-1]
+    return (len(body) - len(body.rstrip("\\"))) % 2 == 1
+
+
+def _without(text, positions):
+    if not positions:
+        return text
+    pieces, last = [], 0
+    for p in positions:
+        pieces.append(text[last:p])
+        last = p + 1
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def extract_semantic_graph(tail):
+    """Iz repa odgovora izlušči prvi JSON objekt z vozlišči/povezavami in vrne SemanticGraph ali None.
+
+    Kandidati `{` se pregledujejo zaporedno z `JSONDecoder.raw_decode`, zato besedilo
+    za objektom ne moti razčlenitve. Neveljaven kandidat, ki se začne kot graf
+    (`{"nodes"`/`{"edges"`), se popravi z `repair_json_fragment`.
+    """
+    if not tail:
+        return None
+    pos = tail.find("{")
+    while pos >= 0:
+        try:
+            obj, end = _DECODER.raw_decode(tail, pos)
+        except ValueError:
+            if _GRAPH_START_RE.match(tail, pos):
+                try:
+                    obj = json.loads(repair_json_fragment(tail[pos:]))
+                except ValueError:
+                    obj = None
+                if isinstance(obj, dict):
+                    return SemanticGraph.from_dict(obj, repaired=True)
+            pos = tail.find("{", pos + 1)
+            continue
+        if isinstance(obj, dict) and ("nodes" in obj or "edges" in obj):
+            return SemanticGraph.from_dict(obj)
+        pos = tail.find("{", end)
+    return None
+
+
+def build_cytoscape_elements(graph, positions=None, sizes=None):
+    """Pretvori SemanticGraph v seznam elementov za Cytoscape.js.
+
+    `positions` ({id: {"x", "y"}}) doda vnaprej izračunane položaje za `preset` postavitev,
+    `sizes` ({id: px}) pa povozi velikost po tipu (npr. meta-vozlišča gruč).
+    """
+    elements = []
+    for n in graph.nodes:
+        level = n.type
+        size = 100 if level == "Class" else (90 if level == "Root" else (70 if level == "Branch" else 50))
+        if sizes and n.id in sizes:
+            size = sizes[n.id]
+        element = {"data": {
+            "id": n.id, "label": n.label, "color": n.color,
+            "size": size, "shape": n.shape, "z_index": 10 if level in ["Root", "Class"] else 1
+        }}
+        if positions and n.id in positions:
+            element["position"] = positions[n.id]
+        elements.append(element)
+    for e in graph.edges:
+        elements.append({"data": {
+            "source": e.source, "target": e.target, "rel_type": e.rel_type
+        }})
+    return elements
+
+
+# --- ENOPREHODNO OZNAČEVANJE (Aho-Corasick) ---
+class _AhoCorasick:
+    """Avtomat Aho-Corasick nad vnaprej normaliziranimi (male črke) vzorci."""
+
+    def __init__(self, keys):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for pid, key in enumerate(keys):
+            if not key:
+                continue
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                    nxt = len(self.goto) - 1
+                    self.goto[state][ch] = nxt
+                state = nxt
+            self.out[state] = self.out[state] + (pid,)
+        queue = deque(self.goto[0].values())
+        while queue:
+            r = queue.popleft()
+            for ch, u in self.goto[r].items():
+                queue.append(u)
+                f = self.fail[r]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[u] = self.goto[f].get(ch, 0)
+                self.out[u] = self.out[u] + self.out[self.fail[u]]
+
+    def iter_matches(self, text):
+        """Vrne seznam parov (konec, id vzorca) za vse pojavitve v `text`."""
+        goto, fail, out = self.goto, self.fail, self.out
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            if nxt is None:
+                state = 0
+                continue
+            state = nxt
+            if out[state]:
+                end = i + 1
+                matches.extend((end, pid) for pid in out[state])
+        return matches
+
+
+def _fold_case(text):
+    """Male črke brez spremembe dolžine, da se položaji ujemajo z izvirnikom."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class MultiPatternAnnotator:
+    """Vse oznake in avtorje zamenja v enem prehodu z avtomatom (najdaljše ujemanje ima prednost).
+
+    Vsak vzorec ima seznam zamenjav: oznake vozlišč se porabijo po ena na pojavitev
+    (ponovljena oznaka dobi naslednje vozlišče), avtorji pa se zamenjajo povsod.
+    Vstavljeni HTML se nikoli ne pregleduje ponovno.
+    """
+
+    def __init__(self, patterns):
+        # patterns: seznam (besedilo, [html zamenjave], ponavljaj_zadnjo)
+        merged = {}
+        for text, replacements, repeat in patterns:
+            key = _fold_case(text)
+            if not key:
+                continue
+            entry = merged.setdefault(key, [[], False])
+            entry[0].extend(replacements)
+            entry[1] = entry[1] or repeat
+        self.keys = list(merged)
+        self.replacements = [merged[k][0] for k in self.keys]
+        self.repeat = [merged[k][1] for k in self.keys]
+        self.lengths = [len(k) for k in self.keys]
+        self.automaton = _AhoCorasick(self.keys)
+
+    def annotate(self, text):
+        matches = [(end - self.lengths[pid], end, pid) for end, pid in self.automaton.iter_matches(_fold_case(text))]
+        if not matches:
+            return text
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        used = [0] * len(self.keys)
+        pieces, cursor = [], 0
+        for start, end, pid in matches:
+            if start < cursor:
+                continue
+            reps = self.replacements[pid]
+            if used[pid] >= len(reps):
+                if not self.repeat[pid]:
+                    continue
+                rep = reps[-1]
+            else:
+                rep = reps[used[pid]]
+            used[pid] += 1
+            pieces.append(text[cursor:start])
+            pieces.append(rep)
+            cursor = end
+        pieces.append(text[cursor:])
+        return "".join(pieces)
+
+
+def node_link_html(label, node_id):
+    g_url = urllib.parse.quote(label)
+    return f'<span id="{node_id}"><a href="https://www.google.com/search?q={g_url}" target="_blank" class="semantic-node-highlight">{label}<i class="google-icon">↗</i></a></span>'
+
+
+def author_link_html(name):
+    a_url = urllib.parse.quote(name)
+    return f'<a href="https://www.google.com/search?q={a_url}" target="_blank" class="author-search-link">{name}<i class="google-icon">↗</i></a>'
+
+
+@lru_cache(maxsize=64)
+def get_annotator(node_items, authors):
+    """Vrne (predpomnjen) označevalnik za dani nabor (id, oznaka) vozlišč in avtorjev."""
+    patterns = [(lbl, [node_link_html(lbl, nid)], False) for nid, lbl in node_items]
+    patterns += [(name, [author_link_html(name)], True) for name in authors]
+    return MultiPatternAnnotator(patterns)
+
+
+def annotate_markdown(markdown, graph=None, author_input=""):
+    """Koncepte iz grafa poveže z Google iskanjem in ID značko, avtorje pa z Google iskanjem."""
+    node_items = tuple((n.id, n.label) for n in graph.nodes) if graph is not None else ()
+    authors = tuple(a.strip() for a in (author_input or "").split(",") if a.strip())
+    if not node_items and not authors:
+        return markdown
+    return get_annotator(node_items, authors).annotate(markdown)
@@ -0,0 +1,306 @@
+"""Trajna shramba znanja: semantična omrežja vseh sintez, združena v en graf (SQLite).
+
+Vozlišča se združijo v kanonične pojme po ključu oznake (male črke, strnjeni presledki),
+povezave po (vir, relacija, cilj) s številom ponovitev kot utežjo. Vsaka sinteza se
+doda z inkrementalnimi upsert-i v eni transakciji. Iskanje po oznakah gre prek FTS5,
+sosedje in k-skokna razširitev prek indeksov povezav, tabela omemb pa pove, katere
+sinteze omenjajo pojem. Vsaka sinteza ima lastnika (kot zgodovina); poizvedbe z `owner`
+vidijo le pojme, sosede in sinteze tega lastnika. Modul ne uvaža Streamlita.
+
+Uvoz obstoječih rezultatov in poizvedbe iz ukazne vrstice:
+    python sis_graphstore.py .sis_cache/graph.sqlite3 --import results.jsonl
+    python sis_graphstore.py .sis_cache/graph.sqlite3 --neighbors "Cognition" --hops 2
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from sis_graph import GraphEdge, GraphNode, SemanticGraph
+from sis_ontology import label_key
+
+SQL_BATCH = 900               # največ parametrov v enem IN (...)
+KHOP_MAX_NODES = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS concepts (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    label TEXT NOT NULL,
+    type TEXT, color TEXT, shape TEXT,
+    mentions INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL, last_seen REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS concepts_fts USING fts5(label, content='concepts', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS concepts_ai AFTER INSERT ON concepts BEGIN
+    INSERT INTO concepts_fts(rowid, label) VALUES (new.id, new.label);
+END;
+CREATE TRIGGER IF NOT EXISTS concepts_au AFTER UPDATE OF label ON concepts BEGIN
+    INSERT INTO concepts_fts(concepts_fts, rowid, label) VALUES ('delete', old.id, old.label);
+    INSERT INTO concepts_fts(rowid, label) VALUES (new.id, new.label);
+END;
+CREATE TABLE IF NOT EXISTS edges (
+    src INTEGER NOT NULL, rel_type TEXT NOT NULL, dst INTEGER NOT NULL,
+    weight INTEGER NOT NULL DEFAULT 1,
+    first_seen REAL, last_seen REAL,
+    PRIMARY KEY (src, rel_type, dst)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_dst ON edges(dst, rel_type, src);
+CREATE INDEX IF NOT EXISTS edges_rel ON edges(rel_type);
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY, created REAL, title TEXT, logic_type TEXT, nodes INTEGER, edges INTEGER, owner TEXT
+);
+CREATE TABLE IF NOT EXISTS mentions (
+    concept INTEGER NOT NULL, run TEXT NOT NULL,
+    PRIMARY KEY (concept, run)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS mentions_run ON mentions(run);
+"""
+# Pojmi, ki jih omenja vsaj ena sinteza lastnika (parameter: lastnik).
+_OWNED_CONCEPTS = "SELECT m.concept FROM runs r CROSS JOIN mentions m ON m.run = r.id WHERE r.owner = ?"
+
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _batches(items, size=SQL_BATCH):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class GraphStore:
+    """Povezave na bazo so ločene po nitih (WAL: bralci ne čakajo pisca); pisanje je zaporedno."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(_SCHEMA)
+            if "owner" not in {r["name"] for r in conn.execute("PRAGMA table_info(runs)")}:
+                conn.execute("ALTER TABLE runs ADD COLUMN owner TEXT")   # starejše baze; njihove sinteze nimajo lastnika
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_owner ON runs(owner)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")   # 64 MB strani v pomnilniku
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    # --- ZDRUŽEVANJE ---
+    def merge_graph(self, run_id, graph, title="", logic_type="", created=None, owner=None):
+        """Doda graf ene sinteze lastnika `owner`; ponovni uvoz istega `run_id` ne spremeni ničesar. Vrne True, če je bil dodan."""
+        created = created or time.time()
+        nodes = {}                         # ključ -> vozlišče (prvo z isto oznako zmaga)
+        key_of = {}                        # id vozlišča v grafu -> ključ
+        for n in graph.nodes:
+            key = label_key(n.label)
+            if not key:
+                continue
+            nodes.setdefault(key, n)
+            key_of[n.id] = key
+        edge_keys = {(key_of[e.source], e.rel_type, key_of[e.target]) for e in graph.edges
+                     if e.source in key_of and e.target in key_of and key_of[e.source] != key_of[e.target]}
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO runs(id, created, title, logic_type, nodes, edges, owner) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, created, title, logic_type, len(nodes), len(edge_keys), owner)).rowcount
+                if not inserted:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.executemany(
+                    "INSERT INTO concepts(key, label, type, color, shape, mentions, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET mentions = mentions + 1, last_seen = excluded.last_seen",
+                    [(key, n.label, n.type, n.color, n.shape, created, created) for key, n in nodes.items()])
+                ids = {}
+                for chunk in _batches(list(nodes)):
+                    rows = conn.execute(f"SELECT id, key FROM concepts WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                    ids.update((key, cid) for cid, key in rows)
+                conn.executemany(
+                    "INSERT INTO edges(src, rel_type, dst, weight, first_seen, last_seen) VALUES (?, ?, ?, 1, ?, ?) "
+                    "ON CONFLICT(src, rel_type, dst) DO UPDATE SET weight = weight + 1, last_seen = excluded.last_seen",
+                    [(ids[s], rel, ids[d], created, created) for s, rel, d in edge_keys])
+                conn.executemany("INSERT OR IGNORE INTO mentions(concept, run) VALUES (?, ?)",
+                                 [(cid, run_id) for cid in ids.values()])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    # --- POIZVEDBE ---
+    def concept(self, label, owner=None):
+        """Pojem z dano oznako; z `owner` le, če ga omenja vsaj ena sinteza tega lastnika."""
+        row = self._conn().execute("SELECT * FROM concepts WHERE key = ?", (label_key(label),)).fetchone()
+        if row is not None and owner is not None and self._conn().execute(
+                "SELECT 1 FROM mentions m JOIN runs r ON r.id = m.run WHERE m.concept = ? AND r.owner = ? LIMIT 1",
+                (row["id"], owner)).fetchone() is None:
+            return None
+        return row
+
+    def search(self, text, limit=20, owner=None):
+        """Pojmi, katerih oznake vsebujejo besede (predpone) iz `text`; najprej najbolj relevantni in pogosti.
+
+        Z `owner` so vidni le pojmi iz sintez lastnika, `mentions` pa šteje samo njegove sinteze.
+        """
+        tokens = _FTS_TOKEN_RE.findall(text)
+        if not tokens:
+            return []
+        match = " ".join(f'"{t}"*' for t in tokens)
+        if owner is None:
+            return self._conn().execute(
+                "SELECT c.* FROM concepts_fts JOIN concepts c ON c.id = concepts_fts.rowid "
+                "WHERE concepts_fts MATCH ? ORDER BY bm25(concepts_fts), c.mentions DESC LIMIT ?", (match, limit)).fetchall()
+        return self._conn().execute(
+            "SELECT * FROM (SELECT c.id, c.key, c.label, c.type, c.color, c.shape, c.first_seen, c.last_seen, "
+            "bm25(concepts_fts) AS rank, (SELECT COUNT(*) FROM mentions m JOIN runs r ON r.id = m.run "
+            "WHERE m.concept = c.id AND r.owner = ?) AS mentions "
+            "FROM concepts_fts JOIN concepts c ON c.id = concepts_fts.rowid WHERE concepts_fts MATCH ?) "
+            "WHERE mentions > 0 ORDER BY rank, mentions DESC LIMIT ?", (owner, match, limit)).fetchall()
+
+    def neighbors(self, label, rel_types=None, limit=100, owner=None):
+        """Sosedje pojma v obeh smereh: seznam (smer, relacija, oznaka soseda, utež), urejen po uteži.
+
+        Z `owner` sta pojem in sosedje omejeni na pojme iz sintez lastnika.
+        """
+        row = self.concept(label, owner)
+        if row is None:
+            return []
+        rel_filter, params = "", [row["id"]]
+        if rel_types:
+            rel_filter = f" AND e.rel_type IN ({','.join('?' * len(rel_types))})"
+            params += list(rel_types)
+        if owner is not None:
+            rel_filter += f" AND c.id IN ({_OWNED_CONCEPTS})"
+            params.append(owner)
+        sql = (f"SELECT 'out' AS direction, e.rel_type, c.label, e.weight FROM edges e JOIN concepts c ON c.id = e.dst "
+               f"WHERE e.src = ?{rel_filter} "
+               f"UNION ALL SELECT 'in', e.rel_type, c.label, e.weight FROM edges e JOIN concepts c ON c.id = e.src "
+               f"WHERE e.dst = ?{rel_filter} ORDER BY 4 DESC LIMIT ?")
+        return [tuple(r) for r in self._conn().execute(sql, params + params + [limit])]
+
+    def k_hop(self, label, hops=2, rel_types=None, max_nodes=KHOP_MAX_NODES, owner=None):
+        """Podgraf do `hops` skokov od pojma kot SemanticGraph; najprej se dodajo sosedje z večjo utežjo.
+
+        Meja skoka in izbrana vozlišča so v začasnih tabelah, zato je vsak skok ena indeksirana poizvedba.
+        Z `owner` se razširja le po pojmih iz sintez lastnika.
+        """
+        row = self.concept(label, owner)
+        if row is None:
+            return SemanticGraph()
+        conn = self._conn()
+        rel_filter = f" AND e.rel_type IN ({','.join('?' * len(rel_types))})" if rel_types else ""
+        rel_params = list(rel_types or ())
+        owner_filter, owner_params = (f" WHERE nb IN ({_OWNED_CONCEPTS})", [owner]) if owner is not None else ("", [])
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS khop_frontier(id INTEGER PRIMARY KEY)")
+        seen, frontier = {row["id"]}, [row["id"]]
+        for _ in range(hops):
+            if len(seen) >= max_nodes:
+                break
+            conn.execute("DELETE FROM khop_frontier")
+            conn.executemany("INSERT INTO khop_frontier(id) VALUES (?)", [(cid,) for cid in frontier])
+            rows = conn.execute(
+                f"SELECT nb, MAX(w) FROM ("
+                f"SELECT e.dst AS nb, e.weight AS w FROM khop_frontier f CROSS JOIN edges e ON e.src = f.id{rel_filter} "
+                f"UNION ALL SELECT e.src, e.weight FROM khop_frontier f CROSS JOIN edges e ON e.dst = f.id{rel_filter}"
+                f"){owner_filter} GROUP BY nb ORDER BY 2 DESC", rel_params + rel_params + owner_params)
+            frontier = []
+            for cid, _ in rows:
+                if cid not in seen:
+                    seen.add(cid)
+                    frontier.append(cid)
+                    if len(seen) >= max_nodes:
+                        break
+            if not frontier:
+                break
+        return self._subgraph(sorted(seen))
+
+    def _subgraph(self, ids):
+        conn = self._conn()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS subgraph_ids(id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM subgraph_ids")
+        conn.executemany("INSERT INTO subgraph_ids(id) VALUES (?)", [(cid,) for cid in ids])
+        nodes = [GraphNode(id=f"c{r['id']}", label=r["label"], type=r["type"] or "Branch",
+                           color=r["color"] or "#2a9d8f", shape=r["shape"] or "ellipse")
+                 for r in conn.execute("SELECT c.* FROM subgraph_ids s CROSS JOIN concepts c ON c.id = s.id")]
+        edges = [GraphEdge(source=f"c{src}", target=f"c{dst}", rel_type=rel) for src, rel, dst in conn.execute(
+            "SELECT e.src, e.rel_type, e.dst FROM subgraph_ids a CROSS JOIN edges e ON e.src = a.id "
+            "CROSS JOIN subgraph_ids b ON b.id = e.dst")]
+        return SemanticGraph(nodes=nodes, edges=edges)
+
+    def runs_mentioning(self, label, limit=50, owner=None):
+        """Sinteze, ki omenjajo pojem (najnovejše najprej); z `owner` le sinteze tega lastnika."""
+        row = self.concept(label)
+        if row is None:
+            return []
+        owner_filter, params = (" AND r.owner = ?", [owner]) if owner is not None else ("", [])
+        return self._conn().execute(
+            f"SELECT r.* FROM mentions m JOIN runs r ON r.id = m.run WHERE m.concept = ?{owner_filter} "
+            f"ORDER BY r.created DESC LIMIT ?", [row["id"], *params, limit]).fetchall()
+
+    def stats(self):
+        conn = self._conn()
+        return {name: conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for name in ("concepts", "edges", "runs")}
+
+
+def _records(path):
+    """Zapisi z grafom iz JSONL zgodovine ali paketnega izhoda: (id, ustvarjen, naslov, rezultat, lastnik)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            result = record.get("result") or {}
+            if record.get("status", "ok") == "ok" and result.get("graph"):
+                config = record.get("config") or {}
+                title = record.get("title") or config.get("user_query") or config.get("idea_query") or ""
+                yield record["id"], record.get("created") or record.get("finished_at"), title[:80], result, record.get("owner")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merged knowledge-graph store across SIS syntheses.")
+    parser.add_argument("database", help="SQLite file (e.g. .sis_cache/graph.sqlite3)")
+    parser.add_argument("--import", dest="imports", action="append", default=[], help="history or batch JSONL to merge")
+    parser.add_argument("--search", help="full-text search over concept labels")
+    parser.add_argument("--neighbors", help="concept label to expand")
+    parser.add_argument("--hops", type=int, default=1)
+    args = parser.parse_args(argv)
+    store = GraphStore(args.database)
+    for path in args.imports:
+        added = sum(store.merge_graph(rid, SemanticGraph.from_dict(result["graph"]), title, result.get("logic_type", ""), created, owner)
+                    for rid, created, title, result, owner in _records(path))
+        print(f"{path}: merged {added} new run(s)")
+    if args.search:
+        for r in store.search(args.search):
+            print(f"{r['label']}  (mentions {r['mentions']})")
+    if args.neighbors:
+        if args.hops <= 1:
+            for direction, rel, label, weight in store.neighbors(args.neighbors):
+                print(f"{direction:<4} {rel:<12} {label}  (x{weight})")
+        else:
+            sub = store.k_hop(args.neighbors, args.hops)
+            print(f"{len(sub.nodes)} concepts, {len(sub.edges)} relations within {args.hops} hops")
+        for r in store.runs_mentioning(args.neighbors, limit=10):
+            print(f"run {r['id']}  {r['title']}")
+    print(json.dumps(store.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Trajna zgodovina sintez: zapisi se samo dodajajo, berejo pa se po potrebi.
+
+Podatki so v `history.jsonl` (en zapis na vrstico), kratek indeks (id, čas, naslov,
+odmik, dolžina, lastnik) pa v `history.idx.jsonl`. Brskanje prebere le indeks; celoten zapis
+se prebere z enim `seek` + `read`, ko ga uporabnik odpre. Vsak zapis pripada lastniku
+(prijavljenemu uporabniku ali seji) in je viden samo njemu. Besedilo poizvedbe s priponko
+(`query_context`) se ne shrani, datoteka pa se ob preseganju `max_entries` skrajša
+na najnovejše zapise. Modul ne uvaža Streamlita.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+HISTORY_TITLE_CHARS = 80
+HISTORY_MAX_ENTRIES = 500
+PRIVATE_RESULT_FIELDS = ("query_context",)   # celoten uporabniški kontekst (vključno z izsekom priponke)
+
+
+class SynthesisHistory:
+    def __init__(self, directory, max_entries=HISTORY_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.data_path = os.path.join(directory, "history.jsonl")
+        self.index_path = os.path.join(directory, "history.idx.jsonl")
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _load_index(self):
+        """Prebere indeks; če manjka ali ne ustreza podatkom, ga zgradi iz podatkovne datoteke."""
+        entries = []
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # odrezana zadnja vrstica
+        except OSError:
+            pass
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        indexed_end = entries[-1]["offset"] + entries[-1]["length"] if entries else 0
+        if indexed_end != data_size:
+            entries = self._rebuild_index()
+        return entries
+
+    def _rebuild_index(self):
+        entries = []
+        if os.path.exists(self.data_path):
+            with open(self.data_path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    try:
+                        entries.append(self._summary(json.loads(raw), offset, len(raw)))
+                    except ValueError:
+                        pass
+                    offset += len(raw)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        return entries
+
+    @staticmethod
+    def _summary(record, offset, length):
+        return {"id": record["id"], "created": record["created"], "title": record.get("title", ""),
+                "offset": offset, "length": length, "owner": record.get("owner")}
+
+    def append(self, result_record, config_record, owner):
+        """Doda zapis (rezultat + konfiguracija) lastnika `owner` na konec zgodovine; vrne njegov id."""
+        title = (config_record.get("user_query") or config_record.get("idea_query") or "").strip().splitlines()
+        record = {
+            "id": uuid.uuid4().hex[:12], "created": time.time(), "owner": owner,
+            "title": title[0][:HISTORY_TITLE_CHARS] if title else "(no inquiry)",
+            "config": config_record,
+            "result": {k: v for k, v in result_record.items() if k not in PRIVATE_RESULT_FIELDS},
+        }
+        raw = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                f.write(raw)
+            summary = self._summary(record, offset, len(raw))
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            self._index.append(summary)
+            # Skrajšanje je amortizirano: datoteka se prepiše šele, ko preseže mejo za četrtino.
+            if len(self._index) > self.max_entries * 1.25:
+                self._prune()
+        return record["id"]
+
+    def _prune(self):
+        """Obdrži zadnjih `max_entries` zapisov (pod ključavnico); datoteki se zamenjata atomarno."""
+        keep = self._index[-self.max_entries:]
+        entries, offset = [], 0
+        tmp_data, tmp_index = self.data_path + ".tmp", self.index_path + ".tmp"
+        with open(self.data_path, "rb") as src, open(tmp_data, "wb") as dst:
+            for e in keep:
+                src.seek(e["offset"])
+                dst.write(src.read(e["length"]))
+                entries.append(dict(e, offset=offset))
+                offset += e["length"]
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        os.replace(tmp_data, self.data_path)
+        os.replace(tmp_index, self.index_path)
+        self._index = entries
+
+    def recent(self, owner, n=20):
+        """Povzetki zadnjih `n` zapisov lastnika, najnovejši prvi (brez branja vsebine)."""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            mine = [e for e in self._index if e.get("owner") == owner]
+        return list(reversed(mine[-n:]))
+
+    def load(self, entry_id, owner):
+        """Prebere celoten zapis z danim id-jem, če pripada lastniku `owner`, sicer vrne None."""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            summary = next((e for e in reversed(self._index) if e["id"] == entry_id), None)
+            if summary is None or summary.get("owner") != owner:
+                return None
+            with open(self.data_path, "rb") as f:   # pod ključavnico, da se datoteka medtem ne skrajša
+                f.seek(summary["offset"])
+                return json.loads(f.read(summary["length"]))
@@ -0,0 +1,147 @@
+"""Združevanje več vzporednih kandidatov produkcije idej v en nabor brez ponovitev.
+
+Vsak kandidat se razdeli na posamezne ideje (oštevilčene točke ali naslovi, sicer odstavki).
+Skoraj enake ideje se poiščejo z MinHash podpisi besednih k-terk (vektorizirano z NumPy),
+preostale pa se razvrstijo po novosti: koliko izbranih znanstvenih polj idejo povezuje in
+kako redka je med kandidati. Modul ne uvaža Streamlita.
+"""
+import re
+import zlib
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from sis_selector import stem_terms
+
+SHINGLE_WORDS = 3
+MINHASH_PERMUTATIONS = 128
+DUPLICATE_SIMILARITY = 0.5      # ocenjena Jaccardova podobnost, nad katero sta ideji ponovitev
+MIN_IDEA_WORDS = 12
+_MERSENNE = (1 << 61) - 1
+
+_ITEM_PATTERNS = (re.compile(r"^#{3,4}\s+(.*)$"), re.compile(r"^\d{1,2}[.)]\s+(.*)$"))  # naslovi, nato oštevilčene točke
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+@dataclass
+class Idea:
+    title: str
+    body: str
+    candidate: int                      # indeks kandidata, iz katerega ideja izvira
+    fields: list = field(default_factory=list)
+    novelty: float = 0.0
+    support: int = 1                    # število kandidatov z enako ali skoraj enako idejo
+
+
+def _item_blocks(text, pattern):
+    blocks, current = [], None
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if match:
+            current = [match.group(1).strip()]
+            blocks.append(current)
+        elif current is not None:
+            current.append(line)
+    return blocks
+
+
+def split_ideas(text, candidate=0):
+    """Razdeli odgovor na ideje: naslovi (### ali ####), oštevilčene točke, sicer daljši odstavki."""
+    for pattern in _ITEM_PATTERNS:
+        blocks = _item_blocks(text, pattern)
+        if len(blocks) >= 2:
+            break
+    else:
+        blocks = [p.strip().splitlines() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    ideas = []
+    for lines in blocks:
+        head, body = lines[0], "\n".join(lines[1:]).strip()
+        bold = _BOLD_RE.search(head)
+        title = (bold.group(1) if bold else head).strip(" :*#—-")
+        rest = _BOLD_RE.sub("", head, count=1).strip(" :—-") if bold else ""
+        body = f"{rest}\n{body}".strip() if rest else body
+        if not body:
+            title, body = title.split(". ", 1)[0][:90], head
+        if len(_WORD_RE.findall(f"{title} {body}")) >= MIN_IDEA_WORDS:
+            ideas.append(Idea(title=title, body=body, candidate=candidate))
+    return ideas
+
+
+def _shingle_hashes(text):
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    if len(words) < SHINGLE_WORDS:
+        words += [""] * (SHINGLE_WORDS - len(words))
+    return np.fromiter({zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+                        for i in range(len(words) - SHINGLE_WORDS + 1)}, dtype=np.uint64)
+
+
+def minhash_signatures(texts, permutations=MINHASH_PERMUTATIONS, seed=0):
+    """MinHash podpisi (len(texts), permutations): h(x) = (a·x + b) mod (2^61 − 1), minimum po k-terkah."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, size=permutations, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=permutations, dtype=np.uint64)
+    signatures = np.empty((len(texts), permutations), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        hashes = _shingle_hashes(text)
+        # 32-bitni crc × 31-bitni a ostane pod 2^63, zato ni prekoračitve uint64.
+        signatures[i] = ((hashes[:, None] * a[None, :] + b[None, :]) % _MERSENNE).min(axis=0)
+    return signatures
+
+
+def similarity_matrix(signatures):
+    """Ocena Jaccardove podobnosti vseh parov: delež enakih komponent podpisov."""
+    return (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+
+def merge_candidates(texts, field_terms, threshold=DUPLICATE_SIMILARITY):
+    """Ideje vseh kandidatov brez skoraj enakih ponovitev, razvrščene po novosti; vrne (ideje, statistika).
+
+    `field_terms`: ime izbranega polja -> opisno besedilo (ime, kategorija, metode, orodja, vidiki).
+    Novost = polovica deleža izbranih polj, ki jih ideja poveže, in polovica redkosti
+    (1 − povprečna podobnost z idejami drugih kandidatov).
+    """
+    ideas = [idea for i, text in enumerate(texts) for idea in split_ideas(text, candidate=i)]
+    if not ideas:
+        return [], {"candidates": len(texts), "ideas": 0, "duplicates": 0, "kept": 0}
+    sim = similarity_matrix(minhash_signatures([f"{idea.title} {idea.body}" for idea in ideas]))
+    origin = np.array([idea.candidate for idea in ideas])
+    others = origin[:, None] != origin[None, :]
+    rarity = 1.0 - np.where(others, sim, 0.0).sum(axis=1) / np.maximum(others.sum(axis=1), 1)
+    field_stems = {name: set(stem_terms(text)) for name, text in field_terms.items()}
+    for idea, r in zip(ideas, rarity):
+        stems = set(stem_terms(f"{idea.title} {idea.body}"))
+        idea.fields = [name for name, fs in field_stems.items() if stems & fs]
+        bridge = len(idea.fields) / len(field_stems) if field_stems else 0.0
+        idea.novelty = round(0.5 * bridge + 0.5 * float(r), 3)
+
+    # Požrešno: najprej najbolj nove ideje, skoraj enake kasnejše se štejejo kot podpora.
+    order = sorted(range(len(ideas)), key=lambda i: (-ideas[i].novelty, i))
+    kept, absorbed = [], set()
+    for i in order:
+        if i in absorbed:
+            continue
+        kept.append(ideas[i])
+        for j in np.nonzero(sim[i] >= threshold)[0]:
+            if j != i and j not in absorbed:
+                absorbed.add(int(j))
+                ideas[i].support += 1
+    stats = {"candidates": len(texts), "ideas": len(ideas), "duplicates": len(absorbed), "kept": len(kept)}
+    return kept, stats
+
+
+def render_idea_portfolio(ideas, stats, emphases=()):
+    """Markdown z združenim naborom idej (naslov, besedilo, novost, povezana polja, izvor)."""
+    lines = ["## Idea Portfolio", "",
+             f"*{stats['kept']} distinct ideas from {stats['candidates']} parallel candidates "
+             f"({stats['duplicates']} near-duplicates merged), ranked by novelty.*", ""]
+    for rank, idea in enumerate(ideas, 1):
+        meta = [f"novelty {idea.novelty:.2f}"]
+        if idea.fields:
+            meta.append("bridges " + ", ".join(idea.fields))
+        if idea.candidate < len(emphases):
+            meta.append(f"via {emphases[idea.candidate]}")
+        if idea.support > 1:
+            meta.append(f"proposed {idea.support}×")
+        lines += [f"### {rank}. {idea.title}", "", idea.body, "", f"*{' · '.join(meta)}*", ""]
+    return "\n".join(lines).rstrip() + "\n"
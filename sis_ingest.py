@@ -0,0 +1,127 @@
+"""Zajem priponk: naložene datoteke se prepišejo v začasno shrambo na disku.
+
+Seja hrani le metapodatke (pot, SHA-256, velikost, kodiranje). Besedilo se dekodira
+postopno iz pomnilniško preslikane datoteke (mmap) z odpornimi kodeki in se ustvari
+šele, ko se sinteza dejansko izvede. Modul ne uvaža Streamlita.
+"""
+import codecs
+import hashlib
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+# Zgornja meja ostaja stara (2 MB besedila na sintezo): indeks BM25 in dekodirano besedilo
+# živita v pomnilniku procesa (cache_resource), zato je poraba omejena s to mejo.
+MAX_ATTACHMENT_BYTES = 2 * 1024 * 1024       # na datoteko
+MAX_ATTACHMENTS_TOTAL = 2 * 1024 * 1024      # skupaj vse priponke ene sinteze
+SPOOL_MAX_BYTES = 500 * 1024 * 1024          # nad tem se brišejo najdlje neuporabljene datoteke
+COPY_CHUNK = 1024 * 1024
+DECODE_CHUNK = 256 * 1024
+SNIFF_BYTES = 64 * 1024
+
+_spool_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SpooledAttachment:
+    name: str
+    path: str
+    sha256: str
+    size: int
+    encoding: str
+
+
+def detect_encoding(sample):
+    """Kodiranje iz začetka datoteke: BOM, sicer UTF-8, če se vzorec dekodira, drugače cp1252."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(sample) - 3:  # napaka ni le prerezan večbajtni znak na koncu vzorca
+            return "cp1252"
+    return "utf-8"
+
+
+def spool_upload(fileobj, directory, name=""):
+    """Prepiše naloženo datoteko po kosih v `directory` (ime je SHA-256 vsebine) in vrne metapodatke.
+
+    Enaka vsebina iz več sej se shrani enkrat; obstoječa datoteka se le "dotakne" (LRU).
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size, sample = 0, b""
+    tmp_path = os.path.join(directory, f".upload.{os.getpid()}.{threading.get_ident()}.tmp")
+    fileobj.seek(0)
+    with open(tmp_path, "wb") as out:
+        while True:
+            block = fileobj.read(COPY_CHUNK)
+            if not block:
+                break
+            if len(sample) < SNIFF_BYTES:
+                sample += block[:SNIFF_BYTES - len(sample)]
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+    sha = digest.hexdigest()
+    path = os.path.join(directory, f"{sha}.bin")
+    with _spool_lock:
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+    prune_spool(directory)
+    return SpooledAttachment(name=name or sha[:12], path=path, sha256=sha, size=size, encoding=detect_encoding(sample))
+
+
+def prune_spool(directory, max_bytes=SPOOL_MAX_BYTES):
+    """Omeji velikost shrambe: brišejo se najdlje neuporabljene datoteke (mtime)."""
+    with _spool_lock:
+        entries = []
+        for e in os.scandir(directory):
+            if e.name.endswith(".bin"):
+                st_ = e.stat()
+                entries.append((st_.st_mtime, st_.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def iter_decoded(attachment, chunk_size=DECODE_CHUNK):
+    """Postopno dekodira datoteko iz mmap; neveljavni bajti se nadomestijo (U+FFFD)."""
+    decoder = codecs.getincrementaldecoder(attachment.encoding)(errors="replace")
+    with open(attachment.path, "rb") as f:
+        if attachment.size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, len(mm), chunk_size):
+                text = decoder.decode(mm[start:start + chunk_size])
+                if text:
+                    yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def attachments_key(attachments):
+    """Skupni ključ nabora priponk (za predpomnilnike indeksov in povzetkov)."""
+    if len(attachments) == 1:
+        return attachments[0].sha256
+    return hashlib.sha256("\x1f".join(a.sha256 for a in attachments).encode("ascii")).hexdigest()
+
+
+def read_attachments(attachments):
+    """Besedilo vseh priponk; pri več datotekah ima vsaka svojo glavo z imenom."""
+    if len(attachments) == 1:
+        return "".join(iter_decoded(attachments[0]))
+    return "\n\n".join(f"=== {a.name} ===\n" + "".join(iter_decoded(a)) for a in attachments)
@@ -0,0 +1,183 @@
+"""Strežniški izračun postavitve semantičnega grafa za Cytoscape (`preset` postavitev).
+
+Dva načina: vektorizirana silna postavitev (Fruchterman-Reingold, NumPy) in
+hierarhična postavitev po nivojih za relacije TT/BT/NT. Položaji se predpomnijo
+po zgoščeni vrednosti grafa, zato je ista mreža vedno izrisana enako.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+import numpy as np
+
+HIERARCHICAL_RELATIONS = {"TT", "BT", "NT"}
+LAYOUT_CACHE_SIZE = 256
+EXACT_REPULSION_MAX_NODES = 600    # nad tem se odboj računa na naključnem vzorcu vozlišč
+REPULSION_SAMPLE = 256
+NODE_SPACING = 120.0
+
+_layout_cache = OrderedDict()
+_layout_lock = threading.Lock()
+
+
+def graph_hash(graph):
+    """Zgoščena vrednost strukture grafa (vozlišča in povezave), neodvisna od barv in oznak."""
+    h = hashlib.sha256()
+    for n in graph.nodes:
+        h.update(f"n\x1f{n.id}\x1f{n.type}\x1e".encode("utf-8"))
+    for e in graph.edges:
+        h.update(f"e\x1f{e.source}\x1f{e.target}\x1f{e.rel_type}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _edge_index(graph, index_of):
+    pairs = [(index_of[e.source], index_of[e.target]) for e in graph.edges
+             if e.source in index_of and e.target in index_of and e.source != e.target]
+    if not pairs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    arr = np.asarray(pairs, dtype=np.int64)
+    return arr[:, 0], arr[:, 1]
+
+
+def force_directed_positions(n, src, dst, iterations=None, seed=0):
+    """Fruchterman-Reingold z vektoriziranim odbojem; vrne tabelo (n, 2)."""
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    side = NODE_SPACING * np.sqrt(n)
+    pos = rng.random((n, 2)) * side
+    if n == 1:
+        return pos
+    k = side / np.sqrt(n)
+    iterations = iterations or (120 if n <= EXACT_REPULSION_MAX_NODES else 60)
+    temperature = side / 8
+    cooling = (0.02) ** (1.0 / iterations)
+    x, y = pos[:, 0], pos[:, 1]  # pogleda v `pos`, posodobitve na mestu se vidijo
+    for _ in range(iterations):
+        # Odboj po komponentah x/y (2D matrike namesto (n, n, 2)) – manj pomnilnika in kopij.
+        if n <= EXACT_REPULSION_MAX_NODES:
+            dx = x[:, None] - x[None, :]
+            dy = y[:, None] - y[None, :]
+            scale = 1.0
+        else:
+            sample = rng.choice(n, REPULSION_SAMPLE, replace=False)
+            dx = x[:, None] - x[sample][None, :]
+            dy = y[:, None] - y[sample][None, :]
+            scale = n / REPULSION_SAMPLE
+        force = dx * dx
+        force += dy * dy
+        np.maximum(force, 1e-4, out=force)
+        np.divide(k * k * scale, force, out=force)
+        if n <= EXACT_REPULSION_MAX_NODES:
+            np.fill_diagonal(force, 0.0)
+        disp = np.stack(((dx * force).sum(1), (dy * force).sum(1)), axis=1)
+        if len(src):
+            d = pos[src] - pos[dst]
+            dl = np.maximum(np.sqrt((d ** 2).sum(-1)), 1e-2)
+            pull = d * (dl / k)[:, None]
+            for axis in (0, 1):  # bincount je bistveno hitrejši od np.add.at
+                disp[:, axis] += np.bincount(dst, pull[:, axis], n) - np.bincount(src, pull[:, axis], n)
+        disp -= (pos - pos.mean(0)) * (0.05 * k / side)  # šibka gravitacija drži komponente skupaj
+        length = np.maximum(np.sqrt((disp ** 2).sum(-1)), 1e-9)
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+    return pos
+
+
+def hierarchical_positions(graph, index_of, sweeps=4):
+    """Nivojska postavitev: starši (širši/vrhnji pojmi) zgoraj, vrstni red po baricentrih."""
+    n = len(index_of)
+    children = defaultdict(list)
+    has_parent = np.zeros(n, dtype=bool)
+    for e in graph.edges:
+        if e.rel_type not in HIERARCHICAL_RELATIONS or e.source not in index_of or e.target not in index_of:
+            continue
+        s, t = index_of[e.source], index_of[e.target]
+        # "A BT B" / "A TT B": B je širši pojem; "A NT B": B je ožji pojem.
+        parent, child = (s, t) if e.rel_type == "NT" else (t, s)
+        if parent != child:
+            children[parent].append(child)
+            has_parent[child] = True
+
+    level = np.full(n, -1, dtype=np.int64)
+    roots = [i for i in range(n) if not has_parent[i]] or [0]
+    queue = deque(roots)
+    for r in roots:
+        level[r] = 0
+    while queue:  # BFS: vsak pojem dobi najplitvejši nivo (cikli ne povzročijo zanke)
+        p = queue.popleft()
+        for c in children[p]:
+            if level[c] < 0:
+                level[c] = level[p] + 1
+                queue.append(c)
+    level[level < 0] = 0
+
+    neighbours = defaultdict(list)
+    for p, cs in children.items():
+        for c in cs:
+            neighbours[p].append(c)
+            neighbours[c].append(p)
+    rows = defaultdict(list)
+    for i in range(n):
+        rows[int(level[i])].append(i)
+    order = np.zeros(n)
+    for row in rows.values():
+        for x, i in enumerate(row):
+            order[i] = x
+    for _ in range(sweeps):
+        for lv in sorted(rows):
+            row = rows[lv]
+            bary = [np.mean([order[j] for j in neighbours[i]]) if neighbours[i] else order[i] for i in row]
+            row[:] = [i for _, i in sorted(zip(bary, row))]
+            for x, i in enumerate(row):
+                order[i] = x
+
+    pos = np.zeros((n, 2))
+    widest = max(len(r) for r in rows.values()) if rows else 1
+    for lv, row in rows.items():
+        offset = (widest - len(row)) * NODE_SPACING / 2
+        for x, i in enumerate(row):
+            pos[i] = (offset + x * NODE_SPACING, lv * NODE_SPACING * 1.5)
+    return pos
+
+
+def choose_layout_mode(graph, logic_type=""):
+    if logic_type == "Strict hierarchical logic":
+        return "hierarchical"
+    if graph.edges:
+        hier = sum(1 for e in graph.edges if e.rel_type in HIERARCHICAL_RELATIONS)
+        if hier / len(graph.edges) >= 0.6:
+            return "hierarchical"
+    return "force"
+
+
+def compute_layout(graph, mode="auto", logic_type=""):
+    """Vrne ({id vozlišča: {"x", "y"}}, info); info vsebuje način, čas izračuna in ali je bil zadetek v predpomnilniku."""
+    if mode == "auto":
+        mode = choose_layout_mode(graph, logic_type)
+    key = (graph_hash(graph), mode)
+    with _layout_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            positions, seconds = _layout_cache[key]
+            return positions, {"mode": mode, "seconds": seconds, "cached": True}
+
+    t0 = time.perf_counter()
+    ids = [n.id for n in graph.nodes]
+    index_of = {nid: i for i, nid in enumerate(ids)}
+    if mode == "hierarchical":
+        pos = hierarchical_positions(graph, index_of)
+    else:
+        src, dst = _edge_index(graph, index_of)
+        pos = force_directed_positions(len(ids), src, dst, seed=int(key[0][:8], 16))
+        if len(pos):
+            pos -= pos.min(0)
+    positions = {nid: {"x": round(float(pos[i, 0]), 1), "y": round(float(pos[i, 1]), 1)} for nid, i in index_of.items()}
+    seconds = time.perf_counter() - t0
+
+    with _layout_lock:
+        _layout_cache[key] = (positions, seconds)
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return positions, {"mode": mode, "seconds": seconds, "cached": False}
@@ -0,0 +1,161 @@
+"""Raven podrobnosti (LOD) za zelo velika semantična omrežja.
+
+Vozlišča se na strežniku združijo v gruče (skupnosti z razširjanjem oznak ali po tipu
+Root/Branch/Leaf/Class). Zaprta gruča se v brskalnik pošlje kot eno meta-vozlišče,
+velikost ustreza številu članov; odprta gruča pokaže člane po straneh, zato brskalnik
+vedno dobi le omejeno število elementov. Modul ne uvaža Streamlita.
+"""
+import math
+import random
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+from sis_graph import GraphEdge, GraphNode, SemanticGraph
+from sis_layout import graph_hash
+
+LOD_NODE_THRESHOLD = 300      # manjši grafi se izrišejo v celoti
+MAX_VIEW_NODES = 400          # zgornja meja vozlišč, poslanih v brskalnik
+MAX_VIEW_EDGES = 1500
+LOD_PAGE = 100                # članov na en korak razširitve gruče
+MAX_CLUSTERS = 40
+LPA_ITERATIONS = 20
+CLUSTER_CACHE_SIZE = 32
+META_PREFIX = "cluster:"
+
+_cluster_cache = OrderedDict()
+_cluster_lock = threading.Lock()
+
+
+@dataclass
+class Cluster:
+    id: str
+    label: str
+    color: str
+    members: list = field(default_factory=list)   # id-ji vozlišč, urejeni po stopnji (padajoče)
+
+
+def _adjacency(graph):
+    index_of = {n.id: i for i, n in enumerate(graph.nodes)}
+    adjacency = [[] for _ in graph.nodes]
+    for e in graph.edges:
+        i, j = index_of.get(e.source), index_of.get(e.target)
+        if i is not None and j is not None and i != j:
+            adjacency[i].append(j)
+            adjacency[j].append(i)
+    return adjacency
+
+
+def label_propagation(adjacency, iterations=LPA_ITERATIONS, seed=0):
+    """Skupnosti z asinhronim razširjanjem oznak; linearno v številu povezav na iteracijo."""
+    labels = list(range(len(adjacency)))
+    order = list(range(len(adjacency)))
+    rnd = random.Random(seed)
+    for _ in range(iterations):
+        rnd.shuffle(order)
+        changed = 0
+        for i in order:
+            if not adjacency[i]:
+                continue
+            counts = Counter(labels[j] for j in adjacency[i])
+            best = max(counts.values())
+            if counts.get(labels[i]) == best:
+                continue  # trenutna oznaka je med najpogostejšimi: ostane (stabilnost)
+            labels[i] = rnd.choice(sorted(label for label, c in counts.items() if c == best))
+            changed += 1
+        if not changed:
+            break
+    return labels
+
+
+def cluster_graph(graph, method="community"):
+    """Gruče grafa (predpomnjene po strukturi grafa); `method` je "community" ali "type"."""
+    key = (graph_hash(graph), method)
+    with _cluster_lock:
+        if key in _cluster_cache:
+            _cluster_cache.move_to_end(key)
+            return _cluster_cache[key]
+    adjacency = _adjacency(graph)
+    if method == "type":
+        assignment = [n.type for n in graph.nodes]
+    else:
+        assignment = label_propagation(adjacency)
+        assignment = _merge_small_communities(assignment, adjacency, graph)
+    groups = {}
+    for i, a in enumerate(assignment):
+        groups.setdefault(a, []).append(i)
+    clusters = []
+    for k, (_, members) in enumerate(sorted(groups.items(), key=lambda g: (-len(g[1]), str(g[0])))):
+        members.sort(key=lambda i: (-len(adjacency[i]), i))
+        head = graph.nodes[members[0]]
+        color = Counter(graph.nodes[i].color for i in members).most_common(1)[0][0]
+        label = f"{head.type} nodes" if method == "type" else head.label
+        clusters.append(Cluster(id=f"{META_PREFIX}{k}", label=label, color=color,
+                                members=[graph.nodes[i].id for i in members]))
+    with _cluster_lock:
+        _cluster_cache[key] = clusters
+        while len(_cluster_cache) > CLUSTER_CACHE_SIZE:
+            _cluster_cache.popitem(last=False)
+    return clusters
+
+
+def _merge_small_communities(labels, adjacency, graph, max_clusters=MAX_CLUSTERS):
+    """Obdrži največje skupnosti; vozlišča manjših gredo v sosednjo veliko skupnost ali v gručo po tipu."""
+    sizes = Counter(labels)
+    if len(sizes) <= max_clusters:
+        return labels
+    keep = {label for label, _ in sizes.most_common(max_clusters - 4)}  # 4 mesta za gruče po tipu
+    merged = list(labels)
+    for i, label in enumerate(labels):
+        if label in keep:
+            continue
+        links = Counter(labels[j] for j in adjacency[i] if labels[j] in keep)
+        merged[i] = links.most_common(1)[0][0] if links else f"type:{graph.nodes[i].type}"
+    return merged
+
+
+def lod_view(graph, clusters, expanded=None, max_nodes=MAX_VIEW_NODES, max_edges=MAX_VIEW_EDGES):
+    """Vidni del grafa: zaprte gruče kot meta-vozlišča, odprte z največ `expanded[id]` člani.
+
+    Vrne (SemanticGraph pogleda, velikosti meta-vozlišč {id: px}, statistika).
+    Člani, ki ne dobijo mesta, ostanejo v meta-vozlišču svoje gruče ("+N").
+    """
+    expanded = expanded or {}
+    by_id = {n.id: n for n in graph.nodes}
+    unit_of, nodes, sizes = {}, [], {}
+    budget = max_nodes - len(clusters)   # vsaka gruča lahko potrebuje meta-vozlišče
+    for cluster in clusters:
+        shown = min(expanded.get(cluster.id, 0), len(cluster.members), max(0, budget))
+        budget -= shown
+        for nid in cluster.members[:shown]:
+            unit_of[nid] = nid
+            nodes.append(by_id[nid])
+        rest = len(cluster.members) - shown
+        if rest:
+            for nid in cluster.members[shown:]:
+                unit_of[nid] = cluster.id
+            label = f"{cluster.label} · {rest}" if not shown else f"+{rest} more ({cluster.label})"
+            nodes.append(GraphNode(id=cluster.id, label=label, type="Class", color=cluster.color, shape="hexagon"))
+            sizes[cluster.id] = min(220, int(40 + 14 * math.sqrt(rest)))
+
+    # Povezave med enotami pogleda; vzporedne povezave med gručami se združijo v eno s številom.
+    weights, rels, direct = Counter(), {}, []
+    for e in graph.edges:
+        a, b = unit_of.get(e.source), unit_of.get(e.target)
+        if a is None or b is None or a == b:
+            continue
+        if a == e.source and b == e.target:
+            direct.append(e)
+            continue
+        weights[(a, b)] += 1
+        rels.setdefault((a, b), Counter())[e.rel_type] += 1
+    edges = direct[:max_edges]
+    for (a, b), count in weights.most_common(max(0, max_edges - len(edges))):
+        rel = rels[(a, b)].most_common(1)[0][0]
+        edges.append(GraphEdge(source=a, target=b, rel_type=f"{rel} ×{count}" if count > 1 else rel))
+    stats = {
+        "clusters": len(clusters), "collapsed": len(sizes), "visible_nodes": len(nodes),
+        "hidden_nodes": sum(1 for u in unit_of.values() if u.startswith(META_PREFIX)),
+        "edges": len(edges), "edges_total": len(graph.edges),
+    }
+    return SemanticGraph(nodes=nodes, edges=edges, repaired=graph.repaired, warnings=graph.warnings), sizes, stats
@@ -0,0 +1,238 @@
+"""Preverjanje in normalizacija semantičnega grafa iz LLM odgovora.
+
+Ontologiji (IMA in MA) se enkrat pretvorita v indekse: preslikavo oznaka -> pojem,
+množice sosedov in tranzitivno zaprtje dosegljivosti. Normalizacija grafa nato teče
+v linearnem času: združi podvojena vozlišča, popravi ali odstrani viseče povezave,
+uveljavi nabor relacij izbrane logike in barve poravna s paleto ontologij.
+Modul ne uvaža Streamlita.
+"""
+import re
+from collections import deque
+
+from sis_graph import GraphEdge, GraphNode, SemanticGraph
+
+HIERARCHICAL_RELATIONS = ("TT", "BT", "NT")
+LATERAL_RELATIONS = ("AS", "EQ", "IN")
+RELATIONS_BY_LOGIC = {
+    "Strict hierarchical logic": frozenset(HIERARCHICAL_RELATIONS),
+    "Relational logic": frozenset(LATERAL_RELATIONS),
+    "Hierarchical associative logic": frozenset(HIERARCHICAL_RELATIONS + LATERAL_RELATIONS + ("RT", "outcome_of")),
+}
+# Relacija izven nabora logike se preslika v najbližjo dovoljeno; None pomeni, da se povezava odstrani.
+RELATION_FALLBACK = {
+    "Strict hierarchical logic": None,
+    "Relational logic": "AS",
+    "Hierarchical associative logic": "AS",
+}
+_RELATION_ALIASES = {
+    "top term": "TT", "broader term": "BT", "broader": "BT", "narrower term": "NT", "narrower": "NT",
+    "related term": "RT", "related": "RT", "associative": "AS", "association": "AS",
+    "equivalent": "EQ", "equivalence": "EQ", "inheritance": "IN", "instance": "IN", "outcome of": "outcome_of",
+}
+NODE_TYPES = ("Class", "Root", "Branch", "Leaf")      # po pomembnosti pri združevanju
+NODE_SHAPES = frozenset({"ellipse", "rectangle", "triangle", "diamond", "round-rectangle", "hexagon", "star", "pentagon", "octagon"})
+DEFAULT_COLOR = "#2a9d8f"
+
+_HEX_RE = re.compile(r"#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _as_text(value):
+    """Polje grafa kot niz (LLM včasih vrne število ali seznam); None -> prazen niz."""
+    if isinstance(value, str):
+        return value
+    return "" if value is None else str(value)
+
+
+def _text_fields(item):
+    """Vozlišče/povezava z vsemi polji kot nizi, da so iskanja v slovarjih in množicah varna."""
+    if all(map(str.__instancecheck__, item)):
+        return item
+    return type(item)(*map(_as_text, item))
+
+
+def label_key(label):
+    """Ključ za primerjavo oznak: male črke, strnjeni presledki."""
+    if not isinstance(label, str):
+        label = _as_text(label)
+    return _SPACE_RE.sub(" ", label).strip().casefold()
+
+
+def _parse_hex(color):
+    m = _HEX_RE.fullmatch(_as_text(color).strip())
+    if not m:
+        return None
+    digits = m.group(1)
+    if len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    return "#" + digits.upper()
+
+
+class OntologyIndex:
+    """Vnaprej izračunani indeksi nad ontologijami (gradi se enkrat na proces)."""
+
+    def __init__(self, *ontologies):
+        self.concepts = {}        # ključ oznake -> (kanonična oznaka, barva, oblika)
+        self.successors = {}      # pojem -> množica neposrednih naslednikov
+        for onto in ontologies:
+            for name, style in onto["nodes"].items():
+                self.concepts.setdefault(label_key(name), (name, _parse_hex(style["color"]), style.get("shape", "rectangle")))
+                self.successors.setdefault(name, set())
+            for src, dst, _rel in onto["relations"]:
+                self.successors.setdefault(src, set()).add(dst)
+                self.successors.setdefault(dst, set())
+        self.reachable = {name: self._closure(name) for name in self.successors}
+        self.palette = sorted({c for _, c, _ in self.concepts.values() if c})
+        self._palette_rgb = [(c, _rgb(c)) for c in self.palette]
+        self._snap_cache = {}
+
+    def _closure(self, start):
+        seen, queue = set(), deque(self.successors[start])
+        while queue:
+            node = queue.popleft()
+            if node not in seen:
+                seen.add(node)
+                queue.extend(self.successors[node] - seen)
+        return frozenset(seen)
+
+    def concept(self, label):
+        return self.concepts.get(label_key(label))
+
+    def snap_color(self, color):
+        """Barva iz palete ontologij, najbližja podani (evklidsko v RGB); neveljavna -> privzeta."""
+        color = _as_text(color)
+        if color in self._snap_cache:
+            return self._snap_cache[color]
+        parsed = _parse_hex(color)
+        if parsed is None:
+            snapped = DEFAULT_COLOR
+        elif parsed == DEFAULT_COLOR.upper():
+            snapped = DEFAULT_COLOR  # privzeta barva aplikacije ostane
+        elif not self._palette_rgb or parsed in self.palette:
+            snapped = parsed
+        else:
+            r, g, b = _rgb(parsed)
+            snapped = min(self._palette_rgb, key=lambda pc: (pc[1][0] - r) ** 2 + (pc[1][1] - g) ** 2 + (pc[1][2] - b) ** 2)[0]
+        self._snap_cache[color] = snapped
+        return snapped
+
+
+def _rgb(hex_color):
+    return int(hex_color[1:3], 16), int(hex_color[3:5], 16), int(hex_color[5:7], 16)
+
+
+def canonical_relation(rel_type):
+    """Kanonična oznaka relacije; manjkajoča ali prazna -> RT."""
+    rel = (rel_type if isinstance(rel_type, str) else _as_text(rel_type)).strip()
+    if not rel:
+        return "RT"
+    if rel.upper() in ("TT", "BT", "NT", "RT", "AS", "EQ", "IN"):
+        return rel.upper()
+    return _RELATION_ALIASES.get(rel.lower().replace("_", " "), rel)
+
+
+def normalize_graph(graph, logic_type, index):
+    """Vrne (normaliziran SemanticGraph, poročilo s števci popravkov).
+
+    Vse operacije so iskanja v slovarjih in množicah, zato je čas linearen
+    v številu vozlišč in povezav.
+    """
+    report = dict.fromkeys((
+        "nodes_in", "edges_in", "nodes_merged", "ids_renamed", "edges_repaired", "edges_dangling",
+        "edges_relabeled", "edges_disallowed", "edges_duplicate", "self_loops", "colors_fixed",
+        "ontology_nodes", "ontology_edges_consistent", "ontology_edges_inverted"), 0)
+    report["nodes_in"], report["edges_in"] = len(graph.nodes), len(graph.edges)
+    allowed = RELATIONS_BY_LOGIC.get(logic_type, RELATIONS_BY_LOGIC["Hierarchical associative logic"])
+    fallback = RELATION_FALLBACK.get(logic_type, "AS")
+
+    id_map = {}          # izvirni id -> kanonični id
+    by_label = {}        # ključ oznake -> položaj v `merged`
+    merged = []          # [id, oznaka, tip, barva, oblika, ontološki pojem]
+    for n in graph.nodes:
+        n = _text_fields(n)
+        key = label_key(n.label)
+        if key in by_label:
+            slot = merged[by_label[key]]
+            id_map.setdefault(n.id, slot[0])
+            if n.type in NODE_TYPES and NODE_TYPES.index(n.type) < NODE_TYPES.index(slot[2]):
+                slot[2] = n.type  # združeno vozlišče obdrži najpomembnejši tip
+            report["nodes_merged"] += 1
+            continue
+        nid = n.id
+        if nid in id_map:  # isti id, druga oznaka: vozlišče dobi nov id, povezave ostanejo pri prvem
+            nid = f"{n.id}~{len(merged)}"
+            report["ids_renamed"] += 1
+        else:
+            id_map[nid] = nid
+        concept = index.concept(n.label)
+        if concept is not None:
+            color, shape = concept[1] or DEFAULT_COLOR, concept[2]
+            report["ontology_nodes"] += 1
+        else:
+            color, shape = index.snap_color(n.color), n.shape if n.shape in NODE_SHAPES else "ellipse"
+        if color.upper() != n.color.upper():
+            report["colors_fixed"] += 1
+        by_label[key] = len(merged)
+        merged.append([nid, n.label.strip(), n.type if n.type in NODE_TYPES else "Branch", color, shape,
+                       concept[0] if concept else None])
+    id_map.update((nid, nid) for nid, *_ in merged)
+    concept_of = {slot[0]: slot[5] for slot in merged if slot[5]}
+
+    def resolve(ref):
+        if ref in id_map:
+            return id_map[ref], False
+        slot = by_label.get(label_key(ref))  # LLM pogosto poveže oznako namesto id-ja
+        return (merged[slot][0], True) if slot is not None else (None, False)
+
+    edges, seen = [], set()
+    for e in graph.edges:
+        e = _text_fields(e)
+        source, fixed_s = resolve(e.source)
+        target, fixed_t = resolve(e.target)
+        if source is None or target is None:
+            report["edges_dangling"] += 1
+            continue
+        if fixed_s or fixed_t:
+            report["edges_repaired"] += 1
+        if source == target:
+            report["self_loops"] += 1
+            continue
+        rel = canonical_relation(e.rel_type)
+        if rel not in allowed:
+            if fallback is None:
+                report["edges_disallowed"] += 1
+                continue
+            rel = fallback
+        if rel != e.rel_type:
+            report["edges_relabeled"] += 1
+        if (source, target, rel) in seen:
+            report["edges_duplicate"] += 1
+            continue
+        seen.add((source, target, rel))
+        edges.append(GraphEdge(source=source, target=target, rel_type=rel))
+        cs, ct = concept_of.get(source), concept_of.get(target)
+        if cs and ct:
+            if ct in index.reachable[cs]:
+                report["ontology_edges_consistent"] += 1
+            elif cs in index.reachable[ct]:
+                report["ontology_edges_inverted"] += 1
+
+    nodes = [GraphNode(id=nid, label=label, type=ntype, color=color, shape=shape)
+             for nid, label, ntype, color, shape, _ in merged]
+    report["nodes_out"], report["edges_out"] = len(nodes), len(edges)
+    return SemanticGraph(nodes=nodes, edges=edges, repaired=graph.repaired, warnings=graph.warnings), report
+
+
+def describe_report(report):
+    """Kratek povzetek popravkov za prikaz (prazen niz, če ni bilo sprememb)."""
+    parts = [
+        (report["nodes_merged"], "duplicate nodes merged"),
+        (report["ids_renamed"], "conflicting ids renamed"),
+        (report["edges_repaired"], "edges re-linked by label"),
+        (report["edges_dangling"], "dangling edges dropped"),
+        (report["edges_relabeled"], "relations remapped"),
+        (report["edges_disallowed"], "edges outside the logic mode dropped"),
+        (report["edges_duplicate"] + report["self_loops"], "duplicate/self edges dropped"),
+        (report["colors_fixed"], "colors aligned to the palette"),
+    ]
+    return ", ".join(f"{count} {text}" for count, text in parts if count)
@@ -0,0 +1,114 @@
+"""Špekulativno zajemanje bibliografij, medtem ko uporabnik še piše povpraševanje.
+
+Vsaka seja ima svoj `BiblioPrefetcher`. Spremembe polja z avtorji se oddajo z zakasnitvijo
+(debounce) deljenemu bazenu niti; iskanja za avtorje, ki jih ni več v vnosu, se prekličejo
+(če še niso začela) ali pa se njihov rezultat zavrže. Ob izvedbi sinteze `collect` takoj
+vzame končane rezultate in čaka le še na tekoča iskanja. Modul ne uvaža Streamlita.
+"""
+import threading
+from concurrent.futures import wait
+
+from sis_trace import NULL_TRACE
+
+PREFETCH_DEBOUNCE = 0.6   # s mirovanja vnosa pred oddajo iskanj
+
+
+def split_authors(author_input, normalize=str.casefold):
+    """Avtorji iz vnosa, ločenega z vejicami: brez praznih imen in ponovitev (po `normalize`, prvi zmaga)."""
+    authors = {}
+    for auth in (author_input or "").split(","):
+        auth = auth.strip()
+        if auth:
+            authors.setdefault(normalize(auth), auth)
+    return list(authors.values())
+
+
+def _failed(fut):
+    """Končano iskanje se ponovi ob napaki ali praznem bloku (fetch_one napake HTTP-ja pogoltne in vrne "")."""
+    return fut.exception() is not None or not fut.result()
+
+
+class BiblioPrefetcher:
+    """Bibliografije avtorjev ene seje: normalizirano ime -> Future z besedilnim blokom.
+
+    `fetch_one(auth)` vrne bibliografski blok enega avtorja, `executor` je deljen bazen niti.
+    """
+
+    def __init__(self, fetch_one, executor, normalize=str.casefold, debounce=PREFETCH_DEBOUNCE):
+        self.fetch_one, self.executor, self.normalize, self.debounce = fetch_one, executor, normalize, debounce
+        self._futures = {}
+        self._generation = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        self.counters = {"submitted": 0, "retried": 0, "cancelled": 0, "discarded": 0,
+                         "ready_on_execute": 0, "waited_on_execute": 0}
+
+    def update(self, author_input):
+        """Zabeleži nov vnos; iskanja se oddajo, ko vnos `debounce` sekund miruje."""
+        with self._lock:
+            self._generation += 1
+            self._restart_timer(threading.Timer(self.debounce, self._apply, args=(self._generation, author_input)))
+
+    def _restart_timer(self, timer=None):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = timer
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+
+    def _apply(self, generation, author_input):
+        with self._lock:
+            if generation == self._generation:   # medtem je prišel novejši vnos
+                self._sync(split_authors(author_input, self.normalize))
+
+    def _sync(self, authors):
+        """Uskladi iskanja z vnosom (pod ključavnico); vrne Future-e v vrstnem redu vnosa."""
+        wanted = {}
+        for auth in authors:
+            wanted.setdefault(self.normalize(auth), auth)
+        for key in [k for k in self._futures if k not in wanted]:
+            # Tekočega HTTP klica ni mogoče prekiniti; rezultat se le zavrže (deljeni predpomnilnik ga vseeno obdrži).
+            self.counters["cancelled" if self._futures.pop(key).cancel() else "discarded"] += 1
+        for key, auth in wanted.items():
+            fut = self._futures.get(key)
+            if fut is None or fut.cancelled() or (fut.done() and _failed(fut)):
+                self._futures[key] = self.executor.submit(self.fetch_one, auth)
+                self.counters["submitted"] += 1
+                if fut is not None:
+                    self.counters["retried"] += 1
+        return [self._futures[key] for key in wanted]
+
+    def collect(self, author_input, deadline, trace=NULL_TRACE):
+        """Bibliografije v vrstnem redu vnosa; na nedokončana iskanja se čaka največ `deadline` s.
+
+        Avtorji, katerih iskanje do roka ni končano, so izpuščeni (kot pri fetch_author_bibliographies).
+        """
+        authors = split_authors(author_input, self.normalize)
+        with trace.span("biblio", authors=len(authors), prefetch=True) as sp:
+            with self._lock:
+                self._generation += 1            # zakasnjena oddaja starejšega vnosa je zastarela
+                self._restart_timer()
+                futures = self._sync(authors)
+                ready = sum(1 for f in futures if f.done())
+                self.counters["ready_on_execute"] += ready
+                self.counters["waited_on_execute"] += len(futures) - ready
+            wait(futures, timeout=deadline)
+            biblio, completed = "", 0
+            for fut in futures:
+                if fut.done() and not fut.cancelled() and fut.exception() is None:
+                    biblio += fut.result()
+                    completed += 1
+            sp["prefetched"] = ready
+            sp["completed"] = completed
+            sp["bytes"] = len(biblio.encode("utf-8"))
+        return biblio
+
+    def clear(self):
+        """Pozabi vse rezultate seje (npr. po praznjenju bibliografskega predpomnilnika)."""
+        with self._lock:
+            self._generation += 1
+            self._restart_timer()
+            for fut in self._futures.values():
+                fut.cancel()
+            self._futures.clear()
@@ -0,0 +1,284 @@
+"""Procesno deljen razporejevalnik klicev Groq (OpenAI API) z upoštevanjem omejitev hitrosti.
+
+Za vsak par (API ključ, model) vodi ločen pas, saj Groq omejitve šteje po modelu:
+žetonski vedri za zahteve/minuto in žetone/minuto; omejitev sočasnosti pa velja za ključ
+in si jo delijo vsi njegovi pasovi,
+omejitev sočasnosti, pošteno (FIFO) čakalno vrsto in skupno pavzo po odgovoru 429.
+Neuspeli klici se ponovijo z eksponentnim odmikom z naključjem ali po `Retry-After`.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+import openai
+
+from sis_trace import percentile
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class QueueTimeout(Exception):
+    """Zahteva je v čakalni vrsti čakala dlje od dovoljenega."""
+
+
+class TokenBucket:
+    """Vedro z zveznim polnjenjem `rate_per_minute` enot na minuto (kapaciteta = ena minuta)."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost, now):
+        self._refill(now)
+        cost = min(cost, self.capacity)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def take(self, cost):
+        self.tokens -= min(cost, self.capacity)
+
+    def refund(self, amount):
+        """Vrne neporabljene enote; negativna vrednost odšteje dodatno porabo (vedro gre lahko pod 0)."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _KeySlots:
+    """Omejitev sočasnosti enega API ključa, skupna vsem njegovim pasovom (in njihov pogoj)."""
+
+    def __init__(self, max_concurrency):
+        self.cond = threading.Condition()
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+
+class _Lane:
+    """Stanje enega para (API ključ, model): vedri, FIFO vrsta in metrike; sočasnost šteje `slots` ključa."""
+
+    def __init__(self, rpm, tpm, slots):
+        self.slots = slots
+        self.cond = slots.cond
+        self.queue = deque()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.completed = self.retries = self.rate_limited = 0
+        self.waits = deque(maxlen=256)
+
+    def acquire(self, cost, max_wait):
+        ticket = object()
+        enqueued = time.monotonic()
+        deadline = enqueued + max_wait
+        with self.cond:
+            self.queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    slots = self.slots
+                    if self.queue[0] is ticket and slots.in_flight < slots.max_concurrency and now >= self.paused_until:
+                        delay = self.requests.wait_time(1, now)
+                        if self.tokens is not None:
+                            delay = max(delay, self.tokens.wait_time(cost, now))
+                        if delay <= 0:
+                            self.requests.take(1)
+                            if self.tokens is not None:
+                                self.tokens.take(cost)
+                            self.in_flight += 1
+                            slots.in_flight += 1
+                            self.waits.append(now - enqueued)
+                            return now - enqueued
+                    elif now < self.paused_until:
+                        delay = self.paused_until - now
+                    else:
+                        delay = 1.0  # čakamo na sprostitev mesta ali na vrsto
+                    if now >= deadline:
+                        raise QueueTimeout(f"request waited {now - enqueued:.0f}s in the Groq queue")
+                    self.cond.wait(timeout=min(delay, deadline - now))
+            finally:
+                if self.queue and self.queue[0] is ticket:
+                    self.queue.popleft()
+                elif ticket in self.queue:
+                    self.queue.remove(ticket)
+                self.cond.notify_all()
+
+    def release(self, refund_tokens=0):
+        """Sprosti mesto in poravna TPM rezervacijo (negativen `refund_tokens` zaračuna preseženo porabo)."""
+        with self.cond:
+            self.in_flight -= 1
+            self.slots.in_flight -= 1
+            if refund_tokens and self.tokens is not None:
+                self.tokens.refund(refund_tokens)
+            self.cond.notify_all()
+
+    def pause(self, seconds):
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.rate_limited += 1
+
+    def snapshot(self):
+        with self.cond:
+            waits = list(self.waits)
+            return {
+                "queue_depth": len(self.queue), "in_flight": self.in_flight, "completed": self.completed,
+                "retries": self.retries, "rate_limited": self.rate_limited,
+                "wait_avg_s": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95_s": percentile(waits, 0.95),
+            }
+
+
+def retry_after_seconds(error):
+    """Prebere `retry-after-ms` / `retry-after` (sekunde ali HTTP datum) iz odgovora napake."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def estimate_request_tokens(create_kwargs):
+    """Rezervacija za TPM: ocena vhodnih žetonov (≈ 4 znaki/žeton) + `max_tokens`."""
+    chars = sum(len(m.get("content") or "") for m in create_kwargs.get("messages", []))
+    return chars // 4 + int(create_kwargs.get("max_tokens") or 1024)
+
+
+class GroqScheduler:
+    def __init__(self, rpm=30, tpm=None, max_concurrency=4, max_retries=5, max_queue_wait=300.0,
+                 backoff_base=1.0, backoff_cap=30.0):
+        self.rpm, self.tpm, self.max_concurrency = rpm, tpm, max_concurrency
+        self.max_retries, self.max_queue_wait = max_retries, max_queue_wait
+        self.backoff_base, self.backoff_cap = backoff_base, backoff_cap
+        self._lanes = {}
+        self._slots = {}        # id ključa -> _KeySlots
+        self._lock = threading.Lock()
+        self._local = threading.local()  # statistika zadnje zahteve v tej niti
+
+    @staticmethod
+    def key_id(api_key):
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+    def lane(self, api_key, model=None):
+        kid = self.key_id(api_key)
+        lane_key = (kid, model or "")
+        with self._lock:
+            if lane_key not in self._lanes:
+                slots = self._slots.setdefault(kid, _KeySlots(self.max_concurrency))
+                self._lanes[lane_key] = _Lane(self.rpm, self.tpm, slots)
+            return self._lanes[lane_key]
+
+    def backoff(self, attempt):
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def execute(self, api_key, call, create_kwargs):
+        """Izvede `call()` skozi pas ključa in modela; pri pretoku se mesto sprosti šele ob koncu toka.
+
+        Neuspel poskus vrne celotno TPM rezervacijo, uspešen pa jo poravna z dejansko porabo.
+        """
+        lane = self.lane(api_key, create_kwargs.get("model"))
+        cost = estimate_request_tokens(create_kwargs)
+        stats = self._local.last = {"queue_wait_s": 0.0, "attempts": 0, "reserved_tokens": cost}
+        for attempt in range(self.max_retries + 1):
+            stats["queue_wait_s"] += lane.acquire(cost, self.max_queue_wait)
+            stats["attempts"] += 1
+            try:
+                result = call()
+            except RETRYABLE_ERRORS as e:
+                lane.release(refund_tokens=cost)
+                if attempt >= self.max_retries:
+                    raise
+                with lane.cond:
+                    lane.retries += 1
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                if isinstance(e, openai.RateLimitError):
+                    lane.pause(delay)  # vsi čakajoči na tem ključu počakajo skupaj
+                else:
+                    time.sleep(delay)
+                continue
+            except BaseException:
+                lane.release(refund_tokens=cost)
+                raise
+            if create_kwargs.get("stream"):
+                return _release_when_exhausted(result, lane, cost)
+            used = _usage_tokens(result)
+            lane.release(refund_tokens=cost - used if used else 0)
+            with lane.cond:
+                lane.completed += 1
+            return result
+
+    def last_request_stats(self):
+        """Čakanje v vrsti in število poskusov zadnje zahteve, izvedene v trenutni niti."""
+        return dict(getattr(self._local, "last", None) or {})
+
+    def metrics(self):
+        """Posnetek vseh pasov: (id ključa, model) -> metrike."""
+        with self._lock:
+            lanes = dict(self._lanes)
+        return {kid: lane.snapshot() for kid, lane in lanes.items()}
+
+
+def usage_counts(obj):
+    """Žetoni iz odgovora ali zadnjega kosa toka (OpenAI `usage` ali Groq `x_groq.usage`); None, če jih ni."""
+    x_groq = getattr(obj, "x_groq", None)
+    if isinstance(x_groq, dict):  # dodatna polja kosov toka OpenAI SDK vrne kot navaden slovar
+        x_groq = SimpleNamespace(**x_groq)
+    usage = getattr(obj, "usage", None) or getattr(x_groq, "usage", None)
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+    return {"prompt_tokens": get("prompt_tokens"), "completion_tokens": get("completion_tokens"), "total_tokens": get("total_tokens")}
+
+
+def _usage_tokens(obj):
+    usage = usage_counts(obj)
+    return usage["total_tokens"] if usage else None
+
+
+def _release_when_exhausted(stream, lane, cost):
+    used = None
+    try:
+        for chunk in stream:
+            used = _usage_tokens(chunk) or used
+            yield chunk
+        with lane.cond:
+            lane.completed += 1
+    finally:
+        lane.release(refund_tokens=cost - used if used else 0)
+
+
+class ScheduledClient:
+    """Ovoj OpenAI odjemalca: `chat.completions.create` gre skozi razporejevalnik, ostalo neposredno."""
+
+    def __init__(self, client, scheduler, api_key):
+        self._client = client
+        self._scheduler = scheduler
+        self._api_key = api_key
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **create_kwargs):
+        return self._scheduler.execute(self._api_key, lambda: self._client.chat.completions.create(**create_kwargs), create_kwargs)
+
+    def last_request_stats(self):
+        return self._scheduler.last_request_stats()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
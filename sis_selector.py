@@ -0,0 +1,143 @@
+"""Izbira relevantnega podgrafa ontologij (IMA, MA) za sistemsko navodilo.
+
+Vozlišča in vnosi baze znanja dobijo vnaprej izračunane leksikalne TF-IDF vektorje.
+Poizvedba in izbire uporabnika se ocenijo s kosinusno podobnostjo; najboljša vozlišča
+se razširijo za k skokov po relacijah in dodajajo, dokler kodiran podgraf ne preseže
+proračuna žetonov. Modul ne uvaža Streamlita.
+"""
+import math
+import re
+from collections import Counter
+
+ONTOLOGY_TOKEN_BUDGET = 450   # ≈ 60 % polnih ontologij
+SELECT_HOPS = 1
+STEM_CHARS = 5                # okrnjeno korenjenje: "deductive" in "deduction" -> "deduc"
+NAME_WEIGHT = 3
+INQUIRY_WEIGHT = 2            # besedilo povpraševanja šteje več kot izbire na nadzorni plošči
+MIN_RELATIVE_SCORE = 0.35     # semena: vozlišča z vsaj 35 % najboljše ocene
+HEADER_CHARS = 90             # glava kodirane ontologije (NODES.../EDGES...)
+
+_TERM_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_STOPWORDS = frozenset("""
+and are can for from has have how its not our the their this that these with what when which who why into
+""".split())
+
+
+def stem_terms(text):
+    """Okrnjeni iskalni izrazi (male črke, brez kratkih in pogostih besed)."""
+    return [t[:STEM_CHARS] for t in _TERM_RE.findall(text.lower()) if len(t) > 2 and t not in _STOPWORDS]
+
+
+def _node_chars(name, style, default_shape="rectangle"):
+    part = f"{name}|{style['color']}"
+    if style.get("shape", default_shape) != default_shape:
+        part += f"|{style['shape']}"
+    return len(part) + 2
+
+
+class OntologySelector:
+    """TF-IDF indeks vozlišč ontologij; gradi se enkrat na proces.
+
+    `ontologies`: ime -> ontologija ({"nodes", "relations"}), `entries`: ime vnosa baze
+    znanja (paradigma, model, polje ...) -> opisno besedilo, ki razširi poizvedbo.
+    """
+
+    def __init__(self, ontologies, entries=None):
+        self.ontologies = ontologies
+        self.nodes = []           # (ime ontologije, ime vozlišča)
+        self.position = {}        # ime vozlišča (male črke) -> položaj
+        self.neighbors = []       # položaj -> {sosed: (vir, cilj, relacija)}
+        docs = []
+        for onto_name, onto in ontologies.items():
+            for name in onto["nodes"]:
+                self.position.setdefault(name.casefold(), len(self.nodes))
+                self.nodes.append((onto_name, name))
+                self.neighbors.append({})
+                docs.append(Counter({t: NAME_WEIGHT for t in stem_terms(name)}))
+        for onto_name, onto in ontologies.items():
+            for src, dst, rel in onto["relations"]:
+                i, j = self.position[src.casefold()], self.position[dst.casefold()]
+                self.neighbors[i][j] = self.neighbors[j][i] = (src, dst, rel)
+                # Vozlišče "pozna" tudi imena sosedov in relacij (šibkejša teža kot lastno ime).
+                docs[i].update(stem_terms(f"{dst} {rel}"))
+                docs[j].update(stem_terms(f"{src} {rel}"))
+        df = Counter(t for doc in docs for t in doc)
+        self.idf = {t: math.log(1 + len(docs) / n) for t, n in df.items()}
+        self.postings = {}        # izraz -> [(položaj, utež)]
+        for pos, doc in enumerate(docs):
+            vec = {t: (1 + math.log(tf)) * self.idf[t] for t, tf in doc.items()}
+            norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+            for t, w in vec.items():
+                self.postings.setdefault(t, []).append((pos, w / norm))
+        self.entries = {name.casefold(): Counter(stem_terms(f"{name} {text}")) for name, text in (entries or {}).items()}
+        self.hubs = {}            # ontologija -> vozlišče z največ relacijami (sidro, kadar ni zadetkov)
+        for pos, (onto_name, _) in enumerate(self.nodes):
+            best = self.hubs.get(onto_name)
+            if best is None or len(self.neighbors[pos]) > len(self.neighbors[best]):
+                self.hubs[onto_name] = pos
+
+    def query_terms(self, text, selections=()):
+        """Izrazi poizvedbe: besedilo povpraševanja in opisi izbranih vnosov baze znanja."""
+        terms = Counter({t: INQUIRY_WEIGHT * tf for t, tf in Counter(stem_terms(text)).items()})
+        for sel in selections:
+            terms.update(self.entries.get(sel.casefold()) or stem_terms(sel))
+        return terms
+
+    def score(self, terms):
+        """Kosinusna podobnost poizvedbe z vozlišči; vrne slovar položaj -> ocena (samo > 0)."""
+        qvec = {t: (1 + math.log(tf)) * self.idf[t] for t, tf in terms.items() if t in self.idf}
+        norm = math.sqrt(sum(w * w for w in qvec.values())) or 1.0
+        scores = {}
+        for t, qw in qvec.items():
+            for pos, w in self.postings[t]:
+                scores[pos] = scores.get(pos, 0.0) + qw * w / norm
+        return scores
+
+    def select(self, text, selections=(), seeds=(), token_budget=ONTOLOGY_TOKEN_BUDGET, hops=SELECT_HOPS):
+        """Vrne (ime ontologije -> podgraf v obliki ontologije, statistika).
+
+        `seeds` so imena vozlišč, ki so vedno izbrana (npr. izbrani miselni pristopi).
+        Vsaka ontologija dobi vsaj eno vozlišče, da navodilo ostane zasidrano v arhitekturi.
+        """
+        scores = self.score(self.query_terms(text, selections))
+        forced = [self.position[s.casefold()] for s in seeds if s.casefold() in self.position]
+        floor = max(scores.values(), default=0.0) * MIN_RELATIVE_SCORE
+        ranked = sorted((p for p, v in scores.items() if v >= floor and p not in forced), key=lambda p: (-scores[p], p))
+        candidates = forced + ranked
+        represented = {self.nodes[p][0] for p in candidates}
+        candidates += [hub for onto_name, hub in self.hubs.items() if onto_name not in represented]
+
+        budget = token_budget * 4 - HEADER_CHARS * len(self.ontologies)
+        chosen, used = set(), 0
+
+        def add(pos):
+            nonlocal used
+            onto_name, name = self.nodes[pos]
+            cost = _node_chars(name, self.ontologies[onto_name]["nodes"][name])
+            cost += sum(len(f"{s}>{r}>{d}") + 1 for nb, (s, d, r) in self.neighbors[pos].items() if nb in chosen)
+            if used + cost > budget:
+                return False
+            chosen.add(pos)
+            used += cost
+            return True
+
+        for seed in candidates:
+            if seed in chosen:
+                continue
+            if not add(seed):
+                continue
+            # k-skokna razširitev: najprej bližji in bolje ocenjeni sosedje.
+            frontier = [seed]
+            for _ in range(hops):
+                ring = {nb for p in frontier for nb in self.neighbors[p]} - chosen
+                frontier = [nb for nb in sorted(ring, key=lambda p: (-scores.get(p, 0.0), -len(self.neighbors[p]), p)) if add(nb)]
+
+        subgraphs = {}
+        for onto_name, onto in self.ontologies.items():
+            names = {self.nodes[p][1] for p in chosen if self.nodes[p][0] == onto_name}
+            subgraphs[onto_name] = {
+                "nodes": {n: style for n, style in onto["nodes"].items() if n in names},
+                "relations": [r for r in onto["relations"] if r[0] in names and r[1] in names],
+            }
+        stats = {"nodes": len(chosen), "of": len(self.nodes), "matched": len(scores), "chars": used}
+        return subgraphs, stats
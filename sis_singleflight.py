@@ -0,0 +1,107 @@
+"""Združevanje enakih sočasnih klicev (single-flight) za vse seje procesa.
+
+Prvi klicatelj s ključem postane vodja in izvede klic; kasnejši z enakim ključem se
+pripnejo nanj, dobijo isti rezultat in (pri pretoku) sprotne delne izpise. Če vodja
+ne uspe, se čakajoči ne zanesejo na njegovo napako: eden izmed njih poskusi znova.
+Modul ne uvaža Streamlita.
+"""
+import threading
+
+
+class _LeaderFailed(Exception):
+    pass
+
+
+class Flight:
+    """En klic v teku: zadnji delni izpis, končni rezultat ali napaka."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.done = False
+        self.failed = False
+        self.value = None
+        self.partial = None
+        self.version = 0
+
+    def publish(self, partial):
+        """Vodja objavi delni izpis (npr. do zdaj zbrano prozo) za vse čakajoče."""
+        with self.cond:
+            self.partial = partial
+            self.version += 1
+            self.cond.notify_all()
+
+    def finish(self, value=None, failed=False):
+        with self.cond:
+            self.value, self.failed, self.done = value, failed, True
+            self.cond.notify_all()
+
+    def wait(self, on_update=None):
+        """Počaka na rezultat; `on_update(delni izpis)` se kliče v niti čakajočega."""
+        seen = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.done or (on_update is not None and self.version > seen))
+                done, failed, value = self.done, self.failed, self.value
+                partial, version = self.partial, self.version
+            if on_update is not None and version > seen:
+                seen = version
+                on_update(partial)
+            if done:
+                if failed:
+                    raise _LeaderFailed()
+                return value
+
+
+class SingleFlight:
+    """Ključ (npr. SHA-256 vsebine zahteve) -> klic v teku, z metrikami prihrankov.
+
+    `cost(rezultat)` oceni, koliko enot (npr. žetonov) prihrani vsak pripeti klicatelj.
+    """
+
+    def __init__(self, cost=None):
+        self.cost = cost
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = self.followers = self.leader_failures = 0
+        self.saved_cost = 0
+
+    def do(self, key, fn, on_update=None):
+        """Izvede `fn(publish)` ali se pripne na enak klic v teku; vrne (rezultat, ali je bil deljen)."""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Flight()
+                    self.leaders += 1
+            if leader:
+                return self._lead(key, flight, fn), False
+            try:
+                value = flight.wait(on_update)
+            except _LeaderFailed:
+                continue
+            with self._lock:
+                self.followers += 1
+                self.saved_cost += (self.cost(value) or 0) if self.cost else 0
+            return value, True
+
+    def _lead(self, key, flight, fn):
+        # Klic se odstrani iz tabele pred objavo izida, da se novi klicatelji ne pripnejo na končanega.
+        try:
+            value = fn(flight.publish)
+        except BaseException:
+            with self._lock:
+                self.leader_failures += 1
+                del self._flights[key]
+            flight.finish(failed=True)
+            raise
+        with self._lock:
+            del self._flights[key]
+        flight.finish(value)
+        return value
+
+    def metrics(self):
+        """Vodje (dejanski klici), prihranjeni klici, neuspeli vodje in klici v teku."""
+        with self._lock:
+            return {"calls": self.leaders, "saved_calls": self.followers, "saved_cost": self.saved_cost,
+                    "leader_failures": self.leader_failures, "in_flight": len(self._flights)}
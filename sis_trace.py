@@ -0,0 +1,126 @@
+"""Merjenje stopenj cevovoda z razponi (spans): čas, bajti in žetoni na stopnjo.
+
+`Trace` zbira razpone (tudi iz delovnih niti), ki se prikažejo v diagnostiki in se lahko
+dopisujejo v JSONL. Povzetek p50/p95 po stopnjah iz zbranih datotek:
+    python sis_trace.py .sis_cache/spans.jsonl
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+class Trace:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.created = time.time()
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Izmeri blok; vrnjeni slovar lahko klicatelj dopolni (bytes, tokens, ...).
+
+        Starš je zunanji razpon iste niti ali izrecno podani `parent` (za delovne niti).
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        record = {"name": name, "parent": attrs.pop("parent", stack[-1] if stack else None)}
+        record.update(attrs)
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record["start_ms"] = round((start - self._t0) * 1000, 3)
+            record["duration_ms"] = round((end - start) * 1000, 3)
+            with self._lock:
+                self.spans.append(record)
+
+    def records(self):
+        """Razponi, urejeni po začetku, z id-jem sledi."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda r: r["start_ms"])
+        return [dict(r, trace_id=self.trace_id) for r in spans]
+
+    def append_jsonl(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        lines = "".join(json.dumps(dict(r, created=self.created), ensure_ascii=False) + "\n" for r in self.records())
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    @classmethod
+    def from_records(cls, records):
+        """Obnovi sled iz shranjenih zapisov (npr. iz zgodovine); novih razponov ne meri več smiselno."""
+        trace = cls(trace_id=records[0].get("trace_id") if records else None)
+        trace.spans = [{k: v for k, v in r.items() if k != "trace_id"} for r in records]
+        return trace
+
+
+class _NullTrace:
+    """Nadomestek brez učinka, kadar klicatelj sledi ne potrebuje."""
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield {}
+
+
+NULL_TRACE = _NullTrace()
+
+
+def percentiles(values, *qs):
+    """Percentili po metodi najbližjega ranga: ceil(q·n)-ti element urejenih vrednosti; prazno -> 0.0.
+
+    Vrednosti se uredijo enkrat za vse zahtevane `qs`.
+    """
+    ordered = sorted(values)
+    n = len(ordered)
+    # Zaokrožitev odpravi napako plavajoče vejice (0.95 * 100 = 95.00000000000001).
+    return tuple(ordered[max(0, math.ceil(round(q * n, 9)) - 1)] if n else 0.0 for q in qs)
+
+
+def percentile(values, q):
+    return percentiles(values, q)[0]
+
+
+def summarize_spans(records):
+    """Povzetek po imenih stopenj: število, p50, p95 in največji čas (ms)."""
+    by_name = {}
+    for r in records:
+        by_name.setdefault(r["name"], []).append(r["duration_ms"])
+    summary = []
+    for name, values in sorted(by_name.items()):
+        p50, p95, top = percentiles(values, 0.5, 0.95, 1.0)
+        summary.append({"stage": name, "count": len(values), "p50_ms": p50, "p95_ms": p95, "max_ms": top})
+    return summary
+
+
+def main(argv=None):
+    records = []
+    for path in (argv if argv is not None else sys.argv[1:]):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    print(f"{'stage':<24} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for row in summarize_spans(records):
+        print(f"{row['stage']:<24} {row['count']:>6} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['max_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
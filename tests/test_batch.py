@@ -0,0 +1,44 @@
+"""Paketna sinteza (`sis_batch`)."""
+import json
+
+import pytest
+
+import sis_batch
+from sis_core import SynthesisResult
+from sis_graph import GraphNode, SemanticGraph
+
+
+class FailingStore:
+    def __init__(self, fail_ids):
+        self.fail_ids, self.merged = fail_ids, []
+
+    def merge_graph(self, run_id, graph, title="", logic_type="", created=None):
+        if run_id in self.fail_ids:
+            raise OSError("database is locked")
+        self.merged.append((run_id, title, len(graph.nodes)))
+        return True
+
+
+@pytest.fixture
+def fake_synthesis(monkeypatch):
+    def run_synthesis(config, client, use_response_cache=False):
+        if config.user_query == "boom":
+            raise RuntimeError("model failed")
+        graph = SemanticGraph(nodes=[GraphNode("a", config.user_query)])
+        return SynthesisResult(text="t", markdown="m", graph=graph, biblio="", logic_type="Relational logic",
+                               is_idea_mode=False, prompt_sections={}, query_context="")
+    monkeypatch.setattr(sis_batch, "run_synthesis", run_synthesis)
+
+
+def test_graph_store_failure_is_reported_per_item(tmp_path, fake_synthesis):
+    rows = [{"id": f"q{i}", "user_query": q} for i, q in enumerate(["alpha", "beta", "boom", "gamma"])]
+    inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    inp.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+    store = FailingStore({"q1"})
+    summary = sis_batch.run_batch(str(inp), str(out), client=None, workers=2, log=lambda _msg: None, graph_store=store)
+
+    assert summary == {"skipped": 0, "ok": 3, "error": 1, "graph_store_error": 1}
+    records = {r["id"]: r for r in map(json.loads, out.read_text(encoding="utf-8").splitlines())}
+    assert records["q1"]["status"] == "ok" and "database is locked" in records["q1"]["graph_store_error"]
+    assert "graph_store_error" not in records["q0"]
+    assert sorted(store.merged) == [("q0", "alpha", 1), ("q3", "gamma", 1)]
@@ -0,0 +1,59 @@
+"""Bibliografska iskanja in njihovi predpomnilniki (`sis_core`)."""
+import pytest
+import requests
+
+import sis_core
+from sis_core import PersistentTTLCache, _fetch_single_author_biblio, fetch_author_bibliographies
+from sis_trace import NULL_TRACE
+
+
+class FakeResponse:
+    def __init__(self, status, payload):
+        self.status_code, self._payload = status, payload
+        self.content = repr(payload).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def get(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def caches(tmp_path):
+    return {"orcid_ids": PersistentTTLCache(str(tmp_path / "ids.json"), 3600, 100),
+            "works": PersistentTTLCache(str(tmp_path / "works.json"), 3600, 100)}
+
+
+def test_error_responses_are_not_cached(caches):
+    session = FakeSession([FakeResponse(503, {"message": "unavailable"}), FakeResponse(429, {"message": "slow down"})])
+    assert _fetch_single_author_biblio("Ana Novak", session, caches, trace=NULL_TRACE) == ""
+    assert caches["orcid_ids"].stats()["entries"] == 0 and caches["works"].stats()["entries"] == 0
+
+
+def test_real_no_match_is_cached(caches):
+    session = FakeSession([FakeResponse(200, {"result": []}), FakeResponse(200, {"data": [{"year": 2020, "title": "T"}]})])
+    biblio = _fetch_single_author_biblio("Ana Novak", session, caches, trace=NULL_TRACE)
+    assert "[2020] T" in biblio
+    assert caches["orcid_ids"].get("ana novak") == ""
+    assert caches["works"].get("scholar:ana novak") == [[2020, "T"]]
+
+
+
+def test_execute_path_fetches_each_author_once(caches, monkeypatch):
+    calls = []
+    monkeypatch.setattr(sis_core, "get_biblio_caches", lambda: caches)
+    monkeypatch.setattr(sis_core, "fetch_single_author_biblio",
+                        lambda auth, session, caches, trace: calls.append(auth) or f"[{auth}]")
+    assert fetch_author_bibliographies("Ana Novak, ,ana novak, Bor Kos,") == "[Ana Novak][Bor Kos]"
+    assert calls == ["Ana Novak", "Bor Kos"]
+    assert fetch_author_bibliographies(" , ") == ""
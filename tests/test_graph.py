@@ -0,0 +1,82 @@
+"""Razčlenjevanje in popravljanje SEMANTIC_GRAPH_JSON (`sis_graph`)."""
+import json
+
+import pytest
+
+from sis_graph import SemanticGraph, extract_semantic_graph, repair_json_fragment
+
+GRAPH = {
+    "nodes": [{"id": "a", "label": "Form", "type": "Root", "color": "#123456", "shape": "diamond"},
+              {"id": "b", "label": "Light"}],
+    "edges": [{"source": "a", "target": "b", "rel_type": "NT"}],
+}
+
+
+def test_extract_happy_path_ignores_surrounding_text():
+    graph = extract_semantic_graph("Here it is: " + json.dumps(GRAPH) + "\nDone {not json}")
+    assert [n.id for n in graph.nodes] == ["a", "b"]
+    assert graph.nodes[1].type == "Branch" and graph.nodes[1].shape == "ellipse"
+    assert graph.edges[0].rel_type == "NT"
+    assert not graph.repaired and graph.warnings == []
+
+
+def test_extract_without_graph_returns_none():
+    assert extract_semantic_graph("") is None
+    assert extract_semantic_graph("no json here") is None
+    assert extract_semantic_graph('{"other": 1}') is None
+
+
+def test_extract_truncated_graph_is_repaired():
+    text = json.dumps(GRAPH)
+    graph = extract_semantic_graph(text[:text.index('"edges"') + 20])
+    assert graph.repaired
+    assert [n.id for n in graph.nodes] == ["a", "b"]
+
+
+@pytest.mark.parametrize("payload, warning", [
+    ('{"nodes": 5}', "'nodes' is int, not a list"),
+    ('{"nodes": [], "edges": true}', "'edges' is bool, not a list"),
+    ('{"nodes": "a, b"}', "'nodes' is str, not a list"),
+    ('{"nodes": [1, "x", null]}', "3 nodes entries are not objects"),
+])
+def test_extract_wrong_shapes_give_empty_graph_with_warning(payload, warning):
+    graph = extract_semantic_graph(payload)
+    assert graph.nodes == [] and graph.edges == []
+    assert warning in graph.warnings
+
+
+def test_from_dict_rejects_non_object():
+    graph = SemanticGraph.from_dict(["nodes"])
+    assert graph.nodes == [] and graph.warnings
+
+
+def test_from_dict_coerces_scalar_fields():
+    graph = SemanticGraph.from_dict({
+        "nodes": [{"id": 1, "label": 2.5, "type": 7, "color": 123, "shape": ["star"]},
+                  {"id": ["x"], "label": "skipped"},
+                  {"id": "c", "label": ""}],
+        "edges": [{"source": 1, "target": True, "rel_type": 5},
+                  {"source": "1", "target": "c", "rel_type": {"name": "BT"}},
+                  {"source": {}, "target": "c"}],
+    })
+    node = graph.nodes[0]
+    assert len(graph.nodes) == 1
+    assert (node.id, node.label, node.type, node.color, node.shape) == ("1", "2.5", "7", "123", "ellipse")
+    assert [(e.source, e.target, e.rel_type) for e in graph.edges] == [("1", "True", "5"), ("1", "c", "AS")]
+
+
+def test_to_dict_round_trip_keeps_warnings():
+    graph = SemanticGraph.from_dict({"nodes": GRAPH["nodes"], "edges": {}})
+    again = SemanticGraph.from_dict(graph.to_dict(), repaired=graph.repaired)
+    assert again == graph
+
+
+@pytest.mark.parametrize("fragment, expected", [
+    ('{"nodes": [1, 2,]}', {"nodes": [1, 2]}),
+    ('{"nodes": [,1,,2]}', {"nodes": [1, 2]}),
+    ('{"nodes": [{"id": "a"}, {"id": "b', {"nodes": [{"id": "a"}]}),
+    ('{"nodes": [{"id": "a\\\\"}], "edges": [', {"nodes": [{"id": "a\\"}]}),
+    ('{"nodes": []} trailing', {"nodes": []}),
+])
+def test_repair_json_fragment(fragment, expected):
+    assert json.loads(repair_json_fragment(fragment)) == expected
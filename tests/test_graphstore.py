@@ -0,0 +1,56 @@
+"""Skupna shramba semantičnih omrežij (`sis_graphstore`)."""
+import sqlite3
+
+from sis_graph import GraphEdge, GraphNode, SemanticGraph
+from sis_graphstore import GraphStore
+
+
+def graph(*labels):
+    nodes = [GraphNode(f"n{i}", label) for i, label in enumerate(labels)]
+    edges = [GraphEdge(f"n{i}", f"n{i + 1}", "NT") for i in range(len(labels) - 1)]
+    return SemanticGraph(nodes=nodes, edges=edges)
+
+
+def test_merge_is_idempotent_and_counts_weights(tmp_path):
+    store = GraphStore(str(tmp_path / "g.sqlite3"))
+    assert store.merge_graph("r1", graph("Cognition", "Memory"), "first")
+    assert not store.merge_graph("r1", graph("Cognition", "Memory"), "first")
+    store.merge_graph("r2", graph("cognition ", "Memory", "Sleep"), "second")
+    assert store.stats() == {"concepts": 3, "edges": 2, "runs": 2}
+    assert store.neighbors("Cognition") == [("out", "NT", "Memory", 2)]
+    assert len(store.k_hop("Cognition", hops=2).nodes) == 3
+
+
+def test_search_and_runs_mentioning(tmp_path):
+    store = GraphStore(str(tmp_path / "g.sqlite3"))
+    store.merge_graph("r1", graph("Cognition", "Memory"), "first", created=1.0)
+    store.merge_graph("r2", graph("Cognition", "Sleep"), "second", created=2.0)
+    assert [(r["label"], r["mentions"]) for r in store.search("cogn")] == [("Cognition", 2)]
+    assert [r["title"] for r in store.runs_mentioning("cognition")] == ["second", "first"]
+    assert store.runs_mentioning("Unknown") == []
+
+
+def test_queries_are_scoped_to_owner(tmp_path):
+    store = GraphStore(str(tmp_path / "g.sqlite3"))
+    store.merge_graph("a1", graph("Cognition", "Memory"), "alice's inquiry", owner="session:a")
+    store.merge_graph("b1", graph("Cognition", "Secret topic"), "bob's inquiry", owner="session:b")
+
+    assert [r["title"] for r in store.runs_mentioning("Cognition", owner="session:a")] == ["alice's inquiry"]
+    assert [r["label"] for r in store.search("secret", owner="session:a")] == []
+    assert [(r["label"], r["mentions"]) for r in store.search("cognition", owner="session:a")] == [("Cognition", 1)]
+    assert [label for _, _, label, _ in store.neighbors("Cognition", owner="session:a")] == ["Memory"]
+    assert {n.label for n in store.k_hop("Cognition", hops=2, owner="session:a").nodes} == {"Cognition", "Memory"}
+    assert store.neighbors("Secret topic", owner="session:a") == []
+    assert len(store.runs_mentioning("Cognition")) == 2        # brez lastnika (ukazna vrstica): vse sinteze
+
+
+def test_old_database_gains_owner_column(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE runs (id TEXT PRIMARY KEY, created REAL, title TEXT, logic_type TEXT, nodes INTEGER, edges INTEGER)")
+    conn.execute("INSERT INTO runs VALUES ('old', 0, 'legacy', '', 0, 0)")
+    conn.commit()
+    conn.close()
+    store = GraphStore(path)
+    store.merge_graph("new", graph("Cognition"), "mine", owner="o")
+    assert [r["title"] for r in store.runs_mentioning("Cognition", owner="o")] == ["mine"]
@@ -0,0 +1,56 @@
+"""Trajna zgodovina sintez (`sis_history`)."""
+import json
+
+from sis_history import SynthesisHistory
+
+
+def result(i):
+    return {"text": f"answer {i}", "query_context": f"secret attachment {i}"}
+
+
+def test_recent_is_newest_first_and_load_reads_one_record(tmp_path):
+    history = SynthesisHistory(str(tmp_path))
+    first = history.append(result(1), {"user_query": "first\nmore"}, owner="o")
+    second = history.append(result(2), {"idea_query": "second"}, owner="o")
+    assert [(e["id"], e["title"]) for e in history.recent("o")] == [(second, "second"), (first, "first")]
+    assert history.load(first, "o")["result"]["text"] == "answer 1"
+    assert history.load("missing", "o") is None
+
+
+def test_index_is_rebuilt_from_data(tmp_path):
+    history = SynthesisHistory(str(tmp_path))
+    ids = [history.append(result(i), {"user_query": f"q{i}"}, owner="o") for i in range(3)]
+    (tmp_path / "history.idx.jsonl").unlink()
+    reopened = SynthesisHistory(str(tmp_path))
+    assert [e["id"] for e in reopened.recent("o")] == list(reversed(ids))
+    assert reopened.load(ids[1], "o")["title"] == "q1"
+
+
+def test_entries_are_visible_only_to_their_owner(tmp_path):
+    history = SynthesisHistory(str(tmp_path))
+    mine = history.append(result(1), {"user_query": "first\nmore"}, owner="session:a")
+    other = history.append(result(2), {"idea_query": "second"}, owner="session:b")
+    assert [e["title"] for e in history.recent("session:a")] == ["first"]
+    assert history.load(mine, "session:a")["result"]["text"] == "answer 1"
+    assert history.load(other, "session:a") is None
+    assert history.recent("session:c") == []
+
+
+def test_query_context_is_not_stored(tmp_path):
+    history = SynthesisHistory(str(tmp_path))
+    entry = history.append(result(1), {}, owner="o")
+    assert "query_context" not in history.load(entry, "o")["result"]
+    assert b"secret" not in (tmp_path / "history.jsonl").read_bytes()
+
+
+def test_file_is_pruned_to_newest_entries(tmp_path):
+    history = SynthesisHistory(str(tmp_path), max_entries=4)
+    ids = [history.append(result(i), {"user_query": f"q{i}"}, owner="o") for i in range(11)]
+    kept = [e["id"] for e in history.recent("o", n=100)]
+    assert len(kept) <= 5 and kept[0] == ids[-1]
+    assert [history.load(i, "o")["title"] for i in kept] == [f"q{ids.index(i)}" for i in kept]
+    lines = (tmp_path / "history.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(reversed(kept))
+
+    reopened = SynthesisHistory(str(tmp_path), max_entries=4)
+    assert [e["id"] for e in reopened.recent("o", n=100)] == kept
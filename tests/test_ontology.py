@@ -0,0 +1,59 @@
+"""Normalizacija semantičnega grafa (`sis_ontology`)."""
+from sis_graph import GraphEdge, GraphNode, SemanticGraph
+from sis_ontology import DEFAULT_COLOR, OntologyIndex, _parse_hex, canonical_relation, normalize_graph
+
+ONTOLOGY = {
+    "nodes": {"Thinking": {"color": "#FF0000", "shape": "diamond"}, "Perception": {"color": "#0000FF"}},
+    "relations": [("Thinking", "Perception", "NT")],
+}
+MIXED = "Hierarchical associative logic"
+
+
+def test_canonical_relation_aliases_and_defaults():
+    assert canonical_relation(" broader term ") == "BT"
+    assert canonical_relation("nt") == "NT"
+    assert canonical_relation("outcome_of") == "outcome_of"
+    assert canonical_relation(None) == canonical_relation("") == "RT"
+    assert canonical_relation(5) == "5"
+
+
+def test_parse_hex():
+    assert _parse_hex("#abc") == "#AABBCC"
+    assert _parse_hex(" #12ab3C ") == "#12AB3C"
+    assert _parse_hex("red") is None and _parse_hex(None) is None
+
+
+def test_parse_hex_accepts_non_strings():
+    assert _parse_hex(123) == "#112233"
+    assert _parse_hex(None) is None and _parse_hex(["#fff"]) is None
+
+
+def test_normalize_merges_and_aligns_with_ontology():
+    graph = SemanticGraph(nodes=[GraphNode("1", "thinking"), GraphNode("2", "Perception "), GraphNode("3", "Thinking", "Root")],
+                          edges=[GraphEdge("1", "2", "narrower"), GraphEdge("3", "Perception", "NT"), GraphEdge("1", "9")])
+    out, report = normalize_graph(graph, MIXED, OntologyIndex(ONTOLOGY))
+    assert [(n.id, n.type, n.color, n.shape) for n in out.nodes] == [("1", "Root", "#FF0000", "diamond"),
+                                                                    ("2", "Branch", "#0000FF", "rectangle")]
+    assert [(e.source, e.target, e.rel_type) for e in out.edges] == [("1", "2", "NT")]
+    assert report["nodes_merged"] == 1 and report["edges_duplicate"] == 1 and report["edges_dangling"] == 1
+    assert report["ontology_edges_consistent"] == 1
+
+
+def test_normalize_tolerates_non_string_fields():
+    graph = SemanticGraph(
+        nodes=[GraphNode(1, 42, 7, 123, ["star"]), GraphNode("b", "Other", None, None, {"x": 1})],
+        edges=[GraphEdge(1, "b", 5), GraphEdge("b", 1, None), GraphEdge(["b"], 1, "AS")],
+    )
+    out, report = normalize_graph(graph, MIXED, OntologyIndex(ONTOLOGY))
+    assert [(n.id, n.label, n.type, n.shape) for n in out.nodes] == [("1", "42", "Branch", "ellipse"),
+                                                                    ("b", "Other", "Branch", "ellipse")]
+    assert out.nodes[1].color == DEFAULT_COLOR
+    assert [(e.source, e.target, e.rel_type) for e in out.edges] == [("1", "b", "AS"), ("b", "1", "RT")]
+    assert report["edges_dangling"] == 1
+
+
+def test_normalize_strict_logic_drops_lateral_edges():
+    graph = SemanticGraph(nodes=[GraphNode("a", "A"), GraphNode("b", "B")],
+                          edges=[GraphEdge("a", "b", "AS"), GraphEdge("a", "b", "related"), GraphEdge("a", "b", None)])
+    out, report = normalize_graph(graph, "Strict hierarchical logic", OntologyIndex(ONTOLOGY))
+    assert out.edges == [] and report["edges_disallowed"] == 3
@@ -0,0 +1,60 @@
+"""Vnaprejšnje zajemanje bibliografij (`sis_prefetch`)."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sis_core import normalize_author_name
+from sis_prefetch import BiblioPrefetcher, split_authors
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_collect_keeps_input_order_and_reuses_results(executor):
+    calls = []
+
+    def fetch_one(auth):
+        calls.append(auth)
+        return f"[{auth}]"
+
+    prefetcher = BiblioPrefetcher(fetch_one, executor)
+    assert prefetcher.collect("Ana, Bor, ana", deadline=5) == "[Ana][Bor]"
+    assert prefetcher.collect("Bor, Ana", deadline=5) == "[Bor][Ana]"
+    assert sorted(calls) == ["Ana", "Bor"]
+
+
+def test_empty_or_failed_result_is_retried_on_execute(executor):
+    outcomes = {"Ana": ["", "[Ana]"], "Bor": [RuntimeError("timeout"), "[Bor]"]}
+
+    def fetch_one(auth):
+        result = outcomes[auth].pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    prefetcher = BiblioPrefetcher(fetch_one, executor)
+    assert prefetcher.collect("Ana, Bor", deadline=5) == ""
+    assert prefetcher.collect("Ana, Bor", deadline=5) == "[Ana][Bor]"
+    assert prefetcher.counters["retried"] == 2
+
+
+def test_split_authors_drops_empty_and_duplicate_names():
+    assert split_authors("Ana Novak, , ana  novak,Bor Kos,", normalize_author_name) == ["Ana Novak", "Bor Kos"]
+    assert split_authors(" , ") == [] and split_authors(None) == []
+
+
+def test_update_is_debounced_and_drops_removed_authors(executor):
+    calls = []
+    prefetcher = BiblioPrefetcher(lambda auth: calls.append(auth) or f"[{auth}]", executor, debounce=0.05)
+    prefetcher.update("Ana")
+    prefetcher.update("Ana, Bor")                    # prvi vnos se ne odda
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(calls) == ["Ana", "Bor"] and prefetcher.counters["submitted"] == 2
+    assert prefetcher.collect("Bor", deadline=5) == "[Bor]"
+    assert prefetcher.counters["ready_on_execute"] == 1 and prefetcher.counters["discarded"] == 1
@@ -0,0 +1,115 @@
+"""Razporejevalnik Groq klicev (`sis_scheduler`)."""
+import threading
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from sis_scheduler import GroqScheduler, QueueTimeout, retry_after_seconds
+
+KWARGS = {"model": "m1", "messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 200}  # rezervacija 300
+
+
+def completion(total_tokens):
+    return SimpleNamespace(usage={"prompt_tokens": total_tokens // 2, "completion_tokens": total_tokens // 2,
+                                  "total_tokens": total_tokens})
+
+
+def flaky(*outcomes):
+    outcomes = list(outcomes)
+
+    def call():
+        result = outcomes.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return call
+
+
+def connection_error():
+    return openai.APIConnectionError(request=None)  # razporejevalnik zahteve ne bere
+
+
+@pytest.fixture
+def scheduler():
+    return GroqScheduler(rpm=600, tpm=6000, max_retries=2, backoff_base=0.0)
+
+
+def test_retryable_errors_are_retried(scheduler):
+    result = scheduler.execute("key", flaky(connection_error(), connection_error(), completion(100)), KWARGS)
+    assert result.usage["total_tokens"] == 100
+    lane = scheduler.lane("key", "m1")
+    assert (lane.retries, lane.completed, lane.in_flight) == (2, 1, 0)
+
+
+def test_retries_are_bounded(scheduler):
+    with pytest.raises(openai.APIConnectionError):
+        scheduler.execute("key", flaky(*(connection_error() for _ in range(3))), KWARGS)
+    assert scheduler.lane("key", "m1").in_flight == 0
+
+
+def test_failed_attempts_refund_reservation(scheduler):
+    scheduler.execute("key", flaky(connection_error(), connection_error(), completion(100)), KWARGS)
+    bucket = scheduler.lane("key", "m1").tokens
+    assert bucket.tokens == pytest.approx(6000 - 100, abs=5)
+    assert scheduler.last_request_stats()["attempts"] == 3
+
+
+def test_non_retryable_error_refunds_reservation(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.execute("key", flaky(ValueError("bad request")), KWARGS)
+    assert scheduler.lane("key", "m1").tokens.tokens == pytest.approx(6000, abs=5)
+    assert scheduler.lane("key", "m1").in_flight == 0
+
+
+def test_usage_above_reservation_is_charged(scheduler):
+    scheduler.execute("key", flaky(completion(1000)), KWARGS)
+    assert scheduler.lane("key", "m1").tokens.tokens == pytest.approx(6000 - 1000, abs=5)
+
+
+def test_lanes_are_per_key_and_model(scheduler):
+    scheduler.execute("key", flaky(completion(10)), KWARGS)
+    scheduler.execute("key", flaky(completion(10)), dict(KWARGS, model="m2"))
+    scheduler.execute("other", flaky(completion(10)), KWARGS)
+    kid = GroqScheduler.key_id("key")
+    metrics = scheduler.metrics()
+    assert set(metrics) == {(kid, "m1"), (kid, "m2"), (GroqScheduler.key_id("other"), "m1")}
+    assert all(m["completed"] == 1 for m in metrics.values())
+
+
+def test_full_lane_times_out():
+    scheduler = GroqScheduler(rpm=600, max_concurrency=1, max_queue_wait=0.1)
+    lane = scheduler.lane("key", "m1")
+    lane.acquire(0, 1.0)
+    with pytest.raises(QueueTimeout):
+        scheduler.execute("key", flaky(completion(10)), KWARGS)
+    lane.release()
+    scheduler.execute("key", flaky(completion(10)), KWARGS)
+
+
+def test_retry_after_headers():
+    def error(headers):
+        return SimpleNamespace(response=SimpleNamespace(headers=headers))
+    assert retry_after_seconds(error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(error({"retry-after": "2"})) == 2.0
+    assert retry_after_seconds(error({})) is None and retry_after_seconds(ValueError()) is None
+
+def test_concurrency_cap_is_shared_by_all_models_of_a_key():
+    scheduler = GroqScheduler(rpm=600, max_concurrency=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_call():
+        started.set()
+        release.wait(5)
+        return completion(10)
+
+    worker = threading.Thread(target=scheduler.execute, args=("key", slow_call, KWARGS))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(QueueTimeout):
+        scheduler.max_queue_wait = 0.2
+        scheduler.execute("key", flaky(completion(10)), dict(KWARGS, model="m2"))
+    scheduler.execute("other", flaky(completion(10)), dict(KWARGS, model="m2"))   # drug ključ ne čaka
+    release.set()
+    worker.join(5)
+    scheduler.execute("key", flaky(completion(10)), dict(KWARGS, model="m2"))
@@ -0,0 +1,89 @@
+"""Cevovod sinteze z lažnim odjemalcem (`sis_core.run_synthesis`)."""
+import json
+from types import SimpleNamespace as N
+
+import pytest
+
+import sis_core
+from sis_core import ResponseDiskCache, SynthesisConfig, _request_completion, run_synthesis
+
+GRAPH = {"nodes": [{"id": "n1", "label": "Quantum", "type": "Root"}, {"id": "n2", "label": "Stress"}],
+         "edges": [{"source": "n1", "target": "n2", "rel_type": "BT"}]}
+PROSE = "# Synthesis\n\nQuantum effects shape how stress propagates through social systems. " * 5
+
+
+class FakeClient:
+    """Odgovori kot Groq; `fail` je množica zahtev, ki sprožijo napako ("graph" ali seme kandidata)."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.chat = N(completions=N(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        self.calls.append(kwargs)
+        kind = "graph" if kwargs.get("response_format") else kwargs.get("seed", "prose")
+        if kind in self.fail:
+            raise RuntimeError(f"{kind} request failed")
+        content = json.dumps(GRAPH) if kind == "graph" else PROSE
+        return N(choices=[N(message=N(content=content))], usage=None)
+
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    cache = ResponseDiskCache(str(tmp_path / "llm"), 10 * 1024 * 1024)
+    monkeypatch.setattr(sis_core, "get_response_cache", lambda: cache)
+    return cache
+
+
+def run(client, **config):
+    return run_synthesis(SynthesisConfig(user_query="How does quantum relate to stress?", **config), client,
+                         use_response_cache=True)
+
+
+def test_parallel_graph_result_is_cached(response_cache):
+    first = run(FakeClient())
+    assert [n.label for n in first.graph.nodes] == ["Quantum", "Stress"]
+    again = run(FakeClient())
+    assert again.cached and again.graph is not None
+
+
+def test_failed_graph_request_is_not_cached(response_cache):
+    failed = run(FakeClient(fail={"graph"}))
+    assert failed.graph is None and not failed.cached
+    retry = run(FakeClient())
+    assert not retry.cached and retry.graph is not None
+
+
+def test_empty_message_content_becomes_empty_text():
+    client = N(chat=N(completions=N(create=lambda **kwargs: N(choices=[N(message=N(content=None))], usage=None))))
+    assert _request_completion(client, None, {"model": "m", "messages": []})["text"] == ""
+
+
+IDEAS = ("### Quantum stress sensors\nMeasure physiological stress with quantum sensing devices in everyday settings and clinics.\n\n"
+         "### Social resonance maps\nModel how collective stress spreads through networks using quantum walk analogies.\n")
+
+
+class IdeaClient(FakeClient):
+    def create(self, stream=False, **kwargs):
+        result = super().create(stream=stream, **kwargs)
+        if not kwargs.get("response_format"):
+            result.choices[0].message.content = IDEAS.replace("Quantum", f"Quantum {kwargs['seed']}", 1)
+        return result
+
+
+def run_ideas(client):
+    return run_synthesis(SynthesisConfig(idea_query="Create ideas linking quantum physics and stress", idea_candidates=3),
+                         client, use_response_cache=True)
+
+
+def test_idea_candidates_merge_survivors_when_first_fails(response_cache):
+    result = run_ideas(IdeaClient(fail={1}))                 # seme 1 = prvi (pretočni) kandidat
+    assert "Idea Portfolio" in result.text and "Quantum 2" in result.text
+    assert next(r for r in result.trace.spans if r["name"] == "ideas.candidates")["failed"] == 1
+    assert not run_ideas(IdeaClient()).cached                # delni nabor ni bil predpomnjen
+
+
+def test_idea_candidates_fail_only_when_all_fail(response_cache):
+    with pytest.raises(RuntimeError):
+        run_ideas(IdeaClient(fail={1, 2, 3}))
@@ -0,0 +1,35 @@
+"""Razponi in povzetki časov (`sis_trace`)."""
+import random
+import statistics
+
+import pytest
+
+from sis_trace import Trace, percentile, percentiles, summarize_spans
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 20, 100, 257])
+def test_p95_is_at_least_median_for_unsorted_input(n):
+    values = [random.Random(n).expovariate(1.0) for _ in range(n)]
+    p50, p95 = percentiles(values, 0.5, 0.95)
+    assert p95 >= p50
+    assert p95 >= statistics.median(values)
+    assert percentile(values, 1.0) == max(values) and percentile(values, 0.0) == min(values)
+
+
+def test_nearest_rank():
+    values = list(range(100, 0, -1))            # 100 .. 1, neurejeno
+    assert percentiles(values, 0.5, 0.95, 0.99) == (50, 95, 99)
+    assert percentile([3.0, 1.0], 0.95) == 3.0
+    assert percentile([], 0.95) == 0.0
+
+
+def test_summarize_spans_per_stage():
+    trace = Trace()
+    for _ in range(3):
+        with trace.span("llm"):
+            with trace.span("llm.chunk"):
+                pass
+    rows = {row["stage"]: row for row in summarize_spans(trace.records())}
+    assert rows["llm"]["count"] == 3 and rows["llm.chunk"]["count"] == 3
+    assert rows["llm"]["p50_ms"] <= rows["llm"]["p95_ms"] <= rows["llm"]["max_ms"]
+    assert all(r["parent"] == "llm" for r in trace.records() if r["name"] == "llm.chunk")